@@ -11,7 +11,8 @@ https://docs.djangoproject.com/en/5.1/ref/settings/
 """
 
 from pathlib import Path
-from decouple import config
+from corsheaders.defaults import default_headers
+from decouple import config, Csv
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -40,14 +41,19 @@ INSTALLED_APPS = [
     'django.contrib.staticfiles',
     'rest_framework',
     'rest_framework.authtoken',
-    'corsheaders'
+    'corsheaders',
     'authentication.apps.AuthenticationConfig',
     'core.apps.CoreConfig',
     'appointments.apps.AppointmentsConfig',
 ]
 
 MIDDLEWARE = [
+    # Primero: mide el tiempo y los bytes de toda la pila
+    'core.metrics.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    # Antes que los middleware que modifican el cuerpo de la respuesta
+    'core.compression.CompressionMiddleware',
+    'core.routing.ReplicaRoutingMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -81,13 +87,143 @@ WSGI_APPLICATION = 'appointment_management.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.1/ref/settings/#databases
 
-DATABASES = {
+# DATABASE_ENGINE=postgresql para produccion; sqlite (por defecto) para desarrollo
+
+DATABASE_ENGINE = config('DATABASE_ENGINE', default='sqlite')
+DATABASE_CONN_MAX_AGE = config('DATABASE_CONN_MAX_AGE', default=60, cast=int)
+
+if DATABASE_ENGINE == 'postgresql':
+    # Pool nativo de Django 5.1 (psycopg[pool]). Es incompatible con conexiones
+    # persistentes: con el pool activo CONN_MAX_AGE queda en 0. CONN_HEALTH_CHECKS
+    # verifica la conexion al tomarla del pool o al reutilizarla entre requests
+    DATABASE_POOL = config('DATABASE_POOL', default=True, cast=bool)
+    DATABASE_OPTIONS = {
+        'pool': {
+            'min_size': config('DATABASE_POOL_MIN_SIZE', default=2, cast=int),
+            'max_size': config('DATABASE_POOL_MAX_SIZE', default=10, cast=int),
+            'timeout': config('DATABASE_POOL_TIMEOUT', default=10, cast=int),
+        },
+    } if DATABASE_POOL else {}
+
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': config('DATABASE_NAME', default='appointment_management'),
+            'USER': config('DATABASE_USER', default='postgres'),
+            'PASSWORD': config('DATABASE_PASSWORD', default=''),
+            'HOST': config('DATABASE_HOST', default='localhost'),
+            'PORT': config('DATABASE_PORT', default='5432'),
+            'CONN_MAX_AGE': 0 if DATABASE_POOL else DATABASE_CONN_MAX_AGE,
+            'CONN_HEALTH_CHECKS': True,
+            'OPTIONS': DATABASE_OPTIONS,
+        }
+    }
+else:
+    # PRAGMAs aplicados en cada conexion nueva. WAL deja leer mientras otro
+    # escribe y synchronous=NORMAL es seguro con WAL (solo se pierde la ultima
+    # transaccion ante un corte de energia, sin corromper la base).
+    # BEGIN IMMEDIATE toma el lock de escritura al abrir la transaccion: en modo
+    # DEFERRED la subida de lectura a escritura falla al instante con
+    # "database is locked" sin respetar busy_timeout
+    SQLITE_PRAGMAS = {
+        'journal_mode': config('SQLITE_JOURNAL_MODE', default='WAL'),
+        'synchronous': config('SQLITE_SYNCHRONOUS', default='NORMAL'),
+        'busy_timeout': config('SQLITE_BUSY_TIMEOUT', default=5000, cast=int),
+        'mmap_size': config('SQLITE_MMAP_SIZE', default=128 * 1024 * 1024, cast=int),
+    }
+
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': config('DATABASE_NAME', default=str(BASE_DIR / 'db.sqlite3')),
+            'CONN_MAX_AGE': DATABASE_CONN_MAX_AGE,
+            'OPTIONS': {
+                'init_command': ';'.join(f'PRAGMA {name}={value}' for name, value in SQLITE_PRAGMAS.items()),
+                'transaction_mode': config('SQLITE_TRANSACTION_MODE', default='IMMEDIATE'),
+            },
+            # Base de tests en archivo: la base en memoria compartida de SQLite
+            # rechaza escrituras concurrentes ("table is locked") en los tests con hilos
+            'TEST': {
+                'NAME': BASE_DIR / 'test_db.sqlite3',
+            },
+        }
+    }
+
+# Replicas de lectura: DATABASE_REPLICAS lista hosts (PostgreSQL) o archivos
+# (SQLite) separados por coma. Cada una se registra como replica_<n> con la
+# configuracion del primario; en tests apuntan a la base de tests (MIRROR)
+
+DATABASE_REPLICAS = config('DATABASE_REPLICAS', default='', cast=Csv())
+DATABASE_REPLICA_ALIASES = []
+for index, replica in enumerate(DATABASE_REPLICAS, start=1):
+    alias = f'replica_{index}'
+    location = 'HOST' if DATABASE_ENGINE == 'postgresql' else 'NAME'
+    DATABASES[alias] = {**DATABASES['default'], location: replica, 'TEST': {'MIRROR': 'default'}}
+    DATABASE_REPLICA_ALIASES.append(alias)
+
+DATABASE_ROUTERS = ['core.routing.PrimaryReplicaRouter']
+
+# Segundos que un usuario lee del primario despues de escribir. El pin vive en el
+# cache: con replicas y varios workers el cache tiene que ser compartido
+# (CACHE_SHARED, comprobado por core.checks)
+REPLICA_PIN_SECONDS = config('REPLICA_PIN_SECONDS', default=5, cast=int)
+
+# Cache
+# https://docs.djangoproject.com/en/5.1/topics/cache/
+# locmem es por proceso: con varios workers usar un backend compartido (Redis/Memcached)
+LOCMEM_CACHE_BACKEND = 'django.core.cache.backends.locmem.LocMemCache'
+CACHE_BACKEND = config('CACHE_BACKEND', default=LOCMEM_CACHE_BACKEND)
+
+CACHES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+        'BACKEND': CACHE_BACKEND,
+        'LOCATION': config('CACHE_LOCATION', default='appointment-management'),
     }
 }
 
+# Con un cache por proceso la invalidacion que hace una escritura no llega a los
+# demas workers: las entradas que se invalidan al escribir duran como mucho
+# LOCAL_CACHE_TIMEOUT segundos (core.caching.cache_timeout)
+CACHE_SHARED = config('CACHE_SHARED', default=CACHE_BACKEND != LOCMEM_CACHE_BACKEND, cast=bool)
+LOCAL_CACHE_TIMEOUT = config('LOCAL_CACHE_TIMEOUT', default=5, cast=int)
+
+TOKEN_CACHE_TIMEOUT = config('TOKEN_CACHE_TIMEOUT', default=5 * 60, cast=int)
+SPECIALTY_CATALOG_TIMEOUT = config('SPECIALTY_CATALOG_TIMEOUT', default=24 * 60 * 60, cast=int)
+
+# Compresion de respuestas (core.compression): gzip, o brotli si esta
+# instalado (pip install brotli) y el cliente lo acepta
+COMPRESSION_MIN_SIZE = config('COMPRESSION_MIN_SIZE', default=1024, cast=int)
+COMPRESSION_BROTLI_QUALITY = config('COMPRESSION_BROTLI_QUALITY', default=5, cast=int)
+
+# Metricas por endpoint (core.metrics): /api/v1/metrics/ (Prometheus) y cabecera Server-Timing.
+# METRICS_SLOW_SAMPLE_RATE de las peticiones guarda su SQL; las que superan
+# METRICS_SLOW_REQUEST_MS se registran en el log con sus consultas mas lentas
+METRICS_ENABLED = config('METRICS_ENABLED', default=True, cast=bool)
+METRICS_SERVER_TIMING = config('METRICS_SERVER_TIMING', default=True, cast=bool)
+METRICS_SLOW_REQUEST_MS = config('METRICS_SLOW_REQUEST_MS', default=500, cast=int)
+METRICS_SLOW_SAMPLE_RATE = config('METRICS_SLOW_SAMPLE_RATE', default=0.1, cast=float)
+
+# Password hashing
+# https://docs.djangoproject.com/en/5.1/topics/auth/passwords/
+# El costo de PBKDF2 es configurable; los hashes con otro costo se actualizan
+# en segundo plano en el siguiente login (authentication.passwords).
+# Solo ese rehash sale de la peticion: verificar la contrasena (login, cambio) y
+# hashear una nueva (registro, cambio, reset) la bloquean con el costo completo,
+# porque la respuesta depende de ellos. PASSWORD_HASH_ITERATIONS fija esa latencia.
+
+PASSWORD_HASHERS = [
+    'authentication.hashers.ConfigurablePBKDF2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+    'django.contrib.auth.hashers.Argon2PasswordHasher',
+    'django.contrib.auth.hashers.BCryptSHA256PasswordHasher',
+    'django.contrib.auth.hashers.ScryptPasswordHasher',
+]
+
+# 870000 es el valor por defecto de Django 5.1
+PASSWORD_HASH_ITERATIONS = config('PASSWORD_HASH_ITERATIONS', default=870000, cast=int)
+# Hilos para los rehash diferidos del login (0 = en linea); no aceleran la verificacion
+PASSWORD_HASH_WORKERS = config('PASSWORD_HASH_WORKERS', default=2, cast=int)
+
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
 
@@ -134,12 +270,34 @@ REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
     ],
-    # Autenticación con token
+    # Autenticación con token (token -> usuario cacheado, ver TOKEN_CACHE_TIMEOUT)
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
+        'authentication.authentication.CachedTokenAuthentication',
+    ],
+    # Paginacion por cursor (keyset) en los listados
+    'DEFAULT_PAGINATION_CLASS': 'core.pagination.KeysetPagination',
+    'PAGE_SIZE': config('API_PAGE_SIZE', default=50, cast=int),
+    # JSON con orjson si esta instalado (pip install orjson); si no, el json de la stdlib
+    'DEFAULT_RENDERER_CLASSES': [
+        'core.renderers.ORJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'core.renderers.ORJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
     ],
 }
 
+# APPOINTMENTS
+APPOINTMENT_SLOT_MINUTES = config('APPOINTMENT_SLOT_MINUTES', default=30, cast=int)
+# Filas por UPDATE (y por transaccion) de los cambios de estado masivos
+APPOINTMENT_TRANSITION_BATCH_SIZE = config('APPOINTMENT_TRANSITION_BATCH_SIZE', default=500, cast=int)
+
+# EXPORTS / IMPORTS
+EXPORT_CHUNK_SIZE = config('EXPORT_CHUNK_SIZE', default=2000, cast=int)
+IMPORT_BATCH_SIZE = config('IMPORT_BATCH_SIZE', default=1000, cast=int)
+
 # CONFIG EMAIL
 EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
 EMAIL_HOST = config('EMAIL_HOST')
@@ -148,7 +306,19 @@ EMAIL_USE_TLS = config('EMAIL_USE_TLS')
 EMAIL_HOST_USER = config('EMAIL_HOST_USER')
 EMAIL_HOST_PASSWORD = config('EMAIL_HOST_PASSWORD')
 
+# Outbox: los correos se guardan y un worker los envia por lotes con reintentos
+# (hilo en el proceso y/o `manage.py send_outbox --loop`)
+EMAIL_OUTBOX_THREAD = config('EMAIL_OUTBOX_THREAD', default=True, cast=bool)
+EMAIL_OUTBOX_BATCH_SIZE = config('EMAIL_OUTBOX_BATCH_SIZE', default=50, cast=int)
+EMAIL_OUTBOX_MAX_ATTEMPTS = config('EMAIL_OUTBOX_MAX_ATTEMPTS', default=5, cast=int)
+EMAIL_OUTBOX_RETRY_SECONDS = config('EMAIL_OUTBOX_RETRY_SECONDS', default=30, cast=int)
+EMAIL_OUTBOX_LEASE_SECONDS = config('EMAIL_OUTBOX_LEASE_SECONDS', default=300, cast=int)
+EMAIL_OUTBOX_POLL_SECONDS = config('EMAIL_OUTBOX_POLL_SECONDS', default=5, cast=int)
+
 # URL ACCESS
 CORS_ALLOWED_ORIGINS = [
-    'http://localhost:5173/',
+    'http://localhost:5173',
 ]
+# Peticiones condicionales de los listados (ETag / If-None-Match)
+CORS_ALLOW_HEADERS = (*default_headers, 'if-none-match')
+CORS_EXPOSE_HEADERS = ['ETag']
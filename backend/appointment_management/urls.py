@@ -1,9 +1,12 @@
 from django.contrib import admin
 from django.urls import path, include
+from authentication.urls import async_urlpatterns as authentication_async
+from core.urls import async_urlpatterns as core_async
 
 urlpatterns = [
     path('admin/', admin.site.urls),
     path("api/v1/", include("authentication.urls")),
     path("api/v1/", include("core.urls")),
     path("api/v1/", include("appointments.urls")),
+    path("api/v1/async/", include(authentication_async + core_async)),
 ]
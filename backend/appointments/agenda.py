@@ -0,0 +1,45 @@
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Appointment
+
+# Proyeccion plana: columnas de la cita (del indice cubriente) y el nombre de la
+# otra parte con un JOIN por clave primaria, sin DoctorSerializer/PacientSerializer
+APPOINTMENT_COLUMNS = ('id', 'scheduled_date', 'scheduled_time', 'state', 'version')
+
+DOCTOR_AGENDA_COLUMNS = {
+    'pacient_dni': F('pacient__person__dni'),
+    'pacient_first_name': F('pacient__person__first_name'),
+    'pacient_last_name': F('pacient__person__last_name'),
+    'pacient_phone': F('pacient__contact_phone'),
+}
+
+PACIENT_UPCOMING_COLUMNS = {
+    'doctor_first_name': F('doctor__person__first_name'),
+    'doctor_last_name': F('doctor__person__last_name'),
+}
+
+
+def doctor_agenda(doctor_id, day, states=None):
+    """
+    Appointments of the doctor on ``day`` by time, as flat dicts. One query:
+    a range of ``appointment_doctor_day_idx`` already in order.
+    """
+    appointments = Appointment.objects.filter(doctor_id=doctor_id, scheduled_date=day)
+    if states:
+        appointments = appointments.filter(state__in=states)
+    return list(appointments.order_by('scheduled_time', 'id')
+                .values(*APPOINTMENT_COLUMNS, 'pacient_id', **DOCTOR_AGENDA_COLUMNS))
+
+
+def pacient_upcoming(pacient_id, limit, since=None):
+    """
+    The next ``limit`` booked appointments of the pacient from ``since``
+    (today by default), as flat dicts. One query on
+    ``appointment_pacient_day_idx``.
+    """
+    since = since or timezone.localdate()
+    appointments = Appointment.objects.filter(pacient_id=pacient_id, scheduled_date__gte=since,
+                                              state__in=Appointment.BOOKED_STATES)
+    return list(appointments.order_by('scheduled_date', 'scheduled_time', 'id')
+                .values(*APPOINTMENT_COLUMNS, 'doctor_id', **PACIENT_UPCOMING_COLUMNS)[:limit])
@@ -0,0 +1,109 @@
+from collections import defaultdict
+from datetime import datetime, time, timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from .models import Appointment, Slot
+
+
+def slot_duration():
+    return timedelta(minutes=getattr(settings, 'APPOINTMENT_SLOT_MINUTES', 30))
+
+
+class IntervalTree:
+    """
+    Static interval tree over half-open ``[start, end)`` intervals.
+
+    The intervals are kept sorted by start and every implicit node (the middle
+    of a sub-range) stores the maximum end of its subtree, so an overlap
+    lookup only visits the branches that can still contain a hit.
+    """
+
+    def __init__(self, intervals=()):
+        self._intervals = sorted(intervals)
+        self._max_end = [None] * len(self._intervals)
+        self._build(0, len(self._intervals))
+
+    def __len__(self):
+        return len(self._intervals)
+
+    def _build(self, lo, hi):
+        if lo >= hi:
+            return None
+        mid = (lo + hi) // 2
+        max_end = self._intervals[mid][1]
+        for child in (self._build(lo, mid), self._build(mid + 1, hi)):
+            if child is not None and child > max_end:
+                max_end = child
+        self._max_end[mid] = max_end
+        return max_end
+
+    def overlaps(self, start, end):
+        return self._overlaps(0, len(self._intervals), start, end)
+
+    def _overlaps(self, lo, hi, start, end):
+        if lo >= hi:
+            return False
+        mid = (lo + hi) // 2
+        # Ningún intervalo del subárbol termina después de 'start'
+        if self._max_end[mid] <= start:
+            return False
+        if self._overlaps(lo, mid, start, end):
+            return True
+        node_start, node_end = self._intervals[mid]
+        if node_start >= end:
+            return False
+        if node_end > start:
+            return True
+        return self._overlaps(mid + 1, hi, start, end)
+
+
+def booked_intervals(date_from, date_to, doctor_ids=None, duration=None):
+    """Return ``{doctor_id: IntervalTree}`` with the booked appointments in the range."""
+    duration = duration or slot_duration()
+    appointments = Appointment.objects.filter(
+        scheduled_date__range=(date_from, date_to),
+        state__in=Appointment.BOOKED_STATES,
+        scheduled_time__isnull=False,
+    )
+    if doctor_ids is not None:
+        appointments = appointments.filter(doctor_id__in=doctor_ids)
+
+    intervals = defaultdict(list)
+    rows = appointments.values_list('doctor_id', 'scheduled_date', 'scheduled_time')
+    for doctor_id, scheduled_date, scheduled_time in rows.iterator():
+        start = datetime.combine(scheduled_date, scheduled_time)
+        intervals[doctor_id].append((start, start + duration))
+    return {doctor_id: IntervalTree(items) for doctor_id, items in intervals.items()}
+
+
+def free_slots(date_from, date_to, doctor_ids=None):
+    """
+    Free slots per doctor between ``date_from`` and ``date_to`` (inclusive).
+
+    Reads the materialized ``Slot`` table (``appointments.slots``) with one
+    range query on the partial index of free slots, whatever the number of
+    doctors or schedules, and returns ``{doctor_id: [(start, end), ...]}``
+    sorted by start, in local time.
+    """
+    lower = timezone.make_aware(datetime.combine(date_from, time.min))
+    upper = timezone.make_aware(datetime.combine(date_to + timedelta(days=1), time.min))
+    slots = Slot.objects.filter(status=Slot.FREE, start__gte=lower, start__lt=upper)
+    if doctor_ids is not None:
+        slots = slots.filter(doctor_id__in=doctor_ids)
+
+    result = defaultdict(list)
+    rows = slots.order_by('doctor_id', 'start').values_list('doctor_id', 'start', 'duration')
+    for doctor_id, start, duration in rows.iterator():
+        start = timezone.make_naive(start)
+        result[doctor_id].append((start, start + timedelta(minutes=duration)))
+    return dict(result)
+
+
+def next_free_slot(doctor_id, after=None):
+    """First free ``Slot`` of the doctor starting at or after ``after`` (now by default), or None."""
+    return (Slot.objects
+            .filter(doctor_id=doctor_id, status=Slot.FREE, start__gte=after or timezone.now())
+            .order_by('start')
+            .first())
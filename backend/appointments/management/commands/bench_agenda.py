@@ -0,0 +1,130 @@
+import json
+import random
+import time
+import uuid
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Min
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+
+from appointments.agenda import doctor_agenda, pacient_upcoming
+from appointments.models import Appointment
+from core import benchmark
+from core.models import Doctor, Pacient
+
+ROUTES = ('doctor_agenda', 'pacient_upcoming')
+# Jornada de la historia sintetica (inicio, fin)
+DAY_HOURS = ("08:00", "19:00")
+
+
+class Command(BaseCommand):
+    help = (
+        "Grow the appointments table to --rows (default: 10,000,000) with synthetic history "
+        "on the existing doctors and pacients, then benchmark the doctor agenda and pacient "
+        "upcoming endpoints through the test client and print their query plans. Run "
+        "seed_clinic first, on a throwaway database: the history goes before its oldest "
+        "appointment and is not removed."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=10_000_000,
+                            help='Total appointments before measuring (default: 10000000).')
+        parser.add_argument('--batch-size', type=int, default=10_000,
+                            help='Rows per bulk INSERT (default: 10000).')
+        parser.add_argument('--requests', type=int, default=500,
+                            help='Measured requests per route (default: 500).')
+        parser.add_argument('--seed', type=int, default=42, help='Random seed (default: 42).')
+        parser.add_argument('--output', help='Write the results as JSON to this file.')
+
+    def handle(self, *args, **options):
+        doctors = list(Doctor.objects.order_by('pk').values_list('pk', flat=True))
+        pacients = list(Pacient.objects.order_by('pk').values_list('pk', flat=True))
+        if not doctors or not pacients:
+            raise CommandError("No doctors or pacients: run manage.py seed_clinic first.")
+
+        existing = Appointment.objects.count()
+        if existing < options['rows']:
+            self.fill(doctors, pacients, options['rows'] - existing, options['batch_size'], options['seed'])
+        self.analyze()
+
+        sample_doctor = doctors[0]
+        sample_pacient = Appointment.objects.filter(scheduled_date__gte=timezone.localdate()).values_list(
+            'pacient_id', flat=True).first() or pacients[0]
+        today = timezone.localdate()
+        self.stdout.write(f"doctor agenda plan:\n{self.explain(doctor_agenda, sample_doctor, today)}")
+        self.stdout.write(f"pacient upcoming plan:\n{self.explain(pacient_upcoming, sample_pacient, 20, today)}")
+
+        user = User.objects.create(username=f"benchmark_{uuid.uuid4().hex[:12]}", is_staff=True)
+        token = Token.objects.create(user=user).key
+        try:
+            routes = [route for route in benchmark.ROUTES if route.label in ROUTES]
+            results = {'meta': benchmark.metadata(),
+                       'client': benchmark.run_client(routes, token, options['requests'])}
+        finally:
+            user.delete()
+        for label, result in results['client'].items():
+            self.stdout.write(
+                f"  {label:<18} p50 {result['p50'] * 1e3:7.2f} ms  p95 {result['p95'] * 1e3:7.2f} ms"
+                f"  p99 {result['p99'] * 1e3:7.2f} ms  queries {result['queries']:.1f}  statuses {result['statuses']}"
+            )
+        if options['output']:
+            with open(options['output'], 'w') as output:
+                json.dump(results, output, indent=2)
+            self.stdout.write(f"Results written to {options['output']}")
+
+    def fill(self, doctors, pacients, count, batch_size, seed):
+        """
+        ``count`` past appointments on a grid (doctor, day, time) that never
+        repeats a slot, from the day before the oldest appointment backwards.
+        """
+        rng = random.Random(seed)
+        step = timedelta(minutes=settings.APPOINTMENT_SLOT_MINUTES)
+        start, end = (datetime.strptime(value, "%H:%M") for value in DAY_HOURS)
+        times = []
+        while start + step <= end:
+            times.append(start.time())
+            start += step
+        oldest = Appointment.objects.aggregate(oldest=Min('scheduled_date'))['oldest'] or timezone.localdate()
+        per_day = len(doctors) * len(times)
+
+        started = time.perf_counter()
+        created = 0
+        while created < count:
+            batch = []
+            for index in range(created, min(created + batch_size, count)):
+                day = oldest - timedelta(days=1 + index // per_day)
+                slot = index % per_day
+                state = 'cancelled' if rng.random() < 0.15 else 'completed'
+                batch.append(Appointment(
+                    doctor_id=doctors[slot % len(doctors)], pacient_id=rng.choice(pacients),
+                    scheduled_date=day, scheduled_time=times[slot // len(doctors)], state=state,
+                    cancelled_date=day if state == 'cancelled' else None,
+                ))
+            Appointment.objects.bulk_create(batch, batch_size=batch_size)
+            created += len(batch)
+            if created % 1_000_000 < batch_size or created == count:
+                self.stdout.write(f"  {created} / {count} appointments ({time.perf_counter() - started:.0f} s)")
+
+    def analyze(self):
+        # Estadisticas al dia para el planificador despues de la carga masiva
+        with connection.cursor() as cursor:
+            cursor.execute(f"ANALYZE {Appointment._meta.db_table}")
+
+    def explain(self, function, *args):
+        # SQL y parametros de la consulta de la funcion, para su EXPLAIN
+        with connection.execute_wrapper(self.capture):
+            function(*args)
+        sql, params = self.captured
+        prefix = "EXPLAIN QUERY PLAN" if connection.vendor == 'sqlite' else "EXPLAIN"
+        with connection.cursor() as cursor:
+            cursor.execute(f"{prefix} {sql}", params)
+            return "\n".join("  " + " ".join(str(value) for value in row) for row in cursor.fetchall())
+
+    def capture(self, execute, sql, params, many, context):
+        self.captured = (sql, params)
+        return execute(sql, params, many, context)
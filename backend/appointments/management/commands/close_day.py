@@ -0,0 +1,43 @@
+import time
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from appointments.models import Appointment
+from appointments.transitions import close_day
+
+
+class Command(BaseCommand):
+    help = (
+        "Nightly job: mark as completed the appointments still pending on or before --date "
+        "(yesterday by default), with set-based UPDATEs in short batches. Writes one "
+        "TransitionBatch audit row per batch."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--date', type=date.fromisoformat,
+                            help='Last day to close (YYYY-MM-DD; default: yesterday).')
+        parser.add_argument('--batch-size', type=int,
+                            help='Appointments per UPDATE (default: APPOINTMENT_TRANSITION_BATCH_SIZE).')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Only count the appointments that would be completed.')
+
+    def handle(self, *args, **options):
+        day = options['date'] or timezone.localdate() - timedelta(days=1)
+        if day >= timezone.localdate():
+            raise CommandError("Only past days can be closed.")
+        if options['batch_size'] is not None and options['batch_size'] < 1:
+            raise CommandError("--batch-size must be at least 1.")
+
+        if options['dry_run']:
+            pending = Appointment.objects.filter(state='pending', scheduled_date__lte=day).count()
+            self.stdout.write(f"{pending} pending appointments on or before {day}.")
+            return
+
+        started = time.perf_counter()
+        result = close_day(day, batch_size=options['batch_size'])
+        self.stdout.write(
+            f"{result['updated']} appointments on or before {day} completed in {result['batches']} "
+            f"batches ({time.perf_counter() - started:.1f} s, run {result['run']})"
+        )
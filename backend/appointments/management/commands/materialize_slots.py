@@ -0,0 +1,60 @@
+import time
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Max, Min
+from django.utils import timezone
+
+from appointments.models import Schedule, Slot
+from appointments.slots import materialize
+
+
+class Command(BaseCommand):
+    help = (
+        "Rebuild the slot table from the active schedules and booked appointments. The "
+        "post_save hooks keep it up to date for single saves; run this after bulk loads "
+        "(bulk_create, update(), loaddata) or a change of APPOINTMENT_SLOT_MINUTES. By "
+        "default it covers every day with a schedule or a slot. Deploy step: run it once "
+        "when upgrading a database with schedules to the slot table (appointments migration "
+        "0006); until then availability is empty and each booking materializes its day."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--date-from', type=date.fromisoformat,
+                            help='First day (YYYY-MM-DD; default: the earliest schedule or slot).')
+        parser.add_argument('--date-to', type=date.fromisoformat,
+                            help='Last day (YYYY-MM-DD; default: the latest schedule or slot).')
+        parser.add_argument('--doctor', type=int, action='append',
+                            help='Doctor id (repeatable; default: all).')
+        parser.add_argument('--window', type=int, default=31,
+                            help='Days materialized per transaction (default: 31).')
+
+    def handle(self, *args, **options):
+        if options['window'] < 1:
+            raise CommandError("--window must be at least 1.")
+        date_from, date_to = options['date_from'], options['date_to']
+        if date_from is None or date_to is None:
+            schedules = Schedule.objects.filter(is_active=True).aggregate(first=Min('date_start'), last=Max('date_end'))
+            slots = Slot.objects.aggregate(first=Min('start'), last=Max('start'))
+            first = [value for value in (schedules['first'], slots['first'] and timezone.localdate(slots['first'])) if value]
+            last = [value for value in (schedules['last'], slots['last'] and timezone.localdate(slots['last'])) if value]
+            if not first:
+                self.stdout.write("Nothing to materialize.")
+                return
+            date_from = date_from or min(first)
+            date_to = date_to or max(last)
+        if date_from > date_to:
+            raise CommandError("--date-to must not be before --date-from.")
+
+        started = time.perf_counter()
+        totals = [0, 0, 0]
+        window_start = date_from
+        while window_start <= date_to:
+            window_end = min(window_start + timedelta(days=options['window'] - 1), date_to)
+            for index, count in enumerate(materialize(window_start, window_end, options['doctor'])):
+                totals[index] += count
+            window_start = window_end + timedelta(days=1)
+        self.stdout.write(
+            f"{date_from} to {date_to}: {totals[0]} slots created, {totals[1]} updated, "
+            f"{totals[2]} deleted in {time.perf_counter() - started:.1f} s"
+        )
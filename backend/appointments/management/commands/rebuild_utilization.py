@@ -0,0 +1,60 @@
+import time
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Max, Min
+from django.utils import timezone
+
+from appointments.models import Appointment, Slot, Utilization
+from appointments.utilization import rebuild_utilization
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute the daily utilization rollups (slots, booked, completed, cancelled per "
+        "doctor and day) from the slot table and the appointments. The booking paths keep "
+        "them up to date; run this after bulk loads or to repair drift. By default it covers "
+        "every day with slots, appointments or rollups. Deploy step: run it once, after "
+        "materialize_slots, when upgrading a database with appointments to the rollup table "
+        "(appointments migration 0008); until then the report has no history."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--date-from', type=date.fromisoformat,
+                            help='First day (YYYY-MM-DD; default: the earliest day with data).')
+        parser.add_argument('--date-to', type=date.fromisoformat,
+                            help='Last day (YYYY-MM-DD; default: the latest day with data).')
+        parser.add_argument('--doctor', type=int, action='append',
+                            help='Doctor id (repeatable; default: all).')
+        parser.add_argument('--window', type=int, default=31,
+                            help='Days recomputed per transaction (default: 31).')
+
+    def handle(self, *args, **options):
+        if options['window'] < 1:
+            raise CommandError("--window must be at least 1.")
+        date_from, date_to = options['date_from'], options['date_to']
+        if date_from is None or date_to is None:
+            slots = Slot.objects.aggregate(first=Min('start'), last=Max('start'))
+            bounds = [
+                Appointment.objects.aggregate(first=Min('scheduled_date'), last=Max('scheduled_date')),
+                Utilization.objects.aggregate(first=Min('day'), last=Max('day')),
+                {key: value and timezone.localdate(value) for key, value in slots.items()},
+            ]
+            first = [bound['first'] for bound in bounds if bound['first']]
+            last = [bound['last'] for bound in bounds if bound['last']]
+            if not first:
+                self.stdout.write("Nothing to rebuild.")
+                return
+            date_from = date_from or min(first)
+            date_to = date_to or max(last)
+        if date_from > date_to:
+            raise CommandError("--date-to must not be before --date-from.")
+
+        started = time.perf_counter()
+        rows = 0
+        window_start = date_from
+        while window_start <= date_to:
+            window_end = min(window_start + timedelta(days=options['window'] - 1), date_to)
+            rows += rebuild_utilization(window_start, window_end, options['doctor'])
+            window_start = window_end + timedelta(days=1)
+        self.stdout.write(f"{date_from} to {date_to}: {rows} rollups in {time.perf_counter() - started:.1f} s")
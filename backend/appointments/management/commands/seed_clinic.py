@@ -0,0 +1,234 @@
+import random
+import time
+from datetime import date, datetime, timedelta
+from itertools import accumulate
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import router, transaction
+from django.db.models import Max
+
+from appointments.models import Appointment, Schedule
+from appointments.slots import materialize
+from core.models import Doctor, Pacient, Person, Specialty
+from core.search import index_persons, unindex_persons
+
+# Los usuarios generados se reconocen por el prefijo (--clear los elimina)
+USERNAME_PREFIX = 'seed_'
+
+SPECIALTIES = [
+    "Medicina General", "Pediatria", "Ginecologia", "Cardiologia", "Dermatologia", "Traumatologia",
+    "Oftalmologia", "Otorrinolaringologia", "Neurologia", "Psiquiatria", "Gastroenterologia",
+    "Endocrinologia", "Urologia", "Neumologia", "Reumatologia", "Nefrologia", "Oncologia",
+    "Hematologia", "Geriatria", "Infectologia", "Medicina Fisica", "Cirugia General", "Nutricion",
+    "Odontologia", "Psicologia",
+]
+FIRST_NAMES = [
+    "Jose", "Luis", "Carlos", "Juan", "Jorge", "Miguel", "Pedro", "Victor", "Cesar", "Manuel",
+    "Maria", "Rosa", "Ana", "Carmen", "Julia", "Elena", "Lucia", "Patricia", "Sofia", "Diana",
+]
+LAST_NAMES = [
+    "Quispe", "Flores", "Sanchez", "Rodriguez", "Garcia", "Huaman", "Mamani", "Rojas", "Chavez",
+    "Vasquez", "Ramirez", "Torres", "Mendoza", "Castillo", "Diaz", "Espinoza", "Gutierrez", "Lopez",
+    "Perez", "Ramos", "Vargas", "Cruz", "Gonzales", "Salazar", "Romero",
+]
+# Frecuencias aproximadas de la poblacion
+BLOOD_GROUPS = (['O+', 'A+', 'B+', 'AB+', 'O-', 'A-', 'B-', 'AB-'], [38, 34, 9, 3, 7, 6, 2, 1])
+GENDERS = (['F', 'M', 'O'], [52, 47, 1])
+ALLERGIES = ([None, "Penicilina", "AINEs", "Mariscos", "Polen", "Latex"], [70, 10, 6, 6, 5, 3])
+# Turnos de consulta (inicio, fin)
+SHIFTS = [("08:00", "13:00"), ("14:00", "19:00")]
+
+
+class Command(BaseCommand):
+    help = (
+        "Bulk-create a synthetic clinic: specialties, doctors with schedules, pacients and "
+        "appointments. Doctor load and pacient visits follow skewed (log-normal and Pareto) "
+        "distributions, appointments fall on free schedule slots, past appointments are "
+        "mostly completed and future ones pending, and the slot table is materialized. The "
+        "same --seed gives the same data."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--pacients', type=int, default=5000, help='Pacients (default: 5000).')
+        parser.add_argument('--doctors', type=int, default=100, help='Doctors (default: 100).')
+        parser.add_argument('--specialties', type=int, default=20,
+                            help=f'Specialties (default: 20; the first {len(SPECIALTIES)} have real names).')
+        parser.add_argument('--appointments', type=int, default=20000,
+                            help='Appointments (default: 20000).')
+        parser.add_argument('--days-back', type=int, default=180,
+                            help='Days of history before today (default: 180).')
+        parser.add_argument('--days-ahead', type=int, default=60,
+                            help='Days of agenda after today (default: 60).')
+        parser.add_argument('--seed', type=int, default=42, help='Random seed (default: 42).')
+        parser.add_argument('--batch-size', type=int, default=2000,
+                            help='Rows per INSERT (default: 2000).')
+        parser.add_argument('--clear', action='store_true',
+                            help='Delete the data of previous runs first.')
+
+    def handle(self, *args, **options):
+        self.random = random.Random(options['seed'])
+        self.batch_size = options['batch_size']
+        started = time.perf_counter()
+        with transaction.atomic():
+            if options['clear']:
+                self.clear()
+            specialties = self.create_specialties(options['specialties'])
+            persons = self.create_persons(options['pacients'] + options['doctors'])
+            pacients = Pacient.objects.bulk_create([
+                Pacient(person=person, blood_group=self.pick(BLOOD_GROUPS), allergies=self.pick(ALLERGIES),
+                        contact_phone=self.phone())
+                for person in persons[:options['pacients']]
+            ], batch_size=self.batch_size)
+            doctors = self.create_doctors(persons[options['pacients']:], specialties)
+            schedules = self.create_schedules(doctors, options['days_back'], options['days_ahead'])
+            appointments = self.create_appointments(pacients, doctors, options['appointments'],
+                                                    options['days_back'], options['days_ahead'])
+            # bulk_create no envia senales: la tabla de slots se materializa al final
+            today = date.today()
+            slots, _, _ = materialize(today - timedelta(days=options['days_back']),
+                                      today + timedelta(days=options['days_ahead']), [doctor.pk for doctor in doctors])
+        self.stdout.write(
+            f"{len(specialties)} specialties, {len(doctors)} doctors, {len(schedules)} schedules, "
+            f"{len(pacients)} pacients, {appointments} appointments, {slots} slots "
+            f"in {time.perf_counter() - started:.1f} s"
+        )
+
+    def pick(self, choices):
+        values, weights = choices
+        return self.random.choices(values, weights)[0]
+
+    def phone(self):
+        return f"9{self.random.randrange(10 ** 8):08d}"
+
+    def clear(self):
+        persons = list(Person.objects.filter(user__username__startswith=USERNAME_PREFIX).values_list('pk', flat=True))
+        # Cascada: persona, paciente, doctor, horarios y citas
+        User.objects.filter(username__startswith=USERNAME_PREFIX).delete()
+        unindex_persons(persons, router.db_for_write(Person))
+
+    def create_specialties(self, count):
+        names = SPECIALTIES[:count] + [f"Especialidad {index}" for index in range(len(SPECIALTIES), count)]
+        Specialty.objects.bulk_create([Specialty(description=name) for name in names], ignore_conflicts=True)
+        by_name = {specialty.description: specialty for specialty in Specialty.objects.filter(description__in=names)}
+        return [by_name[name] for name in names]
+
+    def create_persons(self, count):
+        # DNIs a continuacion del mayor registrado: no chocan con datos existentes
+        last_dni = Person.objects.aggregate(last=Max('dni'))['last']
+        first = int(last_dni) + 1 if last_dni else 10000000
+        if first + count > 10 ** 8:
+            raise CommandError("Not enough free DNIs for the requested rows.")
+        today = date.today()
+        password = make_password(None)
+        dnis = [f"{first + index:08d}" for index in range(count)]
+        users = User.objects.bulk_create([
+            User(username=f"{USERNAME_PREFIX}{dni}", email=f"{USERNAME_PREFIX}{dni}@clinic.test", password=password)
+            for dni in dnis
+        ], batch_size=self.batch_size)
+        persons = []
+        for user, dni in zip(users, dnis):
+            # Edad ~ normal(38, 18) entre 0 y 85 anos
+            age = min(85, max(0, int(self.random.gauss(38, 18))))
+            persons.append(Person(
+                user=user, dni=dni,
+                first_name=self.random.choice(FIRST_NAMES), last_name=self.random.choice(LAST_NAMES),
+                phone=self.phone(), gender=self.pick(GENDERS), direction=f"Av. Lima {self.random.randrange(1, 2000)}",
+                birth_date=today - timedelta(days=age * 365 + self.random.randrange(365)),
+            ))
+        persons = Person.objects.bulk_create(persons, batch_size=self.batch_size)
+        index_persons(persons, router.db_for_write(Person), created=True)
+        return persons
+
+    def create_doctors(self, persons, specialties):
+        doctors = Doctor.objects.bulk_create([
+            Doctor(person=person, cmp=f"S{person.dni}", rne=f"S{person.dni}" if self.random.random() < 0.4 else None)
+            for person in persons
+        ], batch_size=self.batch_size)
+        # Especialidades con popularidad tipo Zipf: la primera (medicina general) es la mas comun
+        weights = [1 / rank for rank in range(1, len(specialties) + 1)]
+        through = []
+        for doctor in doctors:
+            chosen = {self.random.choices(range(len(specialties)), weights)[0]
+                      for _ in range(self.random.choice([1, 1, 1, 2, 2, 3]))}
+            through += [Doctor.specialties.through(doctor=doctor, specialty=specialties[index]) for index in chosen]
+        Doctor.specialties.through.objects.bulk_create(through, batch_size=self.batch_size)
+        return doctors
+
+    def create_schedules(self, doctors, days_back, days_ahead):
+        today = date.today()
+        schedules = []
+        self.shifts = {}
+        for doctor in doctors:
+            # Uno o dos turnos por doctor en toda la ventana
+            shifts = self.random.sample(SHIFTS, self.random.choice([1, 1, 2]))
+            self.shifts[doctor.pk] = shifts
+            schedules += [
+                Schedule(doctor=doctor, description="Consulta externa",
+                         date_start=today - timedelta(days=days_back), date_end=today + timedelta(days=days_ahead),
+                         time_start=datetime.strptime(start, "%H:%M").time(),
+                         time_end=datetime.strptime(end, "%H:%M").time())
+                for start, end in shifts
+            ]
+        return Schedule.objects.bulk_create(schedules, batch_size=self.batch_size)
+
+    def slots(self, shifts):
+        step = timedelta(minutes=settings.APPOINTMENT_SLOT_MINUTES)
+        slots = []
+        for start, end in shifts:
+            current, end = datetime.strptime(start, "%H:%M"), datetime.strptime(end, "%H:%M")
+            while current + step <= end:
+                slots.append(current.time())
+                current += step
+        return slots
+
+    def create_appointments(self, pacients, doctors, count, days_back, days_ahead):
+        if not pacients or not doctors:
+            return 0
+        today = date.today()
+        # Dias habiles; el sabado con la mitad de demanda, el domingo cerrado
+        days = [today + timedelta(days=offset) for offset in range(-days_back, days_ahead + 1)]
+        days = [day for day in days if day.weekday() != 6]
+        day_weights = list(accumulate(0.5 if day.weekday() == 5 else 1.0 for day in days))
+        # Carga por doctor log-normal; visitas por paciente Pareto (pocos pacientes muy frecuentes)
+        doctor_weights = list(accumulate(self.random.lognormvariate(0, 0.8) for _ in doctors))
+        pacient_weights = list(accumulate(self.random.paretovariate(1.5) for _ in pacients))
+        doctor_slots = {doctor.pk: self.slots(self.shifts[doctor.pk]) for doctor in doctors}
+
+        taken = set()
+        batch, created = [], 0
+        for _ in range(count):
+            doctor = self.random.choices(doctors, cum_weights=doctor_weights)[0]
+            day = self.random.choices(days, cum_weights=day_weights)[0]
+            pacient = self.random.choices(pacients, cum_weights=pacient_weights)[0]
+            if day < today:
+                state = self.random.choices(['completed', 'cancelled', 'pending'], [80, 15, 5])[0]
+            else:
+                state = self.random.choices(['pending', 'cancelled'], [88, 12])[0]
+
+            scheduled_time = None
+            for _ in range(5):
+                candidate = self.random.choice(doctor_slots[doctor.pk])
+                if state == 'cancelled' or (doctor.pk, day, candidate) not in taken:
+                    scheduled_time = candidate
+                    break
+            if scheduled_time is None:
+                # Agenda llena ese dia: la cita se registra como cancelada
+                state, scheduled_time = 'cancelled', self.random.choice(doctor_slots[doctor.pk])
+            if state in Appointment.BOOKED_STATES:
+                taken.add((doctor.pk, day, scheduled_time))
+
+            batch.append(Appointment(
+                doctor=doctor, pacient=pacient, scheduled_date=day, scheduled_time=scheduled_time, state=state,
+                # Una cita futura se cancela antes de hoy, nunca despues
+                cancelled_date=min(day, today) - timedelta(days=self.random.randrange(0, 8))
+                if state == 'cancelled' else None,
+            ))
+            if len(batch) == self.batch_size:
+                created += len(Appointment.objects.bulk_create(batch))
+                batch = []
+        if batch:
+            created += len(Appointment.objects.bulk_create(batch))
+        return created
@@ -0,0 +1,115 @@
+import logging
+import queue
+import threading
+import time
+import uuid
+from datetime import date, datetime, timedelta
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from appointments.models import Schedule, Appointment
+from core.models import Person, Doctor, Pacient
+
+
+class Command(BaseCommand):
+    help = (
+        "Concurrent booking stress test against add_appointment. Every slot is requested "
+        "--attempts times so colliding bookings race; reports throughput per worker count. "
+        "Creates throwaway fixtures in the configured database and removes them at the end."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', default='1,2,4,8',
+                            help='Comma separated worker counts to run (default: 1,2,4,8).')
+        parser.add_argument('--slots', type=int, default=200,
+                            help='Distinct slots requested per run (default: 200).')
+        parser.add_argument('--attempts', type=int, default=2,
+                            help='Booking attempts per slot (default: 2).')
+
+    def handle(self, *args, **options):
+        worker_counts = [int(value) for value in options['workers'].split(',')]
+        # Los 409 son esperados: no registrar cada uno como warning
+        logging.getLogger('django.request').setLevel(logging.ERROR)
+        suffix = uuid.uuid4().hex[:8]
+        staff = User.objects.create(username=f"stress_staff_{suffix}", is_staff=True)
+        doctor_person = Person.objects.create(first_name="Stress", last_name=suffix)
+        doctor = Doctor.objects.create(person=doctor_person)
+        pacient_user = User.objects.create(username=f"stress_pacient_{suffix}")
+        pacient_person = Person.objects.create(user=pacient_user)
+        pacient = Pacient.objects.create(person=pacient_person)
+
+        slot = timedelta(minutes=settings.APPOINTMENT_SLOT_MINUTES)
+        day_start = datetime.combine(date.today(), datetime.min.time()).replace(hour=8)
+        slots_per_day = int(timedelta(hours=12) / slot)
+        days = options['slots'] // slots_per_day + 1
+        Schedule.objects.create(doctor=doctor, date_start=day_start.date(),
+                                date_end=day_start.date() + timedelta(days=days),
+                                time_start=day_start.time(),
+                                time_end=(day_start + timedelta(hours=12)).time())
+        slots = [
+            day_start + timedelta(days=index // slots_per_day) + (index % slots_per_day) * slot
+            for index in range(options['slots'])
+        ]
+
+        try:
+            self.stdout.write(f"{'workers':>8} {'requests':>9} {'created':>8} {'conflicts':>10} "
+                              f"{'errors':>7} {'seconds':>8} {'req/s':>8}")
+            for workers in worker_counts:
+                Appointment.objects.filter(doctor=doctor).delete()
+                result = self.run(workers, slots, options['attempts'], doctor, pacient, staff)
+                self.stdout.write(
+                    f"{workers:>8} {result['requests']:>9} {result[201]:>8} {result[409]:>10} "
+                    f"{result['errors']:>7} {result['seconds']:>8.2f} "
+                    f"{result['requests'] / result['seconds']:>8.1f}"
+                )
+        finally:
+            doctor_person.delete()
+            pacient_person.delete()
+            User.objects.filter(id__in=[staff.id, pacient_user.id]).delete()
+
+    def run(self, workers, slots, attempts, doctor, pacient, staff):
+        pending = queue.Queue()
+        for start in slots:
+            for _ in range(attempts):
+                pending.put(start)
+
+        counts = {201: 0, 409: 0, 'errors': 0}
+        lock = threading.Lock()
+        url = reverse('add_appointment')
+
+        def worker():
+            # 'testserver' no esta en ALLOWED_HOSTS fuera del runner de tests
+            client = APIClient(SERVER_NAME='localhost')
+            client.force_authenticate(staff)
+            try:
+                while True:
+                    try:
+                        start = pending.get_nowait()
+                    except queue.Empty:
+                        return
+                    response = client.post(url, {
+                        'doctor': doctor.pk,
+                        'pacient': pacient.pk,
+                        'scheduled_date': start.date().isoformat(),
+                        'scheduled_time': start.time().isoformat(),
+                    })
+                    with lock:
+                        key = response.status_code if response.status_code in counts else 'errors'
+                        counts[key] += 1
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=worker) for _ in range(workers)]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        counts['seconds'] = time.perf_counter() - started
+        counts['requests'] = len(slots) * attempts
+        return counts
@@ -0,0 +1,27 @@
+# Generated by Django 5.1.15 on 2026-10-18 18:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('appointments', '0003_delete_doctorhasespeciality_delete_especiality'),
+        ('core', '0008_rename_especialty_specialty_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='appointment',
+            name='scheduled_time',
+            field=models.TimeField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='appointment',
+            index=models.Index(fields=['doctor', 'scheduled_date', 'state'], name='appointment_doctor_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='schedule',
+            index=models.Index(fields=['doctor', 'date_start', 'date_end'], name='schedule_doctor_range_idx'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.1.15 on 2026-10-18 18:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('appointments', '0004_schedule_appointment_indexes'),
+        ('core', '0008_rename_especialty_specialty_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='appointment',
+            name='version',
+            field=models.PositiveIntegerField(default=1),
+        ),
+        migrations.AddConstraint(
+            model_name='appointment',
+            constraint=models.UniqueConstraint(condition=models.Q(('scheduled_time__isnull', False), ('state__in', ['pending', 'completed'])), fields=('doctor', 'scheduled_date', 'scheduled_time'), name='appointment_unique_booked_slot', violation_error_message='The doctor already has an appointment in this slot.'),
+        ),
+    ]
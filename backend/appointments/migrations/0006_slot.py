@@ -0,0 +1,32 @@
+# Generated by Django 5.1.15 on 2026-10-18 20:02
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+# La tabla nace vacia. En una base con horarios, despues de migrar:
+#   manage.py materialize_slots
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('appointments', '0005_appointment_booking_constraint'),
+        ('core', '0011_person_updated_at_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Slot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('start', models.DateTimeField()),
+                ('duration', models.PositiveSmallIntegerField()),
+                ('status', models.CharField(choices=[('free', 'Free'), ('booked', 'Booked')], default='free', max_length=6)),
+                ('doctor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='doctor_slot', to='core.doctor')),
+            ],
+            options={
+                'indexes': [models.Index(condition=models.Q(('status', 'free')), fields=['doctor', 'start'], name='slot_free_doctor_start_idx'), models.Index(condition=models.Q(('status', 'free')), fields=['start'], name='slot_free_start_idx')],
+                'constraints': [models.UniqueConstraint(fields=('doctor', 'start'), name='slot_unique_doctor_start')],
+            },
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 5.1.15 on 2026-10-18 20:07
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('appointments', '0006_slot'),
+        ('core', '0011_person_updated_at_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TransitionBatch',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('run', models.UUIDField(db_index=True)),
+                ('source', models.CharField(max_length=20)),
+                ('from_states', models.JSONField(default=list)),
+                ('to_state', models.CharField(choices=[('pending', 'Pending'), ('cancelled', 'Cancelled'), ('completed', 'Completed')], max_length=10)),
+                ('criteria', models.JSONField(default=dict)),
+                ('count', models.PositiveIntegerField()),
+                ('first_appointment', models.BigIntegerField()),
+                ('last_appointment', models.BigIntegerField()),
+                ('register_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='appointment',
+            index=models.Index(condition=models.Q(('state', 'pending')), fields=['scheduled_date'], name='appointment_pending_date_idx'),
+        ),
+        migrations.AddField(
+            model_name='transitionbatch',
+            name='user',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='appointment_transitions', to=settings.AUTH_USER_MODEL),
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.1.15 on 2026-10-18 20:09
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+# La tabla nace vacia. En una base con citas, despues de migrar:
+#   manage.py materialize_slots && manage.py rebuild_utilization
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('appointments', '0007_transition_batch'),
+        ('core', '0011_person_updated_at_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Utilization',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('slots', models.PositiveIntegerField(default=0)),
+                ('booked', models.PositiveIntegerField(default=0)),
+                ('completed', models.PositiveIntegerField(default=0)),
+                ('cancelled', models.PositiveIntegerField(default=0)),
+                ('doctor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='doctor_utilization', to='core.doctor')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['day'], name='utilization_day_idx')],
+                'constraints': [models.UniqueConstraint(fields=('doctor', 'day'), name='utilization_unique_doctor_day')],
+            },
+        ),
+    ]
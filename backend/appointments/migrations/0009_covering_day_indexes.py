@@ -0,0 +1,27 @@
+# Generated by Django 5.1.15 on 2026-10-18 20:12
+
+import core.indexes
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('appointments', '0008_utilization'),
+        ('core', '0011_person_updated_at_index'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='appointment',
+            name='appointment_doctor_date_idx',
+        ),
+        migrations.AddIndex(
+            model_name='appointment',
+            index=core.indexes.CoveringIndex(covering=('id', 'state', 'pacient', 'version'), fields=['doctor', 'scheduled_date', 'scheduled_time'], name='appointment_doctor_day_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='appointment',
+            index=core.indexes.CoveringIndex(covering=('id', 'state', 'doctor', 'version'), fields=['pacient', 'scheduled_date', 'scheduled_time'], name='appointment_pacient_day_idx'),
+        ),
+    ]
@@ -1,4 +1,6 @@
+from django.conf import settings
 from django.db import models
+from core.indexes import CoveringIndex
 from core.models import Doctor, Pacient
 
 
@@ -14,6 +16,12 @@ class Schedule(models.Model):
     updated_at = models.DateTimeField(auto_now=True)
     is_active = models.BooleanField(default=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['doctor', 'date_start', 'date_end'],
+                         name='schedule_doctor_range_idx'),
+        ]
+
     def __str__(self):
         first_name = self.doctor.person.first_name or "Unknown"
         last_name = self.doctor.person.last_name or "Unknown"
@@ -26,18 +34,131 @@ class Appointment(models.Model):
         ('cancelled', 'Cancelled'),
         ('completed', 'Completed'),
     ]
+    # Estados que ocupan el slot del doctor
+    BOOKED_STATES = ['pending', 'completed']
 
     doctor = models.ForeignKey(Doctor, on_delete=models.CASCADE,
                                related_name='doctor_appointment')
     pacient = models.ForeignKey(Pacient, on_delete=models.CASCADE,
                                 related_name='pacient_appointment')
     scheduled_date = models.DateField()
+    scheduled_time = models.TimeField(blank=True, null=True)
     cancelled_date = models.DateField(blank=True, null=True)
     register_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     state = models.CharField(max_length=10, choices=APPOINTMENT_STATE_CHOICES, default='pending')
+    # Control de concurrencia optimista: se incrementa en cada actualizacion
+    version = models.PositiveIntegerField(default=1)
+
+    class Meta:
+        indexes = [
+            # Cubrientes (INCLUDE en PostgreSQL; en otros motores solo las claves): la agenda
+            # de un doctor y las proximas citas de un paciente se leen solo del indice
+            CoveringIndex(fields=['doctor', 'scheduled_date', 'scheduled_time'],
+                          covering=['id', 'state', 'pacient', 'version'],
+                          name='appointment_doctor_day_idx'),
+            CoveringIndex(fields=['pacient', 'scheduled_date', 'scheduled_time'],
+                          covering=['id', 'state', 'doctor', 'version'],
+                          name='appointment_pacient_day_idx'),
+            # Cierre del dia: citas pendientes hasta una fecha (appointments.transitions)
+            models.Index(fields=['scheduled_date'], condition=models.Q(state='pending'),
+                         name='appointment_pending_date_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['doctor', 'scheduled_date', 'scheduled_time'],
+                condition=models.Q(state__in=['pending', 'completed'],
+                                   scheduled_time__isnull=False),
+                name='appointment_unique_booked_slot',
+                violation_error_message='The doctor already has an appointment in this slot.',
+            ),
+        ]
 
     def __str__(self):
         doctor_name = f"{self.doctor.person.first_name} {self.doctor.person.last_name}"
         pacient_name = f"{self.pacient.person.first_name} {self.pacient.person.last_name}"
         return f"Appointment: Doctor {doctor_name} - Pacient {pacient_name} on {self.scheduled_date}"
+
+
+class Slot(models.Model):
+    """
+    Slot of a doctor's agenda, materialized from the active schedules by
+    ``appointments.slots`` so bookings and availability read single rows
+    instead of expanding the schedules on every request.
+    """
+    FREE = 'free'
+    BOOKED = 'booked'
+    STATUS_CHOICES = [
+        (FREE, 'Free'),
+        (BOOKED, 'Booked'),
+    ]
+
+    doctor = models.ForeignKey(Doctor, on_delete=models.CASCADE,
+                               related_name='doctor_slot')
+    start = models.DateTimeField()
+    # Minutos
+    duration = models.PositiveSmallIntegerField()
+    status = models.CharField(max_length=6, choices=STATUS_CHOICES, default=FREE)
+
+    class Meta:
+        indexes = [
+            # Parciales: "proximo slot libre" y disponibilidad por rango son un index seek
+            models.Index(fields=['doctor', 'start'], condition=models.Q(status='free'),
+                         name='slot_free_doctor_start_idx'),
+            models.Index(fields=['start'], condition=models.Q(status='free'),
+                         name='slot_free_start_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['doctor', 'start'], name='slot_unique_doctor_start'),
+        ]
+
+    def __str__(self):
+        return f"Slot of doctor {self.doctor_id} at {self.start} ({self.status})"
+
+
+class TransitionBatch(models.Model):
+    """
+    Audit row of one batch of a bulk state transition
+    (``appointments.transitions``): one row per batch, not per appointment.
+    """
+    # Todos los lotes de una misma ejecucion comparten run
+    run = models.UUIDField(db_index=True)
+    source = models.CharField(max_length=20)
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL,
+                             blank=True, null=True, related_name='appointment_transitions')
+    from_states = models.JSONField(default=list)
+    to_state = models.CharField(max_length=10, choices=Appointment.APPOINTMENT_STATE_CHOICES)
+    criteria = models.JSONField(default=dict)
+    count = models.PositiveIntegerField()
+    first_appointment = models.BigIntegerField()
+    last_appointment = models.BigIntegerField()
+    register_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.count} appointments to {self.to_state} ({self.source}, run {self.run})"
+
+
+class Utilization(models.Model):
+    """
+    Daily rollup per doctor, kept up to date by ``appointments.utilization``:
+    slots of the agenda, slots booked and appointments completed and
+    cancelled that day. Per specialty it is read through ``Doctor.specialties``.
+    """
+    doctor = models.ForeignKey(Doctor, on_delete=models.CASCADE,
+                               related_name='doctor_utilization')
+    day = models.DateField()
+    slots = models.PositiveIntegerField(default=0)
+    booked = models.PositiveIntegerField(default=0)
+    completed = models.PositiveIntegerField(default=0)
+    cancelled = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['day'], name='utilization_day_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['doctor', 'day'], name='utilization_unique_doctor_day'),
+        ]
+
+    def __str__(self):
+        return f"Doctor {self.doctor_id} on {self.day}: {self.booked}/{self.slots} slots booked"
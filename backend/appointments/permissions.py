@@ -0,0 +1,64 @@
+from django.db.models import Q
+from rest_framework.permissions import BasePermission
+
+from core.models import Person
+from .models import Appointment
+
+
+def own_person_id(user):
+    """Primary key of the user's person, ``None`` if the user has none."""
+    return Person.objects.filter(user=user).values_list('pk', flat=True).first()
+
+
+class IsStaffOrOwnPerson(BasePermission):
+    """
+    Staff, or the user whose person is the doctor or pacient of the URL
+    (``person_kwarg``): doctors and pacients share the primary key of their
+    person.
+    """
+    person_kwarg = None
+
+    def has_permission(self, request, view):
+        user = request.user
+        if not (user and user.is_authenticated):
+            return False
+        if user.is_staff:
+            return True
+        return Person.objects.filter(pk=view.kwargs.get(self.person_kwarg), user=user).exists()
+
+
+class IsStaffOrDoctor(IsStaffOrOwnPerson):
+    person_kwarg = 'doctor_id'
+
+
+class IsStaffOrPacient(IsStaffOrOwnPerson):
+    person_kwarg = 'pacient_id'
+
+
+class IsStaffOrBookingPacient(BasePermission):
+    """Staff, or a pacient booking for themselves (``pacient`` of the body)."""
+
+    def has_permission(self, request, view):
+        user = request.user
+        if not (user and user.is_authenticated):
+            return False
+        if user.is_staff:
+            return True
+        person_id = own_person_id(user)
+        return person_id is not None and str(request.data.get('pacient')) == str(person_id)
+
+
+class IsStaffOrAppointmentParty(BasePermission):
+    """Staff, or the pacient or doctor of the appointment of the URL."""
+
+    def has_permission(self, request, view):
+        user = request.user
+        if not (user and user.is_authenticated):
+            return False
+        if user.is_staff:
+            return True
+        person_id = own_person_id(user)
+        # Un 403 tambien para citas inexistentes: no revela que ids existen
+        return person_id is not None and Appointment.objects.filter(
+            Q(pacient_id=person_id) | Q(doctor_id=person_id), pk=view.kwargs.get('appointment_id'),
+        ).exists()
@@ -1,8 +1,15 @@
 from .models import Schedule, Appointment
 from rest_framework import serializers
-from rest_framework.exceptions import ValidationError
-from datetime import date, datetime
+from rest_framework.exceptions import APIException, ValidationError
+from rest_framework import status
+from datetime import date, datetime, timedelta
+from django.conf import settings
+from django.db.models import F
+from django.utils import timezone
 from core.serializers import DoctorSerializer, PacientSerializer
+from .slots import claim_slot, materialize, slot_exists, sync_slot
+from .transitions import TRANSITIONS
+from .utilization import add_utilization, refresh_utilization
 
 
 class ScheduleSerializer(serializers.ModelSerializer):
@@ -77,3 +84,193 @@ class AppointmentSerializer(serializers.ModelSerializer):
             raise ValidationError(
                 "The state should be one of the following: pending, cancelled, completed.")
         return value
+
+
+class AvailabilityQuerySerializer(serializers.Serializer):
+    MAX_RANGE_DAYS = 92
+
+    date_from = serializers.DateField()
+    date_to = serializers.DateField()
+    doctor = serializers.ListField(child=serializers.IntegerField(min_value=1), required=False)
+
+    def validate(self, data):
+        if data['date_from'] > data['date_to']:
+            raise ValidationError('The date to should be greater than the date from.')
+        if (data['date_to'] - data['date_from']).days > self.MAX_RANGE_DAYS:
+            raise ValidationError(
+                f'The range must have a maximum of {self.MAX_RANGE_DAYS} days.')
+        return data
+
+
+class UtilizationQuerySerializer(serializers.Serializer):
+    MAX_RANGE_DAYS = 366
+
+    date_from = serializers.DateField()
+    date_to = serializers.DateField()
+    group = serializers.ChoiceField(choices=['doctor', 'specialty'], default='doctor')
+    by_day = serializers.BooleanField(default=False)
+    doctor = serializers.ListField(child=serializers.IntegerField(min_value=1), required=False)
+    specialty = serializers.ListField(child=serializers.IntegerField(min_value=1), required=False)
+
+    def validate(self, data):
+        if data['date_from'] > data['date_to']:
+            raise ValidationError('The date to should be greater than the date from.')
+        if (data['date_to'] - data['date_from']).days > self.MAX_RANGE_DAYS:
+            raise ValidationError(
+                f'The range must have a maximum of {self.MAX_RANGE_DAYS} days.')
+        return data
+
+
+class DoctorAgendaQuerySerializer(serializers.Serializer):
+    date = serializers.DateField(required=False)
+    state = serializers.ListField(child=serializers.ChoiceField(choices=Appointment.APPOINTMENT_STATE_CHOICES),
+                                  required=False)
+
+
+class PacientUpcomingQuerySerializer(serializers.Serializer):
+    since = serializers.DateField(required=False)
+    limit = serializers.IntegerField(min_value=1, max_value=100, default=20)
+
+
+class NextSlotQuerySerializer(serializers.Serializer):
+    after = serializers.DateTimeField(required=False)
+
+
+class BulkTransitionSerializer(serializers.Serializer):
+    MAX_IDS = 5000
+
+    state = serializers.ChoiceField(choices=sorted(TRANSITIONS))
+    ids = serializers.ListField(child=serializers.IntegerField(min_value=1), required=False,
+                                max_length=MAX_IDS)
+    doctor = serializers.ListField(child=serializers.IntegerField(min_value=1), required=False)
+    date_from = serializers.DateField(required=False)
+    date_to = serializers.DateField(required=False)
+
+    def validate(self, data):
+        # Sin ids ni fecha final la transicion alcanzaria toda la tabla
+        if not data.get('ids') and 'date_to' not in data:
+            raise ValidationError('Either ids or date_to is required.')
+        if 'date_from' in data and 'date_to' in data and data['date_from'] > data['date_to']:
+            raise ValidationError('The date to should be greater than the date from.')
+        return data
+
+    def get_criteria(self):
+        """``filter()`` arguments of the transition, JSON serializable for the audit rows."""
+        data = self.validated_data
+        criteria = {}
+        if data.get('ids'):
+            criteria['pk__in'] = sorted(set(data['ids']))
+        if data.get('doctor'):
+            criteria['doctor_id__in'] = sorted(set(data['doctor']))
+        if 'date_from' in data:
+            criteria['scheduled_date__gte'] = data['date_from'].isoformat()
+        if 'date_to' in data:
+            criteria['scheduled_date__lte'] = data['date_to'].isoformat()
+        return criteria
+
+
+class AppointmentConflict(APIException):
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = 'The appointment was modified by another request.'
+    default_code = 'conflict'
+
+
+class SlotTaken(AppointmentConflict):
+    default_detail = 'The doctor already has an appointment in this slot.'
+
+
+def claim(doctor_id, scheduled_date, scheduled_time):
+    """
+    Books the slot (``appointments.slots.claim_slot``) or raises why it
+    cannot be booked. A missing slot materializes the doctor's day once
+    before the booking is rejected, in case the day was never materialized
+    (bulk loads, an upgraded database).
+    """
+    if claim_slot(doctor_id, scheduled_date, scheduled_time):
+        return
+    if not slot_exists(doctor_id, scheduled_date, scheduled_time):
+        materialize(scheduled_date, scheduled_date, [doctor_id], {scheduled_date})
+        if claim_slot(doctor_id, scheduled_date, scheduled_time):
+            return
+        if not slot_exists(doctor_id, scheduled_date, scheduled_time):
+            raise ValidationError("The doctor has no active schedule for this slot.")
+    raise SlotTaken()
+
+
+class AppointmentBookingSerializer(serializers.ModelSerializer):
+    scheduled_time = serializers.TimeField()
+
+    class Meta:
+        model = Appointment
+        fields = ['id', 'doctor', 'pacient', 'scheduled_date', 'scheduled_time', 'state', 'version']
+        read_only_fields = ['id', 'state', 'version']
+        # La unicidad del slot la garantiza el constraint de la base de datos,
+        # sin la consulta previa (check-then-insert) que generaria DRF.
+        validators = []
+
+    def validate(self, data):
+        scheduled_date = data.get('scheduled_date', getattr(self.instance, 'scheduled_date', None))
+        scheduled_time = data.get('scheduled_time', getattr(self.instance, 'scheduled_time', None))
+        # Citas antiguas pueden no tener hora: al moverlas hay que indicar fecha y hora
+        if scheduled_date is None or scheduled_time is None:
+            raise ValidationError("The scheduled date and time are required.")
+
+        start = datetime.combine(scheduled_date, scheduled_time)
+        end = start + timedelta(minutes=settings.APPOINTMENT_SLOT_MINUTES)
+        if end.date() != start.date():
+            raise ValidationError("The appointment must end on the scheduled date.")
+        return data
+
+    def create(self, validated_data):
+        # El slot materializado es el horario: si no existe o esta ocupado, el UPDATE no afecta filas
+        claim(validated_data['doctor'].pk, validated_data['scheduled_date'], validated_data['scheduled_time'])
+        appointment = Appointment(**validated_data)
+        appointment._slot_synced = True
+        appointment.save(force_insert=True)
+        add_utilization(appointment.doctor_id, appointment.scheduled_date, booked=1)
+        return appointment
+
+
+class AppointmentUpdateSerializer(AppointmentBookingSerializer):
+    version = serializers.IntegerField(min_value=1)
+    state = serializers.ChoiceField(choices=Appointment.APPOINTMENT_STATE_CHOICES, required=False)
+
+    class Meta(AppointmentBookingSerializer.Meta):
+        fields = ['scheduled_date', 'scheduled_time', 'state', 'version']
+        read_only_fields = []
+
+    def validate(self, data):
+        # En PATCH (partial) ningun campo es obligatorio, salvo la version
+        if 'version' not in data:
+            raise ValidationError({'version': 'The version is required.'})
+        if 'scheduled_date' in data or 'scheduled_time' in data:
+            return super().validate(data)
+        return data
+
+    def update(self, instance, validated_data):
+        version = validated_data.pop('version')
+        if validated_data.get('state') == 'cancelled':
+            validated_data.setdefault('cancelled_date', timezone.localdate())
+
+        previous = (instance.doctor_id, instance.scheduled_date, instance.scheduled_time)
+        current = (instance.doctor_id,
+                   validated_data.get('scheduled_date', instance.scheduled_date),
+                   validated_data.get('scheduled_time', instance.scheduled_time))
+        booked = validated_data.get('state', instance.state) in Appointment.BOOKED_STATES
+        moved = current != previous or instance.state not in Appointment.BOOKED_STATES
+        if booked and moved and current[2] is not None:
+            claim(*current)
+
+        # UPDATE condicional: solo aplica si nadie modifico la cita desde que se leyo
+        updated = Appointment.objects.filter(pk=instance.pk, version=version).update(
+            version=F('version') + 1,
+            updated_at=timezone.now(),
+            **validated_data,
+        )
+        if not updated:
+            raise AppointmentConflict()
+        if current != previous or not booked:
+            sync_slot(*previous)
+        refresh_utilization({previous[:2], current[:2]})
+        instance.refresh_from_db()
+        return instance
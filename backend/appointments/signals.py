@@ -0,0 +1,66 @@
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from .models import Appointment, Schedule
+from .slots import SCHEDULE_FIELDS, refresh_schedule, sync_slot
+from .utilization import refresh_utilization
+
+
+# Tabla de slots, en la misma transaccion que el cambio.
+# bulk_create y update() no envian senales: usar materialize() o el comando materialize_slots
+def schedule_state(schedule):
+    return {name: Schedule._meta.get_field(name.removesuffix('_id')).to_python(getattr(schedule, name))
+            for name in SCHEDULE_FIELDS}
+
+
+def appointment_slot(appointment):
+    return (appointment.doctor_id,
+            Appointment._meta.get_field('scheduled_date').to_python(appointment.scheduled_date),
+            Appointment._meta.get_field('scheduled_time').to_python(appointment.scheduled_time))
+
+
+@receiver(pre_save, sender=Schedule)
+def remember_schedule(sender, instance, raw, using, **kwargs):
+    instance._previous_schedule = None
+    if not raw and not instance._state.adding:
+        instance._previous_schedule = sender.objects.using(using).filter(pk=instance.pk).values(*SCHEDULE_FIELDS).first()
+
+
+@receiver(post_save, sender=Schedule)
+def schedule_saved(sender, instance, raw, **kwargs):
+    if not raw:
+        refresh_schedule(getattr(instance, '_previous_schedule', None), schedule_state(instance))
+
+
+@receiver(post_delete, sender=Schedule)
+def schedule_deleted(sender, instance, **kwargs):
+    refresh_schedule(schedule_state(instance), None)
+
+
+# Las reservas de la API ya ocupan el slot con un UPDATE condicional (_slot_synced)
+@receiver(pre_save, sender=Appointment)
+def remember_appointment_slot(sender, instance, raw, using, **kwargs):
+    instance._previous_slot = None
+    if not raw and not instance._state.adding and not getattr(instance, '_slot_synced', False):
+        instance._previous_slot = (sender.objects.using(using).filter(pk=instance.pk)
+                                   .values_list('doctor_id', 'scheduled_date', 'scheduled_time').first())
+
+
+@receiver(post_save, sender=Appointment)
+def appointment_saved(sender, instance, raw, **kwargs):
+    if raw or getattr(instance, '_slot_synced', False):
+        instance._slot_synced = False
+        return
+    current = appointment_slot(instance)
+    previous = getattr(instance, '_previous_slot', None)
+    sync_slot(*current)
+    if previous and previous != current:
+        sync_slot(*previous)
+    refresh_utilization([current[:2]] + ([previous[:2]] if previous else []))
+
+
+@receiver(post_delete, sender=Appointment)
+def appointment_deleted(sender, instance, **kwargs):
+    current = appointment_slot(instance)
+    sync_slot(*current)
+    refresh_utilization([current[:2]])
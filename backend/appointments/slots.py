@@ -0,0 +1,169 @@
+from collections import defaultdict
+from datetime import datetime, time, timedelta
+
+from django.db import router, transaction
+from django.db.models import Case, Exists, Value, When
+from django.utils import timezone
+
+from .availability import IntervalTree, booked_intervals, slot_duration
+from .models import Appointment, Schedule, Slot
+from .utilization import rebuild_utilization, refresh_utilization
+
+BATCH_SIZE = 2000
+
+# Campos de Schedule que determinan sus slots
+SCHEDULE_FIELDS = ('doctor_id', 'date_start', 'date_end', 'time_start', 'time_end', 'is_active')
+
+
+def slot_start(day, start_time):
+    """Aware start of the slot of ``day`` at ``start_time`` (local time)."""
+    return timezone.make_aware(datetime.combine(day, start_time))
+
+
+def expand(schedules, date_from, date_to, duration):
+    """
+    Set of ``(doctor_id, start)`` of the slot grid of ``schedules`` (rows of
+    ``SCHEDULE_FIELDS[:5]``) between ``date_from`` and ``date_to``, with
+    naive local starts.
+    """
+    starts = set()
+    for doctor_id, date_start, date_end, time_start, time_end in schedules:
+        day = max(date_start, date_from)
+        last_day = min(date_end, date_to)
+        while day <= last_day:
+            start = datetime.combine(day, time_start)
+            day_end = datetime.combine(day, time_end)
+            while start + duration <= day_end:
+                starts.add((doctor_id, start))
+                start += duration
+            day += timedelta(days=1)
+    return starts
+
+
+def materialize(date_from, date_to, doctor_ids=None, days=None):
+    """
+    Brings the slots between ``date_from`` and ``date_to`` (only those of
+    ``days`` when given) in line with the active schedules and the booked
+    appointments: creates the missing ones, deletes the free ones no
+    schedule covers any more and fixes status and duration of the rest.
+
+    A slot outside every schedule that still holds a booked appointment is
+    kept as booked. Runs three reads whatever the range, refreshes the
+    utilization rollups of the same days and returns
+    ``(created, updated, deleted)``.
+    """
+    duration = slot_duration()
+    minutes = duration // timedelta(minutes=1)
+    schedules = Schedule.objects.filter(is_active=True, date_start__lte=date_to, date_end__gte=date_from)
+    existing = Slot.objects.filter(start__gte=slot_start(date_from, time.min),
+                                   start__lt=slot_start(date_to + timedelta(days=1), time.min))
+    if doctor_ids is not None:
+        schedules = schedules.filter(doctor_id__in=doctor_ids)
+        existing = existing.filter(doctor_id__in=doctor_ids)
+
+    wanted = expand(schedules.values_list(*SCHEDULE_FIELDS[:5]), date_from, date_to, duration)
+    if days is not None:
+        wanted = {key for key in wanted if key[1].date() in days}
+    booked = booked_intervals(date_from, date_to, doctor_ids, duration)
+    empty = IntervalTree()
+
+    def status(doctor_id, start, length):
+        return Slot.BOOKED if booked.get(doctor_id, empty).overlaps(start, start + length) else Slot.FREE
+
+    changes, deleted = defaultdict(list), []
+    rows = existing.values_list('pk', 'doctor_id', 'start', 'duration', 'status')
+    for pk, doctor_id, start, length, current in rows.iterator():
+        start = timezone.make_naive(start)
+        if days is not None and start.date() not in days:
+            continue
+        if (doctor_id, start) in wanted:
+            wanted.discard((doctor_id, start))
+            expected = (status(doctor_id, start, duration), minutes)
+        elif status(doctor_id, start, timedelta(minutes=length)) == Slot.BOOKED:
+            expected = (Slot.BOOKED, length)
+        else:
+            deleted.append(pk)
+            continue
+        if expected != (current, length):
+            changes[expected].append(pk)
+
+    using = router.db_for_write(Slot)
+    with transaction.atomic(using=using):
+        for index in range(0, len(deleted), BATCH_SIZE):
+            Slot.objects.using(using).filter(pk__in=deleted[index:index + BATCH_SIZE]).delete()
+        for (new_status, length), pks in changes.items():
+            for index in range(0, len(pks), BATCH_SIZE):
+                Slot.objects.using(using).filter(pk__in=pks[index:index + BATCH_SIZE]).update(
+                    status=new_status, duration=length)
+        # ignore_conflicts: una reserva o materializacion concurrente pudo crear el mismo slot
+        Slot.objects.using(using).bulk_create([
+            Slot(doctor_id=doctor_id, start=timezone.make_aware(start), duration=minutes,
+                 status=status(doctor_id, start, duration))
+            for doctor_id, start in sorted(wanted)
+        ], batch_size=BATCH_SIZE, ignore_conflicts=True)
+        if days is None or doctor_ids is None:
+            rebuild_utilization(date_from, date_to, doctor_ids)
+        else:
+            refresh_utilization((doctor_id, day) for doctor_id in doctor_ids for day in days)
+    return len(wanted), sum(len(pks) for pks in changes.values()), len(deleted)
+
+
+def schedule_days(state):
+    """Days covered by a schedule (``dict`` of ``SCHEDULE_FIELDS``); none if it is absent or inactive."""
+    if state is None or not state['is_active']:
+        return set()
+    span = (state['date_end'] - state['date_start']).days
+    return {state['date_start'] + timedelta(days=offset) for offset in range(span + 1)}
+
+
+def affected_days(previous, current):
+    """
+    ``{doctor_id: days}`` whose slots change when a schedule goes from
+    ``previous`` to ``current`` (``None`` when it did not or no longer
+    exists). With the same doctor and hours only the days added to or
+    removed from the range change.
+    """
+    before, after = schedule_days(previous), schedule_days(current)
+    if previous and current and all(previous[field] == current[field]
+                                    for field in ('doctor_id', 'time_start', 'time_end')):
+        return {current['doctor_id']: before ^ after}
+    days = defaultdict(set)
+    if previous:
+        days[previous['doctor_id']] |= before
+    if current:
+        days[current['doctor_id']] |= after
+    return days
+
+
+def refresh_schedule(previous, current):
+    """Materializes only the days of the doctors touched by a schedule change (see ``affected_days``)."""
+    for doctor_id, days in affected_days(previous, current).items():
+        if days:
+            materialize(min(days), max(days), [doctor_id], days)
+
+
+def claim_slot(doctor_id, day, start_time):
+    """
+    Books the slot with a single conditional UPDATE. False when the slot
+    is already booked or does not exist (no active schedule covers it).
+    """
+    return bool(
+        Slot.objects
+        .filter(doctor_id=doctor_id, start=slot_start(day, start_time), status=Slot.FREE)
+        .update(status=Slot.BOOKED)
+    )
+
+
+def slot_exists(doctor_id, day, start_time):
+    return Slot.objects.filter(doctor_id=doctor_id, start=slot_start(day, start_time)).exists()
+
+
+def sync_slot(doctor_id, day, start_time):
+    """Sets the status of a slot from the appointments that hold it (one UPDATE)."""
+    if start_time is None:
+        return
+    booked = Appointment.objects.filter(doctor_id=doctor_id, scheduled_date=day, scheduled_time=start_time,
+                                        state__in=Appointment.BOOKED_STATES)
+    Slot.objects.filter(doctor_id=doctor_id, start=slot_start(day, start_time)).update(
+        status=Case(When(Exists(booked), then=Value(Slot.BOOKED)), default=Value(Slot.FREE)),
+    )
@@ -1,3 +1,677 @@
-from django.test import TestCase
+import io
+import threading
+from datetime import date, datetime, time, timedelta, timezone as dt_timezone
+
+from django.contrib.auth.models import User
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.db.models import Count
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from core.models import Person, Doctor, Pacient, Specialty
+from .availability import IntervalTree, free_slots, next_free_slot
+from .models import Schedule, Appointment, Slot, TransitionBatch, Utilization
+from .slots import affected_days, materialize
+from .transitions import transition
+
+
+def create_doctor(index):
+    person = Person.objects.create(dni=f"{index:08d}", first_name="Doc", last_name=str(index))
+    return Doctor.objects.create(person=person)
+
+
+def create_pacient(index):
+    user = User.objects.create(username=f"pacient_{index}", email=f"pacient_{index}@test.com")
+    person = Person.objects.create(user=user, dni=f"{90000000 + index}")
+    return Pacient.objects.create(person=person)
+
+
+class IntervalTreeTests(TestCase):
+    def test_overlaps(self):
+        tree = IntervalTree([(10, 20), (30, 40), (0, 5), (35, 50)])
+        self.assertTrue(tree.overlaps(15, 16))
+        self.assertTrue(tree.overlaps(45, 60))
+        self.assertFalse(tree.overlaps(20, 30))
+        self.assertFalse(tree.overlaps(5, 10))
+        self.assertFalse(tree.overlaps(50, 70))
+
+    def test_empty(self):
+        self.assertFalse(IntervalTree().overlaps(0, 1))
+
+
+@override_settings(APPOINTMENT_SLOT_MINUTES=30)
+class FreeSlotsTests(TestCase):
+    def setUp(self):
+        self.day = date(2025, 1, 6)
+        self.doctor = create_doctor(1)
+        self.pacient = create_pacient(1)
+        Schedule.objects.create(doctor=self.doctor, date_start=self.day,
+                                date_end=self.day + timedelta(days=1),
+                                time_start=time(9, 0), time_end=time(11, 0))
+
+    def test_booked_slots_are_excluded(self):
+        Appointment.objects.create(doctor=self.doctor, pacient=self.pacient,
+                                   scheduled_date=self.day, scheduled_time=time(9, 30))
+        Appointment.objects.create(doctor=self.doctor, pacient=self.pacient,
+                                   scheduled_date=self.day, scheduled_time=time(10, 0),
+                                   state='cancelled')
+
+        slots = free_slots(self.day, self.day)[self.doctor.pk]
+        starts = [start.time() for start, _ in slots]
+        self.assertEqual(starts, [time(9, 0), time(10, 0), time(10, 30)])
+
+    def test_inactive_schedules_are_ignored(self):
+        # save() y no update(): los slots se materializan en post_save
+        for schedule in Schedule.objects.all():
+            schedule.is_active = False
+            schedule.save()
+        self.assertEqual(free_slots(self.day, self.day), {})
+
+    def test_query_count_does_not_grow_with_doctors(self):
+        for index in range(2, 12):
+            doctor = create_doctor(index)
+            Schedule.objects.create(doctor=doctor, date_start=self.day,
+                                    date_end=self.day + timedelta(days=30),
+                                    time_start=time(8, 0), time_end=time(12, 0))
+            Appointment.objects.create(doctor=doctor, pacient=self.pacient,
+                                       scheduled_date=self.day, scheduled_time=time(8, 0))
+
+        # Una consulta sobre la tabla de slots materializada
+        with self.assertNumQueries(1):
+            slots = free_slots(self.day, self.day + timedelta(days=29))
+        self.assertEqual(len(slots), 11)
+
+    def test_availability_endpoint(self):
+        client = APIClient()
+        client.force_authenticate(User.objects.create(username="staff"))
+        response = client.get(reverse('availability'), {
+            'date_from': self.day.isoformat(),
+            'date_to': self.day.isoformat(),
+            'doctor': [self.doctor.pk],
+        })
+        self.assertEqual(response.status_code, 200)
+        [entry] = response.data['availability']
+        self.assertEqual(entry['doctor'], self.doctor.pk)
+        self.assertEqual(len(entry['slots']), 4)
+
+    def test_availability_endpoint_rejects_inverted_range(self):
+        client = APIClient()
+        client.force_authenticate(User.objects.create(username="staff"))
+        response = client.get(reverse('availability'), {
+            'date_from': self.day.isoformat(),
+            'date_to': (self.day - timedelta(days=1)).isoformat(),
+        })
+        self.assertEqual(response.status_code, 400)
+
+
+@override_settings(APPOINTMENT_SLOT_MINUTES=30)
+class BookingTests(TestCase):
+    def setUp(self):
+        self.day = date(2025, 1, 6)
+        self.doctor = create_doctor(1)
+        self.pacient = create_pacient(1)
+        Schedule.objects.create(doctor=self.doctor, date_start=self.day, date_end=self.day,
+                                time_start=time(9, 0), time_end=time(11, 0))
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create(username="staff", is_staff=True))
+
+    def book(self, scheduled_time="09:00"):
+        return self.client.post(reverse('add_appointment'), {
+            'doctor': self.doctor.pk,
+            'pacient': self.pacient.pk,
+            'scheduled_date': self.day.isoformat(),
+            'scheduled_time': scheduled_time,
+        })
+
+    def test_book_slot(self):
+        response = self.book()
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['version'], 1)
+        self.assertEqual(response.data['state'], 'pending')
+
+    def test_double_booking_returns_conflict(self):
+        self.assertEqual(self.book().status_code, 201)
+        self.assertEqual(self.book().status_code, 409)
+        self.assertEqual(Appointment.objects.count(), 1)
+
+    def test_cancelled_slot_can_be_booked_again(self):
+        Appointment.objects.create(doctor=self.doctor, pacient=self.pacient, scheduled_date=self.day,
+                                   scheduled_time=time(9, 0), state='cancelled')
+        self.assertEqual(self.book().status_code, 201)
+
+    def test_slot_outside_schedule_is_rejected(self):
+        self.assertEqual(self.book("10:45").status_code, 400)
+        self.assertEqual(self.book("12:00").status_code, 400)
+
+    def test_update_with_stale_version_returns_conflict(self):
+        appointment_id = self.book().data['id']
+        url = reverse('change_appointment', args=[appointment_id])
+
+        response = self.client.patch(url, {'scheduled_time': '10:00', 'version': 1})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['version'], 2)
+
+        response = self.client.patch(url, {'state': 'cancelled', 'version': 1})
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(Appointment.objects.get(id=appointment_id).state, 'pending')
+
+    def test_update_requires_version(self):
+        appointment_id = self.book().data['id']
+        response = self.client.patch(reverse('change_appointment', args=[appointment_id]),
+                                     {'state': 'cancelled'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_partial_update_of_appointment_without_time(self):
+        appointment = Appointment.objects.create(doctor=self.doctor, pacient=self.pacient,
+                                                 scheduled_date=self.day, state='cancelled')
+        url = reverse('change_appointment', args=[appointment.pk])
+        response = self.client.patch(url, {'scheduled_date': self.day.isoformat(), 'version': 1})
+        self.assertEqual(response.status_code, 400)
+
+        response = self.client.patch(url, {'scheduled_time': '10:00', 'version': 1})
+        self.assertEqual(response.status_code, 200)
+
+    def test_pacient_books_and_changes_only_their_appointments(self):
+        client = APIClient()
+        client.force_authenticate(self.pacient.person.user)
+        response = client.post(reverse('add_appointment'), {
+            'doctor': self.doctor.pk, 'pacient': self.pacient.pk,
+            'scheduled_date': self.day.isoformat(), 'scheduled_time': '09:00',
+        })
+        self.assertEqual(response.status_code, 201)
+        url = reverse('change_appointment', args=[response.data['id']])
+        self.assertEqual(client.patch(url, {'scheduled_time': '09:30', 'version': 1}).status_code, 200)
+
+        other = create_pacient(2)
+        client.force_authenticate(other.person.user)
+        response = client.post(reverse('add_appointment'), {
+            'doctor': self.doctor.pk, 'pacient': self.pacient.pk,
+            'scheduled_date': self.day.isoformat(), 'scheduled_time': '10:00',
+        })
+        self.assertEqual(response.status_code, 403)
+        self.assertEqual(client.patch(url, {'state': 'cancelled', 'version': 2}).status_code, 403)
+        self.assertEqual(Appointment.objects.get().state, 'pending')
+
+    def test_doctor_changes_their_appointments(self):
+        appointment_id = self.book().data['id']
+        url = reverse('change_appointment', args=[appointment_id])
+        client = APIClient()
+        client.force_authenticate(User.objects.create(username="other_doctor"))
+        self.assertEqual(client.patch(url, {'state': 'completed', 'version': 1}).status_code, 403)
+        self.doctor.person.user = User.objects.create(username="doctor")
+        self.doctor.person.save()
+        client.force_authenticate(self.doctor.person.user)
+        self.assertEqual(client.patch(url, {'state': 'completed', 'version': 1}).status_code, 200)
+
+    def test_reschedule_into_taken_slot_returns_conflict(self):
+        self.book("09:00")
+        appointment_id = self.book("09:30").data['id']
+        response = self.client.patch(reverse('change_appointment', args=[appointment_id]),
+                                     {'scheduled_time': '09:00', 'version': 1})
+        self.assertEqual(response.status_code, 409)
+
+
+@override_settings(APPOINTMENT_SLOT_MINUTES=30)
+class SlotTests(TestCase):
+    def setUp(self):
+        self.day = date(2025, 1, 6)
+        self.doctor = create_doctor(1)
+        self.pacient = create_pacient(1)
+        self.schedule = Schedule.objects.create(doctor=self.doctor, date_start=self.day,
+                                                date_end=self.day + timedelta(days=2),
+                                                time_start=time(9, 0), time_end=time(11, 0))
+
+    def slots(self, **filters):
+        return list(Slot.objects.filter(**filters).order_by('start').values_list('start', 'status'))
+
+    def test_schedule_is_materialized(self):
+        self.assertEqual(Slot.objects.count(), 12)
+        self.assertEqual(set(Slot.objects.values_list('duration', flat=True)), {30})
+
+    def test_only_changed_days_are_touched(self):
+        untouched = set(Slot.objects.filter(start__date=self.day).values_list('pk', flat=True))
+        self.schedule.date_start = self.day + timedelta(days=1)
+        self.schedule.date_end = self.day + timedelta(days=3)
+        self.schedule.save()
+        self.assertEqual(Slot.objects.filter(start__date=self.day).count(), 0)
+        self.assertEqual(Slot.objects.count(), 12)
+        self.assertFalse(untouched & set(Slot.objects.values_list('pk', flat=True)))
+
+    def test_affected_days(self):
+        state = {'doctor_id': 1, 'date_start': self.day, 'date_end': self.day + timedelta(days=2),
+                 'time_start': time(9, 0), 'time_end': time(11, 0), 'is_active': True}
+        self.assertEqual(affected_days(state, {**state, 'date_end': self.day + timedelta(days=3)}),
+                         {1: {self.day + timedelta(days=3)}})
+        self.assertEqual(affected_days(state, {**state, 'is_active': False})[1], {
+            self.day, self.day + timedelta(days=1), self.day + timedelta(days=2)})
+        self.assertEqual(affected_days(state, {**state, 'time_end': time(12, 0)})[1], {
+            self.day, self.day + timedelta(days=1), self.day + timedelta(days=2)})
+
+    def test_deactivated_schedule_keeps_booked_slots(self):
+        Appointment.objects.create(doctor=self.doctor, pacient=self.pacient,
+                                   scheduled_date=self.day, scheduled_time=time(9, 30))
+        self.schedule.is_active = False
+        self.schedule.save()
+        self.assertEqual(len(self.slots(status=Slot.BOOKED)), 1)
+        self.assertEqual(Slot.objects.count(), 1)
+
+    def test_appointment_changes_update_the_slot(self):
+        appointment = Appointment.objects.create(doctor=self.doctor, pacient=self.pacient,
+                                                 scheduled_date=self.day, scheduled_time=time(9, 0))
+        self.assertEqual(Slot.objects.filter(status=Slot.BOOKED).count(), 1)
+        appointment.scheduled_time = time(10, 0)
+        appointment.save()
+        [(start, _)] = self.slots(status=Slot.BOOKED)
+        self.assertEqual(start.time(), time(10, 0))
+        appointment.delete()
+        self.assertEqual(Slot.objects.filter(status=Slot.BOOKED).count(), 0)
+
+    def test_next_free_slot_skips_booked(self):
+        Appointment.objects.create(doctor=self.doctor, pacient=self.pacient,
+                                   scheduled_date=self.day, scheduled_time=time(9, 0))
+        after = datetime(2025, 1, 6, tzinfo=dt_timezone.utc)
+        self.assertEqual(next_free_slot(self.doctor.pk, after).start.time(), time(9, 30))
+        client = APIClient()
+        client.force_authenticate(User.objects.create(username="staff"))
+        response = client.get(reverse('next_slot', args=[self.doctor.pk]), {'after': after.isoformat()})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['time_start'], time(9, 30))
+        response = client.get(reverse('next_slot', args=[self.doctor.pk]))
+        self.assertEqual(response.status_code, 404)
+
+    def test_booking_updates_one_slot(self):
+        client = APIClient()
+        client.force_authenticate(User.objects.create(username="staff", is_staff=True))
+        response = client.post(reverse('add_appointment'), {
+            'doctor': self.doctor.pk, 'pacient': self.pacient.pk,
+            'scheduled_date': self.day.isoformat(), 'scheduled_time': '10:00',
+        })
+        self.assertEqual(response.status_code, 201)
+        [(start, _)] = self.slots(status=Slot.BOOKED)
+        self.assertEqual(start.time(), time(10, 0))
+
+        url = reverse('change_appointment', args=[response.data['id']])
+        response = client.patch(url, {'scheduled_time': '10:30', 'version': 1})
+        self.assertEqual(response.status_code, 200)
+        [(start, _)] = self.slots(status=Slot.BOOKED)
+        self.assertEqual(start.time(), time(10, 30))
+
+        response = client.patch(url, {'state': 'cancelled', 'version': 2})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.slots(status=Slot.BOOKED), [])
+
+    def test_booking_materializes_a_missing_day(self):
+        # Base anterior a la tabla de slots: los horarios existen pero sus slots no
+        Slot.objects.all().delete()
+        client = APIClient()
+        client.force_authenticate(User.objects.create(username="staff", is_staff=True))
+        response = client.post(reverse('add_appointment'), {
+            'doctor': self.doctor.pk, 'pacient': self.pacient.pk,
+            'scheduled_date': self.day.isoformat(), 'scheduled_time': '10:00',
+        })
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(len(self.slots(status=Slot.BOOKED)), 1)
+        self.assertEqual(len(self.slots()), 4)
+
+    def test_materialize_command_repairs_bulk_changes(self):
+        Schedule.objects.update(time_end=time(10, 0))
+        Appointment.objects.bulk_create([Appointment(doctor=self.doctor, pacient=self.pacient,
+                                                     scheduled_date=self.day, scheduled_time=time(9, 0))])
+        call_command('materialize_slots', stdout=io.StringIO())
+        self.assertEqual(Slot.objects.count(), 6)
+        self.assertEqual(Slot.objects.filter(status=Slot.BOOKED).count(), 1)
+        self.assertEqual(materialize(self.day, self.day + timedelta(days=2)), (0, 0, 0))
+
+
+@override_settings(APPOINTMENT_SLOT_MINUTES=30)
+class TransitionTests(TestCase):
+    def setUp(self):
+        self.day = date(2025, 1, 6)
+        self.doctor = create_doctor(1)
+        self.pacient = create_pacient(1)
+        Schedule.objects.create(doctor=self.doctor, date_start=self.day, date_end=self.day + timedelta(days=1),
+                                time_start=time(9, 0), time_end=time(14, 0))
+        for offset in range(2):
+            for hour in range(9, 14):
+                Appointment.objects.create(doctor=self.doctor, pacient=self.pacient,
+                                           scheduled_date=self.day + timedelta(days=offset),
+                                           scheduled_time=time(hour, 0),
+                                           state='cancelled' if hour == 13 else 'pending')
+
+    def test_close_day_completes_pending_in_batches(self):
+        out = io.StringIO()
+        call_command('close_day', '--date', self.day.isoformat(), '--batch-size', '3', stdout=out)
+        self.assertIn("4 appointments", out.getvalue())
+        completed = Appointment.objects.filter(state='completed')
+        self.assertEqual(set(completed.values_list('scheduled_date', flat=True)), {self.day})
+        self.assertEqual(set(completed.values_list('version', flat=True)), {2})
+        self.assertEqual(Appointment.objects.filter(state='pending').count(), 4)
+        # Un registro de auditoria por lote: 3 + 1
+        self.assertEqual(list(TransitionBatch.objects.order_by('pk').values_list('count', flat=True)), [3, 1])
+        self.assertEqual(TransitionBatch.objects.values('run').distinct().count(), 1)
+
+    def test_close_day_rejects_today(self):
+        with self.assertRaises(CommandError):
+            call_command('close_day', '--date', date.today().isoformat(), stdout=io.StringIO())
+
+    def test_updates_are_set_based(self):
+        # Por lote: SELECT ... FOR UPDATE, UPDATE, INSERT de auditoria y los agregados (INSERT de
+        # las filas que faltan, SELECT ... FOR UPDATE, 2 SELECT e INSERT ... ON CONFLICT); al
+        # final un SELECT vacio. Cada transaccion es un SAVEPOINT/RELEASE
+        with self.assertNumQueries(8 * 2 + 1 + 2 * 5):
+            result = transition('completed', {'scheduled_date__lte': '2025-01-07'}, 'test', batch_size=4)
+        self.assertEqual((result['updated'], result['batches']), (8, 2))
+
+    def test_bulk_cancel_frees_slots(self):
+        ids = list(Appointment.objects.filter(scheduled_date=self.day, state='pending').values_list('pk', flat=True))
+        client = APIClient()
+        admin = User.objects.create(username="admin", is_staff=True)
+        client.force_authenticate(admin)
+        response = client.post(reverse('transition_appointments'), {'state': 'cancelled', 'ids': ids},
+                               format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['updated'], 4)
+        self.assertEqual(Appointment.objects.filter(pk__in=ids, state='cancelled',
+                                                    cancelled_date__isnull=False).count(), 4)
+        booked = Slot.objects.filter(status=Slot.BOOKED)
+        self.assertEqual(booked.count(), 4)
+        self.assertFalse(booked.filter(start__date=self.day).exists())
+        batch = TransitionBatch.objects.get()
+        self.assertEqual((batch.user, batch.source, batch.criteria['pk__in']), (admin, 'api', sorted(ids)))
+
+    def test_bulk_transition_validation(self):
+        client = APIClient()
+        client.force_authenticate(User.objects.create(username="admin", is_staff=True))
+        url = reverse('transition_appointments')
+        self.assertEqual(client.post(url, {'state': 'completed'}, format='json').status_code, 400)
+        self.assertEqual(client.post(url, {'state': 'pending', 'ids': [1]}, format='json').status_code, 400)
+        client.force_authenticate(User.objects.create(username="staff"))
+        self.assertEqual(client.post(url, {'state': 'completed', 'ids': [1]}, format='json').status_code, 403)
+
+
+@override_settings(APPOINTMENT_SLOT_MINUTES=30)
+class UtilizationTests(TestCase):
+    def setUp(self):
+        self.day = date(2025, 1, 6)
+        self.pacient = create_pacient(1)
+        self.cardiology, self.pediatrics = Specialty.objects.bulk_create(
+            [Specialty(description="Cardiologia"), Specialty(description="Pediatria")])
+        self.doctors = [create_doctor(1), create_doctor(2)]
+        self.doctors[0].specialties.add(self.cardiology, self.pediatrics)
+        self.doctors[1].specialties.add(self.pediatrics)
+        for doctor in self.doctors:
+            Schedule.objects.create(doctor=doctor, date_start=self.day, date_end=self.day + timedelta(days=1),
+                                    time_start=time(9, 0), time_end=time(11, 0))
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create(username="admin", is_staff=True))
+
+    def counters(self, doctor, day):
+        return Utilization.objects.filter(doctor=doctor, day=day).values_list(
+            'slots', 'booked', 'completed', 'cancelled').get()
+
+    def book(self, doctor, scheduled_time):
+        response = self.client.post(reverse('add_appointment'), {
+            'doctor': doctor.pk, 'pacient': self.pacient.pk,
+            'scheduled_date': self.day.isoformat(), 'scheduled_time': scheduled_time,
+        })
+        self.assertEqual(response.status_code, 201)
+        return response.data['id']
+
+    def test_rollups_follow_bookings_and_transitions(self):
+        self.assertEqual(self.counters(self.doctors[0], self.day), (4, 0, 0, 0))
+        first = self.book(self.doctors[0], '09:00')
+        self.book(self.doctors[0], '09:30')
+        self.assertEqual(self.counters(self.doctors[0], self.day), (4, 2, 0, 0))
+
+        self.client.patch(reverse('change_appointment', args=[first]), {'state': 'cancelled', 'version': 1})
+        self.assertEqual(self.counters(self.doctors[0], self.day), (4, 1, 0, 1))
+        transition('completed', {'scheduled_date__lte': self.day.isoformat()}, 'test')
+        self.assertEqual(self.counters(self.doctors[0], self.day), (4, 1, 1, 1))
+
+        schedule = Schedule.objects.get(doctor=self.doctors[0])
+        schedule.time_end = time(12, 0)
+        schedule.save()
+        self.assertEqual(self.counters(self.doctors[0], self.day), (6, 1, 1, 1))
+        self.assertEqual(self.counters(self.doctors[0], self.day + timedelta(days=1)), (6, 0, 0, 0))
+
+    def test_rebuild_matches_incremental(self):
+        self.book(self.doctors[0], '09:00')
+        self.book(self.doctors[1], '10:00')
+        Appointment.objects.create(doctor=self.doctors[1], pacient=self.pacient, scheduled_date=self.day,
+                                   scheduled_time=time(10, 30), state='completed')
+        incremental = list(Utilization.objects.order_by('doctor', 'day').values_list(
+            'doctor', 'day', 'slots', 'booked', 'completed', 'cancelled'))
+        Utilization.objects.all().delete()
+        call_command('rebuild_utilization', stdout=io.StringIO())
+        self.assertEqual(list(Utilization.objects.order_by('doctor', 'day').values_list(
+            'doctor', 'day', 'slots', 'booked', 'completed', 'cancelled')), incremental)
+
+    def test_endpoint_per_doctor_and_specialty(self):
+        self.book(self.doctors[0], '09:00')
+        self.book(self.doctors[1], '09:00')
+        self.book(self.doctors[1], '09:30')
+        params = {'date_from': self.day.isoformat(), 'date_to': (self.day + timedelta(days=30)).isoformat()}
+
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('utilization'), params)
+        self.assertEqual(response.status_code, 200)
+        rows = {row['doctor']: row for row in response.data['utilization']}
+        self.assertEqual((rows[self.doctors[1].pk]['slots'], rows[self.doctors[1].pk]['booked']), (8, 2))
+        self.assertEqual(rows[self.doctors[1].pk]['utilization'], 0.25)
+
+        response = self.client.get(reverse('utilization'), {**params, 'group': 'specialty'})
+        rows = {row['description']: row for row in response.data['utilization']}
+        self.assertEqual((rows["Pediatria"]['slots'], rows["Pediatria"]['booked']), (16, 3))
+        self.assertEqual((rows["Cardiologia"]['slots'], rows["Cardiologia"]['booked']), (8, 1))
+
+        response = self.client.get(reverse('utilization'), {**params, 'specialty': [self.pediatrics.pk],
+                                                            'by_day': 'true'})
+        self.assertEqual(len(response.data['utilization']), 4)
+        self.assertEqual(response.data['utilization'][0]['booked'], 1)
+
+    def test_endpoint_validation(self):
+        response = self.client.get(reverse('utilization'), {'date_from': '2025-01-01', 'date_to': '2026-06-01'})
+        self.assertEqual(response.status_code, 400)
+        self.client.force_authenticate(User.objects.create(username="staff"))
+        response = self.client.get(reverse('utilization'), {'date_from': '2025-01-01', 'date_to': '2025-01-02'})
+        self.assertEqual(response.status_code, 403)
+
+
+class AgendaTests(TestCase):
+    def setUp(self):
+        self.today = date.today()
+        self.doctor = create_doctor(1)
+        self.pacient = create_pacient(1)
+        self.pacient.person.first_name = "Ana"
+        self.pacient.person.save()
+        other = create_pacient(2)
+        for day, scheduled_time, pacient, state in (
+            (self.today, time(10, 0), self.pacient, 'pending'),
+            (self.today, time(9, 0), other, 'pending'),
+            (self.today, time(9, 30), self.pacient, 'cancelled'),
+            (self.today + timedelta(days=3), time(9, 0), self.pacient, 'pending'),
+            (self.today - timedelta(days=3), time(9, 0), self.pacient, 'completed'),
+        ):
+            Appointment.objects.create(doctor=self.doctor, pacient=pacient, scheduled_date=day,
+                                       scheduled_time=scheduled_time, state=state)
+        self.other = other
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create(username="staff", is_staff=True))
+
+    def test_doctor_agenda_is_flat_and_ordered(self):
+        url = reverse('doctor_appointments', args=[self.doctor.pk])
+        with self.assertNumQueries(1):
+            response = self.client.get(url, {'date': self.today.isoformat()})
+        self.assertEqual(response.status_code, 200)
+        appointments = response.data['appointments']
+        self.assertEqual([row['scheduled_time'] for row in appointments], [time(9, 0), time(9, 30), time(10, 0)])
+        self.assertEqual(set(appointments[2]), {
+            'id', 'scheduled_date', 'scheduled_time', 'state', 'version', 'pacient_id',
+            'pacient_dni', 'pacient_first_name', 'pacient_last_name', 'pacient_phone'})
+        self.assertEqual(appointments[2]['pacient_first_name'], "Ana")
+
+        response = self.client.get(url, {'state': 'pending'})
+        self.assertEqual(len(response.data['appointments']), 2)
+        self.assertEqual(self.client.get(url, {'date': 'tomorrow'}).status_code, 400)
+
+    def test_pacient_upcoming(self):
+        url = reverse('pacient_appointments', args=[self.pacient.pk])
+        with self.assertNumQueries(1):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        appointments = response.data['appointments']
+        self.assertEqual([(row['scheduled_date'], row['scheduled_time']) for row in appointments],
+                         [(self.today, time(10, 0)), (self.today + timedelta(days=3), time(9, 0))])
+        self.assertEqual(appointments[0]['doctor_id'], self.doctor.pk)
+        self.assertEqual(len(self.client.get(url, {'limit': 1}).data['appointments']), 1)
+        self.assertEqual(self.client.get(url, {'limit': 500}).status_code, 400)
+
+    def test_only_staff_or_the_person_itself(self):
+        doctor_url = reverse('doctor_appointments', args=[self.doctor.pk])
+        pacient_url = reverse('pacient_appointments', args=[self.pacient.pk])
+        client = APIClient()
+        client.force_authenticate(self.pacient.person.user)
+        self.assertEqual(client.get(pacient_url).status_code, 200)
+        self.assertEqual(client.get(reverse('pacient_appointments', args=[self.other.pk])).status_code, 403)
+        self.assertEqual(client.get(doctor_url).status_code, 403)
+
+        self.doctor.person.user = User.objects.create(username="doctor")
+        self.doctor.person.save()
+        client.force_authenticate(self.doctor.person.user)
+        self.assertEqual(client.get(doctor_url).status_code, 200)
+        self.assertEqual(client.get(reverse('doctor_appointments', args=[self.doctor.pk + 100])).status_code, 403)
+        self.assertEqual(client.get(pacient_url).status_code, 403)
+
+        client.force_authenticate(None)
+        self.assertEqual(client.get(doctor_url).status_code, 401)
+
+    def test_queries_use_the_day_indexes(self):
+        if connection.vendor != 'sqlite':
+            self.skipTest("EXPLAIN QUERY PLAN output of SQLite")
+        from .agenda import doctor_agenda, pacient_upcoming
+        for function, args, index in (
+            (doctor_agenda, (self.doctor.pk, self.today), 'appointment_doctor_day_idx'),
+            (pacient_upcoming, (self.pacient.pk, 20), 'appointment_pacient_day_idx'),
+        ):
+            with self.assertNumQueries(1) as captured:
+                function(*args)
+            with connection.cursor() as cursor:
+                cursor.execute(f"EXPLAIN QUERY PLAN {captured.captured_queries[0]['sql']}")
+                plan = " ".join(str(row) for row in cursor.fetchall())
+            self.assertIn(index, plan)
+
+    def test_day_indexes_cover_where_the_backend_can(self):
+        self.assertEqual(Appointment.check(databases=['default']), [])
+        with connection.cursor() as cursor:
+            indexes = connection.introspection.get_constraints(cursor, Appointment._meta.db_table)
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT indexdef FROM pg_indexes WHERE indexname = %s",
+                               ['appointment_doctor_day_idx'])
+                self.assertIn('INCLUDE (id, state, pacient_id, version)', cursor.fetchone()[0])
+        self.assertEqual(indexes['appointment_doctor_day_idx']['columns'][:3],
+                         ['doctor_id', 'scheduled_date', 'scheduled_time'])
+
+    @override_settings(ALLOWED_HOSTS=['localhost'])
+    def test_bench_agenda(self):
+        out = io.StringIO()
+        call_command('bench_agenda', rows=200, requests=3, batch_size=50, stdout=out)
+        self.assertEqual(Appointment.objects.count(), 200)
+        # Sin dos citas vigentes en el mismo slot
+        self.assertFalse(Appointment.objects.filter(state__in=Appointment.BOOKED_STATES)
+                         .values('doctor', 'scheduled_date', 'scheduled_time')
+                         .annotate(n=Count('pk')).filter(n__gt=1).exists())
+        self.assertIn("doctor_agenda", out.getvalue())
+        self.assertIn("doctor agenda plan:", out.getvalue())
+
+
+@override_settings(APPOINTMENT_SLOT_MINUTES=30)
+class ConcurrentBookingTests(TransactionTestCase):
+    WORKERS = 8
+
+    def setUp(self):
+        self.day = date(2025, 1, 6)
+        self.doctor = create_doctor(1)
+        self.pacient = create_pacient(1)
+        self.staff = User.objects.create(username="staff", is_staff=True)
+        Schedule.objects.create(doctor=self.doctor, date_start=self.day, date_end=self.day,
+                                time_start=time(9, 0), time_end=time(11, 0))
+
+    def book_concurrently(self, times):
+        barrier = threading.Barrier(len(times))
+        results = []
+
+        def worker(scheduled_time):
+            client = APIClient()
+            client.force_authenticate(self.staff)
+            barrier.wait()
+            try:
+                response = client.post(reverse('add_appointment'), {
+                    'doctor': self.doctor.pk,
+                    'pacient': self.pacient.pk,
+                    'scheduled_date': self.day.isoformat(),
+                    'scheduled_time': scheduled_time,
+                })
+                results.append(response.status_code)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=worker, args=[scheduled_time]) for scheduled_time in times]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return sorted(results)
+
+    def test_only_one_concurrent_booking_wins(self):
+        results = self.book_concurrently(['09:00'] * self.WORKERS)
+        self.assertEqual(results, [201] + [409] * (self.WORKERS - 1))
+        self.assertEqual(Appointment.objects.count(), 1)
+
+    def test_concurrent_bookings_create_one_rollup(self):
+        # Sin fila de utilizacion: cada reserva la recalcula a la vez que las demas
+        Utilization.objects.all().delete()
+        results = self.book_concurrently(['09:00', '09:30', '10:00', '10:30'])
+        self.assertEqual(results, [201] * 4)
+        self.assertEqual(Utilization.objects.filter(doctor=self.doctor, day=self.day).values_list(
+            'slots', 'booked').get(), (4, 4))
+
+
+class SeedClinicTests(TestCase):
+    def seed(self, **options):
+        call_command('seed_clinic', pacients=60, doctors=6, specialties=4, appointments=400,
+                     days_back=20, days_ahead=10, stdout=io.StringIO(), **options)
+
+    def snapshot(self):
+        return list(Appointment.objects.order_by('pk').values_list(
+            'doctor__person__dni', 'pacient__person__dni', 'scheduled_date', 'scheduled_time', 'state'))
+
+    def test_seed(self):
+        self.seed()
+        self.assertEqual(Pacient.objects.count(), 60)
+        self.assertEqual(Doctor.objects.count(), 6)
+        self.assertEqual(Appointment.objects.count(), 400)
+        self.assertTrue(all(doctor.specialties.exists() for doctor in Doctor.objects.all()))
+        # Sin dos citas vigentes en el mismo slot, y las pasadas no quedan pendientes en su mayoria
+        booked = Appointment.objects.filter(state__in=Appointment.BOOKED_STATES)
+        self.assertFalse(booked.values('doctor', 'scheduled_date', 'scheduled_time')
+                         .annotate(n=Count('pk')).filter(n__gt=1).exists())
+        self.assertFalse(Appointment.objects.filter(scheduled_date__gt=date.today(), state='completed').exists())
+        self.assertFalse(Appointment.objects.filter(cancelled_date__gt=date.today()).exists())
+        # Un slot ocupado por cada cita vigente
+        self.assertEqual(Slot.objects.filter(status=Slot.BOOKED).count(), booked.count())
+        # Cada cita cae en un turno de su doctor
+        for appointment in Appointment.objects.all()[:50]:
+            self.assertTrue(Schedule.objects.filter(
+                doctor=appointment.doctor, time_start__lte=appointment.scheduled_time,
+                time_end__gt=appointment.scheduled_time).exists())
+
+    def test_same_seed_same_data(self):
+        self.seed(seed=7)
+        first = self.snapshot()
+        self.seed(seed=7, clear=True)
+        self.assertEqual(self.snapshot(), first)
+        self.assertEqual(Pacient.objects.count(), 60)
 
-# Create your tests here.
@@ -0,0 +1,87 @@
+import uuid
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import router, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import Appointment, Slot, TransitionBatch
+from .slots import slot_start
+from .utilization import refresh_utilization
+
+# Estado destino: estados de origen permitidos. Volver a 'pending' no es masivo:
+# cada cita tendria que reclamar su slot (ver AppointmentUpdateSerializer)
+TRANSITIONS = {
+    'completed': ['pending'],
+    'cancelled': ['pending'],
+}
+
+
+def transition(to_state, criteria, source, user=None, batch_size=None):
+    """
+    Moves the appointments matching ``criteria`` (``filter()`` keyword
+    arguments, JSON serializable) from a state of ``TRANSITIONS[to_state]``
+    to ``to_state`` with set-based UPDATEs of ``batch_size`` rows.
+
+    Each batch is its own short transaction (keyset on the primary key) that
+    locks only its rows, frees the slots of cancelled appointments,
+    refreshes the utilization rollups of its doctors and days and writes
+    one ``TransitionBatch`` audit row. Returns
+    ``{"run", "updated", "batches"}``.
+    """
+    if to_state not in TRANSITIONS:
+        raise ValueError(f"Appointments cannot be moved to '{to_state}' in bulk.")
+    batch_size = batch_size or settings.APPOINTMENT_TRANSITION_BATCH_SIZE
+    from_states = TRANSITIONS[to_state]
+    run = uuid.uuid4()
+    updated = batches = 0
+    last_pk = 0
+    using = router.db_for_write(Appointment)
+    while True:
+        with transaction.atomic(using=using):
+            matching = Appointment.objects.using(using).filter(state__in=from_states, pk__gt=last_pk, **criteria)
+            rows = list(matching.select_for_update().order_by('pk')
+                        .values_list('pk', 'doctor_id', 'scheduled_date', 'scheduled_time')[:batch_size])
+            if not rows:
+                break
+            last_pk = rows[-1][0]
+            count = apply_batch(rows, from_states, to_state, using)
+            if count:
+                TransitionBatch.objects.using(using).create(
+                    run=run, source=source, user=user, from_states=from_states, to_state=to_state,
+                    criteria=criteria, count=count, first_appointment=rows[0][0], last_appointment=last_pk,
+                )
+                updated += count
+                batches += 1
+    return {"run": run, "updated": updated, "batches": batches}
+
+
+def apply_batch(rows, from_states, to_state, using):
+    now = timezone.now()
+    changes = {'state': to_state, 'version': F('version') + 1, 'updated_at': now}
+    if to_state == 'cancelled':
+        changes['cancelled_date'] = timezone.localdate(now)
+    count = (Appointment.objects.using(using)
+             .filter(pk__in=[row[0] for row in rows], state__in=from_states)
+             .update(**changes))
+
+    if to_state not in Appointment.BOOKED_STATES:
+        # Las filas estan bloqueadas y eran las unicas citas vigentes de su slot
+        starts = defaultdict(list)
+        for _, doctor_id, scheduled_date, scheduled_time in rows:
+            if scheduled_time is not None:
+                starts[doctor_id].append(slot_start(scheduled_date, scheduled_time))
+        if starts:
+            lookup = Q()
+            for doctor_id, doctor_starts in starts.items():
+                lookup |= Q(doctor_id=doctor_id, start__in=doctor_starts)
+            Slot.objects.using(using).filter(lookup).update(status=Slot.FREE)
+    refresh_utilization({(doctor_id, scheduled_date) for _, doctor_id, scheduled_date, _ in rows})
+    return count
+
+
+def close_day(day, user=None, batch_size=None):
+    """Completes the appointments still pending on or before ``day``."""
+    return transition('completed', {'scheduled_date__lte': day.isoformat()}, 'close_day',
+                      user=user, batch_size=batch_size)
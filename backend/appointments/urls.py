@@ -3,4 +3,13 @@ from . import views
 
 urlpatterns = [
     path('schedules/', views.schedules, name='schedules'),
+    path('availability/', views.availability, name='availability'),
+    path('next_slot/<int:doctor_id>/', views.next_slot, name='next_slot'),
+    path('utilization/', views.utilization, name='utilization'),
+    path('doctor_appointments/<int:doctor_id>/', views.doctor_appointments, name='doctor_appointments'),
+    path('pacient_appointments/<int:pacient_id>/', views.pacient_appointments, name='pacient_appointments'),
+    path('add_appointment/', views.add_appointment, name='add_appointment'),
+    path('change_appointment/<int:appointment_id>/',
+         views.change_appointment, name='change_appointment'),
+    path('transition_appointments/', views.transition_appointments, name='transition_appointments'),
 ]
@@ -0,0 +1,148 @@
+from collections import defaultdict
+from datetime import datetime, time, timedelta
+
+from django.db import router, transaction
+from django.db.models import Count, F, Q, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from core.models import Doctor
+from .models import Appointment, Slot, Utilization
+
+BATCH_SIZE = 2000
+
+COUNTERS = ('slots', 'booked', 'completed', 'cancelled')
+
+
+def day_start(day):
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def rebuild_utilization(date_from, date_to, doctor_ids=None, keep=None):
+    """
+    Recomputes the rollups between ``date_from`` and ``date_to`` from the
+    slot table and the appointments (four reads whatever the range). With
+    ``keep``, a set of ``(doctor_id, day)``, only those rows are rewritten.
+    Returns the number of rows written.
+
+    The rollup rows are locked before counting and then upserted, so a
+    concurrent refresh or ``add_utilization`` of the same rows waits and
+    applies on top of this one instead of failing on the unique constraint
+    or being overwritten by older counts.
+    """
+    slots = Slot.objects.filter(start__gte=day_start(date_from), start__lt=day_start(date_to + timedelta(days=1)))
+    appointments = Appointment.objects.filter(scheduled_date__range=(date_from, date_to))
+    stored = Utilization.objects.filter(day__range=(date_from, date_to))
+    if doctor_ids is not None:
+        slots = slots.filter(doctor_id__in=doctor_ids)
+        appointments = appointments.filter(doctor_id__in=doctor_ids)
+        stored = stored.filter(doctor_id__in=doctor_ids)
+    if keep is not None:
+        stored = stored.filter(key_lookup(keep))
+
+    using = router.db_for_write(Utilization)
+    with transaction.atomic(using=using):
+        if keep is not None:
+            # Filas vacias para las claves que faltan: la que llegue segunda espera en el
+            # indice unico y bloquea la fila existente
+            Utilization.objects.using(using).bulk_create(
+                [Utilization(doctor_id=doctor_id, day=day) for doctor_id, day in sorted(keep)],
+                batch_size=BATCH_SIZE, ignore_conflicts=True)
+        locked = {(doctor_id, day): pk for pk, doctor_id, day in stored.using(using).select_for_update()
+                  .order_by('doctor_id', 'day').values_list('pk', 'doctor_id', 'day')}
+
+        counts = defaultdict(lambda: dict.fromkeys(COUNTERS, 0))
+        rows = (slots.using(using).annotate(day=TruncDate('start')).order_by().values('doctor_id', 'day')
+                .annotate(total=Count('pk'), taken=Count('pk', filter=Q(status=Slot.BOOKED)))
+                .values_list('doctor_id', 'day', 'total', 'taken'))
+        for doctor_id, day, total, taken in rows:
+            counts[doctor_id, day].update(slots=total, booked=taken)
+        rows = (appointments.using(using).order_by().values('doctor_id', 'scheduled_date')
+                .annotate(done=Count('pk', filter=Q(state='completed')),
+                          dropped=Count('pk', filter=Q(state='cancelled')))
+                .values_list('doctor_id', 'scheduled_date', 'done', 'dropped'))
+        for doctor_id, day, done, dropped in rows:
+            counts[doctor_id, day].update(completed=done, cancelled=dropped)
+        if keep is not None:
+            counts = {key: value for key, value in counts.items() if key in keep}
+
+        rollups = [Utilization(doctor_id=doctor_id, day=day, **values)
+                   for (doctor_id, day), values in sorted(counts.items()) if any(values.values())]
+        Utilization.objects.using(using).bulk_create(
+            rollups, batch_size=BATCH_SIZE, update_conflicts=True,
+            unique_fields=['doctor', 'day'], update_fields=list(COUNTERS))
+        written = {(rollup.doctor_id, rollup.day) for rollup in rollups}
+        empty = [pk for key, pk in locked.items() if key not in written]
+        for index in range(0, len(empty), BATCH_SIZE):
+            Utilization.objects.using(using).filter(pk__in=empty[index:index + BATCH_SIZE]).delete()
+    return len(rollups)
+
+
+def key_lookup(keys):
+    """``Q`` matching the ``(doctor_id, day)`` pairs in ``keys``."""
+    days = defaultdict(set)
+    for doctor_id, day in keys:
+        days[doctor_id].add(day)
+    lookup = Q()
+    for doctor_id, doctor_days in days.items():
+        lookup |= Q(doctor_id=doctor_id, day__in=doctor_days)
+    return lookup
+
+
+def refresh_utilization(keys):
+    """Recomputes the rollups of the ``(doctor_id, day)`` pairs in ``keys``."""
+    keys = {(doctor_id, day) for doctor_id, day in keys if day is not None}
+    if not keys:
+        return 0
+    days = [day for _, day in keys]
+    return rebuild_utilization(min(days), max(days), {doctor_id for doctor_id, _ in keys}, keep=keys)
+
+
+def add_utilization(doctor_id, day, **deltas):
+    """
+    Adds ``deltas`` to the counters of one rollup with a single UPDATE;
+    recomputes the row when it does not exist yet.
+    """
+    updated = Utilization.objects.filter(doctor_id=doctor_id, day=day).update(
+        **{field: F(field) + delta for field, delta in deltas.items()})
+    if not updated:
+        refresh_utilization([(doctor_id, day)])
+
+
+def utilization_report(date_from, date_to, group='doctor', by_day=False, doctor_ids=None, specialty_ids=None):
+    """
+    Totals of the rollups between ``date_from`` and ``date_to`` per doctor
+    or per specialty (a doctor counts in each of their specialties), and per
+    day with ``by_day``. A single query whatever the range.
+    """
+    rollups = Utilization.objects.filter(day__range=(date_from, date_to))
+    if doctor_ids:
+        rollups = rollups.filter(doctor_id__in=doctor_ids)
+    if group == 'specialty':
+        keys = ['doctor__specialties', 'doctor__specialties__description']
+        if specialty_ids:
+            rollups = rollups.filter(doctor__specialties__in=specialty_ids)
+    else:
+        keys = ['doctor_id']
+        if specialty_ids:
+            # Subconsulta y no JOIN: un doctor con varias especialidades no se cuenta dos veces
+            rollups = rollups.filter(doctor__in=Doctor.objects.filter(specialties__in=specialty_ids))
+    if by_day:
+        keys.append('day')
+
+    rows = (rollups.order_by().values(*keys)
+            .annotate(**{f'total_{field}': Sum(field) for field in COUNTERS})
+            .order_by(*keys))
+    results = []
+    for row in rows:
+        if group == 'specialty':
+            entry = {"specialty": row['doctor__specialties'],
+                     "description": row['doctor__specialties__description']}
+        else:
+            entry = {"doctor": row['doctor_id']}
+        if by_day:
+            entry["day"] = row['day']
+        entry.update({field: row[f'total_{field}'] for field in COUNTERS})
+        entry["utilization"] = round(entry['booked'] / entry['slots'], 4) if entry['slots'] else None
+        results.append(entry)
+    return results
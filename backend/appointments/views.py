@@ -1,7 +1,19 @@
+from datetime import timedelta
+
 from django.shortcuts import render
-from .serializers import ScheduleSerializer, AppointmentSerializer
+from .serializers import (ScheduleSerializer, AppointmentSerializer, AvailabilityQuerySerializer,
+                          AppointmentBookingSerializer, AppointmentUpdateSerializer, AppointmentConflict,
+                          NextSlotQuerySerializer, BulkTransitionSerializer, UtilizationQuerySerializer,
+                          DoctorAgendaQuerySerializer, PacientUpcomingQuerySerializer)
 from .models import Schedule, Appointment
-from django.db import transaction
+from .agenda import doctor_agenda, pacient_upcoming
+from .permissions import (IsStaffOrDoctor, IsStaffOrPacient, IsStaffOrBookingPacient,
+                          IsStaffOrAppointmentParty)
+from .availability import free_slots, next_free_slot
+from .transitions import transition
+from .utilization import utilization_report
+from django.db import IntegrityError, transaction
+from django.utils import timezone
 from rest_framework.response import Response
 from rest_framework.exceptions import ValidationError
 from rest_framework import status
@@ -24,17 +36,166 @@ def delete_schedule(request):
 def detail_schedule(request):
     return None
 
+SLOT_TAKEN_ERROR = "The doctor already has an appointment in this slot."
+
+
+@api_view(["POST"])
+@permission_classes([IsStaffOrBookingPacient])
 def add_appointment(request):
-    return None
+    serializer = AppointmentBookingSerializer(data=request.data)
+    if not serializer.is_valid():
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+    # UPDATE condicional del slot e INSERT; el constraint de la cita queda como respaldo
+    try:
+        with transaction.atomic():
+            serializer.save()
+    except ValidationError as e:
+        return Response({"error": e.detail[0]}, status=status.HTTP_400_BAD_REQUEST)
+    except AppointmentConflict as e:
+        return Response({"error": e.detail}, status=status.HTTP_409_CONFLICT)
+    except IntegrityError:
+        return Response({"error": SLOT_TAKEN_ERROR}, status=status.HTTP_409_CONFLICT)
+    return Response(serializer.data, status=status.HTTP_201_CREATED)
 
 def view_appointment(request):
     return None
 
-def change_appointment(request):
-    return None
+@api_view(["PATCH"])
+@permission_classes([IsStaffOrAppointmentParty])
+def change_appointment(request, appointment_id):
+    try:
+        appointment = Appointment.objects.get(id=appointment_id)
+    except Appointment.DoesNotExist:
+        return Response({"error": "Appointment not found."}, status=status.HTTP_404_NOT_FOUND)
+
+    serializer = AppointmentUpdateSerializer(appointment, data=request.data, partial=True)
+    if not serializer.is_valid():
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+    try:
+        with transaction.atomic():
+            serializer.save()
+    except ValidationError as e:
+        return Response({"error": e.detail[0]}, status=status.HTTP_400_BAD_REQUEST)
+    except AppointmentConflict as e:
+        return Response({"error": e.detail}, status=status.HTTP_409_CONFLICT)
+    except IntegrityError:
+        return Response({"error": SLOT_TAKEN_ERROR}, status=status.HTTP_409_CONFLICT)
+    return Response(AppointmentBookingSerializer(serializer.instance).data, status=status.HTTP_200_OK)
+
+@api_view(["POST"])
+@permission_classes([IsAdminUser])
+def transition_appointments(request):
+    serializer = BulkTransitionSerializer(data=request.data)
+    if not serializer.is_valid():
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+    try:
+        result = transition(serializer.validated_data['state'], serializer.get_criteria(), 'api',
+                            user=request.user)
+        return Response(result, status=status.HTTP_200_OK)
+    except Exception as e:
+        return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+@api_view(["GET"])
+@permission_classes([IsStaffOrDoctor])
+def doctor_appointments(request, doctor_id):
+    query = DoctorAgendaQuerySerializer(data=request.query_params)
+    if not query.is_valid():
+        return Response(query.errors, status=status.HTTP_400_BAD_REQUEST)
+
+    try:
+        day = query.validated_data.get('date') or timezone.localdate()
+        appointments = doctor_agenda(doctor_id, day, query.validated_data.get('state'))
+        return Response({"doctor": doctor_id, "date": day, "appointments": appointments},
+                        status=status.HTTP_200_OK)
+    except Exception as e:
+        return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+@api_view(["GET"])
+@permission_classes([IsStaffOrPacient])
+def pacient_appointments(request, pacient_id):
+    query = PacientUpcomingQuerySerializer(data=request.query_params)
+    if not query.is_valid():
+        return Response(query.errors, status=status.HTTP_400_BAD_REQUEST)
+
+    try:
+        appointments = pacient_upcoming(pacient_id, query.validated_data['limit'],
+                                        query.validated_data.get('since'))
+        return Response({"pacient": pacient_id, "appointments": appointments}, status=status.HTTP_200_OK)
+    except Exception as e:
+        return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 def delete_appointment(request):
     return None
 
 def detail_appointment(request):
     return None
+
+
+@api_view(["GET"])
+def availability(request):
+    query = AvailabilityQuerySerializer(data=request.query_params)
+    if not query.is_valid():
+        return Response(query.errors, status=status.HTTP_400_BAD_REQUEST)
+
+    try:
+        slots = free_slots(
+            query.validated_data['date_from'],
+            query.validated_data['date_to'],
+            doctor_ids=query.validated_data.get('doctor') or None,
+        )
+        data = [
+            {
+                "doctor": doctor_id,
+                "slots": [
+                    {"date": start.date(), "time_start": start.time(), "time_end": end.time()}
+                    for start, end in doctor_slots
+                ],
+            }
+            for doctor_id, doctor_slots in sorted(slots.items())
+        ]
+        return Response({"availability": data}, status=status.HTTP_200_OK)
+    except Exception as e:
+        return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+@api_view(["GET"])
+def next_slot(request, doctor_id):
+    query = NextSlotQuerySerializer(data=request.query_params)
+    if not query.is_valid():
+        return Response(query.errors, status=status.HTTP_400_BAD_REQUEST)
+
+    try:
+        slot = next_free_slot(doctor_id, query.validated_data.get('after'))
+        if slot is None:
+            return Response({"error": "The doctor has no free slot."}, status=status.HTTP_404_NOT_FOUND)
+        start = timezone.localtime(slot.start)
+        end = start + timedelta(minutes=slot.duration)
+        return Response({
+            "doctor": doctor_id,
+            "date": start.date(),
+            "time_start": start.time(),
+            "time_end": end.time(),
+        }, status=status.HTTP_200_OK)
+    except Exception as e:
+        return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+@api_view(["GET"])
+@permission_classes([IsAdminUser])
+def utilization(request):
+    query = UtilizationQuerySerializer(data=request.query_params)
+    if not query.is_valid():
+        return Response(query.errors, status=status.HTTP_400_BAD_REQUEST)
+
+    try:
+        data = query.validated_data
+        results = utilization_report(
+            data['date_from'], data['date_to'], group=data['group'], by_day=data['by_day'],
+            doctor_ids=data.get('doctor'), specialty_ids=data.get('specialty'),
+        )
+        return Response({"group": data['group'], "utilization": results}, status=status.HTTP_200_OK)
+    except Exception as e:
+        return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
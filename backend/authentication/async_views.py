@@ -0,0 +1,9 @@
+from rest_framework import status
+
+from .asyncapi import async_api_view
+from .serializers import UserSerializer
+
+
+@async_api_view()
+async def profile(request):
+    return UserSerializer(instance=request.user).data, status.HTTP_200_OK
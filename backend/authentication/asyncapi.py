@@ -0,0 +1,55 @@
+from functools import wraps
+
+from django.contrib.auth.models import AnonymousUser
+from django.http import HttpResponse
+from rest_framework import status
+from rest_framework.exceptions import AuthenticationFailed, NotAuthenticated, PermissionDenied
+from rest_framework.settings import api_settings
+
+from .authentication import CachedTokenAuthentication
+
+
+def render(data, status_code=status.HTTP_200_OK, headers=None):
+    # El primer renderer de REST_FRAMEWORK, como la negociacion de las vistas sync
+    return HttpResponse(api_settings.DEFAULT_RENDERER_CLASSES[0]().render(data), status=status_code,
+                        content_type='application/json', headers=headers)
+
+
+def async_api_view(admin_only=False):
+    """
+    Minimal async counterpart of ``@api_view(["GET"])`` for read endpoints:
+    token authentication through the async ORM/cache, IsAuthenticated or
+    IsAdminUser, and JSON rendering with the first of DRF's ``DEFAULT_RENDERER_CLASSES``. The view returns
+    ``(data, status)`` or an ``HttpResponse``.
+    """
+    def decorator(view):
+        @wraps(view)
+        async def wrapper(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return render({"detail": f'Method "{request.method}" not allowed.'},
+                              status.HTTP_405_METHOD_NOT_ALLOWED, {"Allow": "GET, HEAD"})
+
+            authentication = CachedTokenAuthentication()
+            unauthorized = {"WWW-Authenticate": authentication.authenticate_header(request)}
+            try:
+                authenticated = await authentication.aauthenticate(request)
+            except AuthenticationFailed as e:
+                return render({"detail": e.detail}, status.HTTP_401_UNAUTHORIZED, unauthorized)
+            if authenticated is None:
+                request.user, request.auth = AnonymousUser(), None
+                return render({"detail": NotAuthenticated.default_detail},
+                              status.HTTP_401_UNAUTHORIZED, unauthorized)
+            request.user, request.auth = authenticated
+            if admin_only and not request.user.is_staff:
+                return render({"detail": PermissionDenied.default_detail}, status.HTTP_403_FORBIDDEN)
+
+            try:
+                result = await view(request, *args, **kwargs)
+            except Exception as e:
+                return render({"error": str(e)}, status.HTTP_500_INTERNAL_SERVER_ERROR)
+            if isinstance(result, HttpResponse):
+                return result
+            data, status_code = result
+            return render(data, status_code)
+        return wrapper
+    return decorator
@@ -0,0 +1,112 @@
+import uuid
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+from django.utils.translation import gettext_lazy as _
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+
+from core.caching import cache_timeout
+from core.routing import read_from
+
+
+def token_cache_key(key):
+    return f'auth:token:{key}'
+
+
+def generation_key(key):
+    return f'auth:token-generation:{key}'
+
+
+def invalidate_tokens(keys):
+    # Sin generacion ninguna entrada cacheada del token vale, aunque se vuelva a guardar
+    cache.delete_many([cache_key for key in keys for cache_key in (generation_key(key), token_cache_key(key))])
+
+
+def invalidate_token(key):
+    invalidate_tokens([key])
+
+
+def user_token_keys(user_id, using=DEFAULT_DB_ALIAS):
+    return list(Token.objects.using(using).filter(user_id=user_id).values_list('key', flat=True))
+
+
+def token_generation(cached, key):
+    """Generation of the token in ``cached`` (``get_many`` result), created if it has none."""
+    generation = cached.get(generation_key(key))
+    if generation is None:
+        generation = uuid.uuid4().hex
+        if not cache.add(generation_key(key), generation, cache_timeout(settings.TOKEN_CACHE_TIMEOUT)):
+            generation = cache.get(generation_key(key)) or generation
+    return generation
+
+
+def cached_token(cached, key):
+    entry = cached.get(token_cache_key(key))
+    if entry is not None and entry[1] == cached.get(generation_key(key)):
+        return entry[0]
+    return None
+
+
+class _TokenKeyParser(TokenAuthentication):
+    """Reuses DRF's Authorization header parsing and returns the raw key."""
+
+    def authenticate_credentials(self, key):
+        return key
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """
+    TokenAuthentication with a TTL cache of token -> (user, token).
+
+    Each entry carries the generation the token had before the database was
+    read. ``authentication.signals`` drops the generation when the token is
+    deleted (logout) or the user is saved (deactivation, password or profile
+    change), before and after the commit, so an entry filled by a request
+    that raced the change never matches again. With a per-process cache
+    (``CACHE_SHARED`` off) the other workers do not see the change: their
+    entries expire after ``LOCAL_CACHE_TIMEOUT`` seconds. Tokens are always
+    read from the primary.
+    """
+
+    def authenticate_credentials(self, key):
+        cached = cache.get_many([token_cache_key(key), generation_key(key)])
+        token = cached_token(cached, key)
+        if token is not None:
+            return (token.user, token)
+
+        generation = token_generation(cached, key)
+        # Del primario: una replica atrasada volveria a cachear un token revocado
+        with read_from(None):
+            user, token = super().authenticate_credentials(key)
+        cache.set(token_cache_key(key), (token, generation), cache_timeout(settings.TOKEN_CACHE_TIMEOUT))
+        return (user, token)
+
+    async def aauthenticate(self, request):
+        """Async counterpart of ``authenticate`` for plain Django async views."""
+        key = _TokenKeyParser().authenticate(request)
+        if key is None:
+            return None
+        return await self.aauthenticate_credentials(key)
+
+    async def aauthenticate_credentials(self, key):
+        cached = await cache.aget_many([token_cache_key(key), generation_key(key)])
+        token = cached_token(cached, key)
+        if token is not None:
+            return (token.user, token)
+
+        generation = await sync_to_async(token_generation)(cached, key)
+        model = self.get_model()
+        try:
+            with read_from(None):
+                token = await model.objects.select_related('user').aget(key=key)
+        except model.DoesNotExist:
+            raise exceptions.AuthenticationFailed(_('Invalid token.'))
+        if not token.user.is_active:
+            raise exceptions.AuthenticationFailed(_('User inactive or deleted.'))
+
+        await cache.aset(token_cache_key(key), (token, generation), cache_timeout(settings.TOKEN_CACHE_TIMEOUT))
+        return (token.user, token)
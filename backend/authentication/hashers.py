@@ -0,0 +1,16 @@
+from django.conf import settings
+from django.contrib.auth.hashers import PBKDF2PasswordHasher
+
+
+class ConfigurablePBKDF2PasswordHasher(PBKDF2PasswordHasher):
+    """
+    PBKDF2-SHA256 with the work factor taken from ``PASSWORD_HASH_ITERATIONS``.
+
+    Keeps the ``pbkdf2_sha256`` algorithm name, so existing hashes still verify
+    and ``must_update`` flags any hash stored with a different iteration count
+    (higher or lower) to be upgraded on the next successful login.
+    """
+
+    @property
+    def iterations(self):
+        return settings.PASSWORD_HASH_ITERATIONS
@@ -0,0 +1,67 @@
+import threading
+import time
+import uuid
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+PASSWORD = "bench-password-123"
+
+
+class Command(BaseCommand):
+    help = (
+        "Logins per second through the login endpoint for each PBKDF2 cost. The first "
+        "cost is the baseline (Django's default). Uses throwaway users in the configured database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--costs', default='870000,260000,100000',
+                            help='Comma separated PBKDF2 iteration counts (default: 870000,260000,100000).')
+        parser.add_argument('--logins', type=int, default=40,
+                            help='Logins per cost (default: 40).')
+        parser.add_argument('--workers', type=int, default=4,
+                            help='Concurrent clients (default: 4).')
+
+    def handle(self, *args, **options):
+        costs = [int(value) for value in options['costs'].split(',')]
+        users = [
+            User.objects.create(username=f"bench_{uuid.uuid4().hex[:12]}",
+                                email=f"bench_{uuid.uuid4().hex[:12]}@bench.local")
+            for _ in range(options['workers'])
+        ]
+        baseline = None
+        try:
+            for cost in costs:
+                with override_settings(PASSWORD_HASH_ITERATIONS=cost):
+                    for user in users:
+                        user.set_password(PASSWORD)
+                        user.save()
+                    rate = self.run(users, options['logins'])
+                baseline = baseline or rate
+                self.stdout.write(f"  {cost:>8} iterations: {rate:8.1f} logins/s  ({rate / baseline:.1f}x)")
+        finally:
+            User.objects.filter(id__in=[user.id for user in users]).delete()
+
+    def run(self, users, logins):
+        per_worker = max(1, logins // len(users))
+
+        def worker(user):
+            client = APIClient(SERVER_NAME='localhost')
+            try:
+                for _ in range(per_worker):
+                    response = client.post(reverse('login'), {'email': user.email, 'password': PASSWORD})
+                    assert response.status_code == 200, response.status_code
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=worker, args=(user,)) for user in users]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return per_worker * len(users) / (time.perf_counter() - started)
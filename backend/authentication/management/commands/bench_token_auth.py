@@ -0,0 +1,78 @@
+import statistics
+import time
+import uuid
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import resolve, reverse
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from authentication.authentication import CachedTokenAuthentication
+
+ENDPOINTS = ['profile', 'users', 'pacients', 'doctors', 'specialties']
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare TokenAuthentication with CachedTokenAuthentication: latency of the token "
+        "lookup and end-to-end latency/queries of profile and the list endpoints. Uses a "
+        "throwaway staff user in the configured database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=500,
+                            help='Requests per endpoint and authentication class (default: 500).')
+
+    def handle(self, *args, **options):
+        iterations = options['iterations']
+        user = User.objects.create(username=f"bench_{uuid.uuid4().hex[:12]}", is_staff=True)
+        token = Token.objects.create(user=user)
+        try:
+            self.stdout.write("Token lookup (authenticate_credentials):")
+            for authentication in (TokenAuthentication(), CachedTokenAuthentication()):
+                cache.clear()
+                timings, queries = self.measure(lambda: authentication.authenticate_credentials(token.key),
+                                                iterations)
+                self.report(type(authentication).__name__, timings, queries)
+
+            self.stdout.write("\nEnd to end (GET, token header):")
+            client = APIClient(SERVER_NAME='localhost')
+            client.credentials(HTTP_AUTHORIZATION=f"Token {token.key}")
+            for name in ENDPOINTS:
+                url = reverse(name)
+                view = resolve(url).func.cls
+                original = view.authentication_classes
+                try:
+                    for authentication_class in (TokenAuthentication, CachedTokenAuthentication):
+                        view.authentication_classes = [authentication_class]
+                        cache.clear()
+                        client.get(url)
+                        timings, queries = self.measure(lambda: client.get(url), iterations)
+                        self.report(f"{name} [{authentication_class.__name__}]", timings, queries)
+                finally:
+                    view.authentication_classes = original
+        finally:
+            user.delete()
+            cache.clear()
+
+    def measure(self, call, iterations):
+        timings = []
+        with CaptureQueriesContext(connection) as context:
+            for _ in range(iterations):
+                started = time.perf_counter()
+                call()
+                timings.append(time.perf_counter() - started)
+        return timings, len(context.captured_queries) / iterations
+
+    def report(self, label, timings, queries):
+        timings.sort()
+        p95 = timings[int(len(timings) * 0.95) - 1]
+        self.stdout.write(
+            f"  {label:<45} mean {statistics.mean(timings) * 1e6:9.1f} us"
+            f"  p95 {p95 * 1e6:9.1f} us  queries/call {queries:.2f}"
+        )
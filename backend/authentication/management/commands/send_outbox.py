@@ -0,0 +1,27 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from authentication.outbox import deliver_all
+
+
+class Command(BaseCommand):
+    help = "Deliver the pending emails of the outbox in batches over one backend connection per batch."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--loop', action='store_true',
+                            help='Keep polling the outbox instead of exiting when it is empty.')
+        parser.add_argument('--batch-size', type=int, default=settings.EMAIL_OUTBOX_BATCH_SIZE,
+                            help=f'Emails per batch (default: {settings.EMAIL_OUTBOX_BATCH_SIZE}).')
+
+    def handle(self, *args, **options):
+        while True:
+            close_old_connections()
+            sent, failed = deliver_all(options['batch_size'])
+            if sent or failed or not options['loop']:
+                self.stdout.write(f"{sent} sent, {failed} failed.")
+            if not options['loop']:
+                return
+            time.sleep(settings.EMAIL_OUTBOX_POLL_SECONDS)
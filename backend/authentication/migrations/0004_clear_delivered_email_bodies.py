@@ -0,0 +1,18 @@
+from django.db import migrations
+
+
+def clear_bodies(apps, schema_editor):
+    # Los correos ya entregados o descartados no guardan su cuerpo (authentication.outbox)
+    OutboundEmail = apps.get_model('authentication', 'OutboundEmail')
+    OutboundEmail.objects.filter(status__in=['sent', 'failed']).exclude(body='').update(body='')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authentication', '0003_outboundemail'),
+    ]
+
+    operations = [
+        migrations.RunPython(clear_bodies, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,31 @@
+from django.db import models
+from django.utils import timezone
+
+
+class OutboundEmail(models.Model):
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('sent', 'Sent'),
+        ('failed', 'Failed'),
+    ]
+
+    subject = models.CharField(max_length=250)
+    body = models.TextField()
+    from_email = models.CharField(max_length=250, blank=True, null=True)
+    to = models.JSONField(default=list)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveSmallIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    # Lote del worker que reclamo el correo (ver authentication.outbox.claim_batch)
+    claim = models.UUIDField(blank=True, null=True, db_index=True)
+    last_error = models.TextField(blank=True, null=True)
+    register_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at'], name='outbound_email_due_idx'),
+        ]
+
+    def __str__(self):
+        return f"Email '{self.subject}' to {', '.join(self.to)} ({self.status})"
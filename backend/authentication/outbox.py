@@ -0,0 +1,135 @@
+import logging
+import threading
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+
+from .models import OutboundEmail
+
+logger = logging.getLogger(__name__)
+
+
+def enqueue_email(subject, body, from_email, recipients):
+    """
+    Store the email in the outbox and wake the in-process worker after commit.
+    The body is cleared once the email is sent or given up: it may carry a
+    link with a live token (password reset).
+    """
+    email = OutboundEmail.objects.create(subject=subject, body=body, from_email=from_email,
+                                         to=list(recipients))
+    if settings.EMAIL_OUTBOX_THREAD:
+        transaction.on_commit(OutboxWorker.wake)
+    return email
+
+
+def claim_batch(batch_size):
+    """
+    Lease up to ``batch_size`` due emails to this caller. The lease moves
+    ``next_attempt_at`` forward, so emails held by a crashed worker become due
+    again once it expires.
+    """
+    now = timezone.now()
+    claim = uuid.uuid4()
+    due = OutboundEmail.objects.filter(status='pending', next_attempt_at__lte=now)
+    ids = list(due.order_by('next_attempt_at').values_list('pk', flat=True)[:batch_size])
+    if not ids:
+        return []
+    due.filter(pk__in=ids).update(
+        claim=claim, next_attempt_at=now + timedelta(seconds=settings.EMAIL_OUTBOX_LEASE_SECONDS))
+    return list(OutboundEmail.objects.filter(claim=claim))
+
+
+def retry_later(email, error):
+    email.attempts += 1
+    email.last_error = str(error)
+    if email.attempts >= settings.EMAIL_OUTBOX_MAX_ATTEMPTS:
+        email.status = 'failed'
+        email.body = ''
+    else:
+        # Backoff exponencial: base, 2*base, 4*base, ...
+        delay = settings.EMAIL_OUTBOX_RETRY_SECONDS * 2 ** (email.attempts - 1)
+        email.next_attempt_at = timezone.now() + timedelta(seconds=delay)
+    email.save(update_fields=['attempts', 'last_error', 'status', 'next_attempt_at', 'body'])
+
+
+def deliver_pending(batch_size=None):
+    """
+    Send one batch of due emails over a single backend connection.
+    Returns ``(sent, failed)`` for the batch.
+    """
+    emails = claim_batch(batch_size or settings.EMAIL_OUTBOX_BATCH_SIZE)
+    if not emails:
+        return 0, 0
+
+    connection = get_connection(fail_silently=False)
+    try:
+        connection.open()
+    except Exception as e:
+        logger.warning("Email backend unavailable: %s", e)
+        for email in emails:
+            retry_later(email, e)
+        return 0, len(emails)
+
+    sent = failed = 0
+    try:
+        for email in emails:
+            message = EmailMessage(email.subject, email.body, email.from_email, email.to,
+                                   connection=connection)
+            try:
+                message.send()
+            except Exception as e:
+                logger.warning("Could not send email %s: %s", email.pk, e)
+                retry_later(email, e)
+                failed += 1
+                continue
+            email.status = 'sent'
+            email.sent_at = timezone.now()
+            email.attempts += 1
+            email.body = ''
+            email.save(update_fields=['status', 'sent_at', 'attempts', 'body'])
+            sent += 1
+    finally:
+        connection.close()
+    return sent, failed
+
+
+def deliver_all(batch_size=None):
+    sent = failed = 0
+    while True:
+        batch_sent, batch_failed = deliver_pending(batch_size)
+        if not batch_sent and not batch_failed:
+            return sent, failed
+        sent += batch_sent
+        failed += batch_failed
+
+
+class OutboxWorker(threading.Thread):
+    """Daemon thread that drains the outbox; started on the first enqueue."""
+    _instance = None
+    _lock = threading.Lock()
+
+    def __init__(self):
+        super().__init__(name='email-outbox', daemon=True)
+        self.event = threading.Event()
+
+    @classmethod
+    def wake(cls):
+        with cls._lock:
+            if cls._instance is None or not cls._instance.is_alive():
+                cls._instance = cls()
+                cls._instance.start()
+        cls._instance.event.set()
+
+    def run(self):
+        while True:
+            self.event.wait(settings.EMAIL_OUTBOX_POLL_SECONDS)
+            self.event.clear()
+            close_old_connections()
+            try:
+                deliver_all()
+            except Exception:
+                logger.exception("Email outbox worker failed")
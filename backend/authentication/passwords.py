@@ -0,0 +1,51 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth.hashers import check_password, make_password
+from django.contrib.auth.models import User
+from django.db import connection, transaction
+
+_executor = None
+
+
+def executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=settings.PASSWORD_HASH_WORKERS,
+                                       thread_name_prefix='password-hash')
+    return _executor
+
+
+def submit(function, *args):
+    """Run ``function`` in the hashing pool, or inline when PASSWORD_HASH_WORKERS is 0."""
+    if not settings.PASSWORD_HASH_WORKERS:
+        return function(*args)
+    return executor().submit(function, *args)
+
+
+def rehash(user_id, raw_password, old_encoded):
+    try:
+        # Solo si nadie cambio la contrasena mientras tanto
+        User.objects.filter(pk=user_id, password=old_encoded).update(
+            password=make_password(raw_password))
+    finally:
+        if settings.PASSWORD_HASH_WORKERS:
+            connection.close()
+
+
+def verify_password(user, raw_password):
+    """
+    Same as ``user.check_password`` but, when the stored hash uses an outdated
+    hasher or cost, the upgrade (a second full hash plus an UPDATE) runs in the
+    hashing pool after commit instead of inside the request.
+
+    Only the upgrade is deferred: the check itself still costs one full hash
+    in the request, as do the ``make_password`` calls of registration and
+    password changes. Their latency is set by ``PASSWORD_HASH_ITERATIONS``.
+    """
+    old_encoded = user.password
+
+    def setter(raw):
+        transaction.on_commit(lambda: submit(rehash, user.pk, raw, old_encoded))
+
+    return check_password(raw_password, old_encoded, setter)
@@ -1,9 +1,11 @@
 from django.contrib.auth.models import User
 from rest_framework import serializers
 from rest_framework.exceptions import ValidationError
+from core.fieldsets import SparseFieldsetMixin
 from core.models import Pacient, Person
+from .passwords import verify_password
 
-class UserSerializer(serializers.ModelSerializer):
+class UserSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     email = serializers.EmailField(required=True)
     password = serializers.CharField(write_only=True)
 
@@ -13,8 +15,9 @@ class UserSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'date_joined', 'is_active']
 
     def create(self, validated_data):
-        user = User.objects.create(**validated_data)
-        user.set_password(validated_data['password'])
+        password = validated_data.pop('password')
+        user = User(**validated_data)
+        user.set_password(password)
         user.save()
         person = Person.objects.create(user=user)
         Pacient.objects.create(person=person)
@@ -62,7 +65,7 @@ class ChangePasswordSerializer(serializers.Serializer):
 
     def validate_current_password(self, value):
         user = self.context.get('user')  # El usuario viene desde views
-        if not user.check_password(value):
+        if not verify_password(user, value):
             raise ValidationError("La contraseña actual no es correcta")
         return value
 
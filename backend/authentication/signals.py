@@ -0,0 +1,28 @@
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from .authentication import invalidate_token, invalidate_tokens, user_token_keys
+
+
+@receiver(post_delete, sender=Token)
+def token_deleted(sender, instance, **kwargs):
+    invalidate_token(instance.key)
+    # Y de nuevo tras el commit, por si una peticion concurrente lo volvio a cachear
+    transaction.on_commit(lambda: invalidate_token(instance.key))
+
+
+# Campos que la autenticacion por token no usa: el login solo guarda last_login.
+# Al borrar un usuario sus tokens se borran en cascada y los invalida token_deleted
+TOKEN_UNRELATED_FIELDS = {'last_login', 'password'}
+
+
+@receiver(post_save, sender=User)
+def user_changed(sender, instance, using, update_fields=None, **kwargs):
+    if update_fields and set(update_fields) <= TOKEN_UNRELATED_FIELDS:
+        return
+    keys = user_token_keys(instance.pk, using)
+    invalidate_tokens(keys)
+    transaction.on_commit(lambda: invalidate_tokens(keys), using=using)
@@ -1,3 +1,217 @@
-from django.test import TestCase
+from django.contrib.auth.models import User, update_last_login
+from django.core import mail
+from django.core.cache import cache
+from django.core.mail.backends.base import BaseEmailBackend
+from django.contrib.auth.hashers import make_password
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+from core.models import Person
 
-# Create your tests here.
+from .authentication import token_cache_key, token_generation
+from .models import OutboundEmail
+from .outbox import deliver_all, deliver_pending, enqueue_email
+from .passwords import rehash
+
+
+class UsersListTests(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create(username="admin", is_staff=True)
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def test_users_are_paginated_and_exclude_inactive(self):
+        for index in range(4):
+            User.objects.create(username=f"user_{index}", email=f"user_{index}@test.com")
+        User.objects.create(username="inactive", is_active=False)
+
+        response = self.client.get(reverse('users'), {'page_size': 3})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['results']), 3)
+
+        response = self.client.get(response.data['next'])
+        usernames = [user['username'] for user in response.data['results']]
+        self.assertEqual(usernames, ['user_2', 'user_3'])
+
+    def test_sparse_fieldset(self):
+        User.objects.create(username="user_0", email="user_0@test.com")
+        response = self.client.get(reverse('users'), {'fields': 'username'})
+        self.assertEqual(response.data['results'], [{'username': 'admin'}, {'username': 'user_0'}])
+        self.assertEqual(self.client.get(reverse('users'), {'fields': 'password'}).status_code, 400)
+
+    def test_etag_changes_with_users(self):
+        user = User.objects.create(username="user_0", email="user_0@test.com")
+        Person.objects.create(user=user)
+        etag = self.client.get(reverse('users'))['ETag']
+        self.assertEqual(self.client.get(reverse('users'), HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        self.client.patch(reverse('update_user', args=[user.pk]), {"email": "new@test.com"}, format='json')
+        response = self.client.get(reverse('users'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+
+class CachedTokenAuthenticationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create(username="pacient", email="pacient@test.com")
+        self.user.set_password("secret-password")
+        self.user.save()
+        self.token = Token.objects.create(user=self.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {self.token.key}")
+
+    def test_token_lookup_is_cached(self):
+        with self.assertNumQueries(1):
+            self.assertEqual(self.client.get(reverse('profile')).status_code, 200)
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse('profile'))
+        self.assertEqual(response.data['username'], "pacient")
+
+    def test_logout_invalidates_token(self):
+        self.client.get(reverse('profile'))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(self.client.post(reverse('logout_session')).status_code, 200)
+        self.assertEqual(self.client.get(reverse('profile')).status_code, 401)
+
+    def test_entry_filled_before_revocation_is_not_served(self):
+        key = self.token.key
+        generation = token_generation({}, key)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.token.delete()
+        # Una peticion concurrente guarda el token que leyo antes del borrado
+        cache.set(token_cache_key(key), (self.token, generation))
+        self.assertEqual(self.client.get(reverse('profile')).status_code, 401)
+
+    def test_last_login_keeps_cached_token(self):
+        self.client.get(reverse('profile'))
+        with self.captureOnCommitCallbacks(execute=True):
+            update_last_login(None, self.user)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get(reverse('profile')).status_code, 200)
+
+    def test_deactivated_user_is_rejected(self):
+        self.client.get(reverse('profile'))
+        admin = User.objects.create(username="admin", is_staff=True)
+        admin_client = APIClient()
+        admin_client.force_authenticate(admin)
+        with self.captureOnCommitCallbacks(execute=True):
+            admin_client.delete(reverse('delete_user', args=[self.user.pk]))
+        self.assertEqual(self.client.get(reverse('profile')).status_code, 401)
+
+    def test_password_change_refreshes_cached_user(self):
+        self.client.get(reverse('profile'))
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(reverse('change_password'), {
+                'current_password': "secret-password",
+                'new_password': "another-password",
+                'new_password_confirm': "another-password",
+            })
+        self.assertEqual(response.status_code, 200)
+        with self.assertNumQueries(1):
+            self.client.get(reverse('profile'))
+
+
+@override_settings(PASSWORD_HASH_ITERATIONS=1000, PASSWORD_HASH_WORKERS=0)
+class PasswordHashingTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create(username="pacient", email="pacient@test.com")
+        self.user.set_password("secret-password")
+        self.user.save()
+
+    def login(self, password="secret-password"):
+        with self.captureOnCommitCallbacks(execute=True):
+            return APIClient().post(reverse('login'), {'email': "pacient@test.com", 'password': password})
+
+    def test_hash_uses_configured_iterations(self):
+        self.assertTrue(self.user.password.startswith("pbkdf2_sha256$1000$"))
+
+    @override_settings(PASSWORD_HASH_ITERATIONS=2000)
+    def test_login_upgrades_hash_to_new_cost(self):
+        self.assertEqual(self.login().status_code, 200)
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.password.startswith("pbkdf2_sha256$2000$"))
+        self.assertEqual(self.login().status_code, 200)
+
+    @override_settings(PASSWORD_HASH_ITERATIONS=500)
+    def test_login_downgrades_hash_to_new_cost(self):
+        self.login()
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.password.startswith("pbkdf2_sha256$500$"))
+
+    def test_wrong_password_does_not_rehash(self):
+        old = self.user.password
+        self.assertEqual(self.login("wrong").status_code, 400)
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.password, old)
+
+    def test_rehash_does_not_overwrite_a_newer_password(self):
+        new = make_password("newer-password")
+        User.objects.filter(pk=self.user.pk).update(password=new)
+        rehash(self.user.pk, "secret-password", self.user.password)
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.password, new)
+
+
+class FailingEmailBackend(BaseEmailBackend):
+    def send_messages(self, email_messages):
+        raise ConnectionError("Relay unavailable")
+
+
+class UnreachableEmailBackend(BaseEmailBackend):
+    def open(self):
+        raise ConnectionError("Relay unreachable")
+
+
+@override_settings(EMAIL_OUTBOX_THREAD=False, EMAIL_OUTBOX_MAX_ATTEMPTS=3, EMAIL_OUTBOX_RETRY_SECONDS=30)
+class EmailOutboxTests(TestCase):
+    def test_reset_password_request_only_enqueues(self):
+        user = User.objects.create(username="pacient", email="pacient@test.com")
+        client = APIClient()
+        client.force_authenticate(user)
+        response = client.post(reverse('reset_password_request'), {'email': "pacient@test.com"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(mail.outbox, [])
+        email = OutboundEmail.objects.get()
+        self.assertEqual(email.to, ["pacient@test.com"])
+        self.assertEqual(email.status, 'pending')
+
+    def test_deliver_in_batches(self):
+        for index in range(5):
+            enqueue_email("Subject", "Body", "clinic@test.com", [f"user_{index}@test.com"])
+        self.assertEqual(deliver_pending(batch_size=2), (2, 0))
+        self.assertEqual(deliver_all(batch_size=2), (3, 0))
+        self.assertEqual(len(mail.outbox), 5)
+        self.assertEqual(mail.outbox[0].body, "Body")
+        self.assertFalse(OutboundEmail.objects.exclude(status='sent').exists())
+        self.assertFalse(OutboundEmail.objects.exclude(body='').exists())
+
+    @override_settings(EMAIL_BACKEND='authentication.tests.FailingEmailBackend')
+    def test_failed_send_is_retried_with_backoff(self):
+        email = enqueue_email("Subject", "Body", "clinic@test.com", ["user@test.com"])
+        with self.assertLogs('authentication.outbox', 'WARNING'):
+            self.assertEqual(deliver_pending(), (0, 1))
+        email.refresh_from_db()
+        self.assertEqual(email.status, 'pending')
+        self.assertEqual(email.attempts, 1)
+        self.assertIn("Relay unavailable", email.last_error)
+        # No vuelve a intentarse hasta que pase el backoff
+        self.assertEqual(deliver_pending(), (0, 0))
+
+        for attempt in range(2):
+            OutboundEmail.objects.update(next_attempt_at=email.register_at)
+            with self.assertLogs('authentication.outbox', 'WARNING'):
+                deliver_pending()
+        email.refresh_from_db()
+        self.assertEqual(email.status, 'failed')
+        self.assertEqual(email.attempts, 3)
+        self.assertEqual(email.body, '')
+
+    @override_settings(EMAIL_BACKEND='authentication.tests.UnreachableEmailBackend')
+    def test_unreachable_backend_retries_the_whole_batch(self):
+        for index in range(3):
+            enqueue_email("Subject", "Body", "clinic@test.com", [f"user_{index}@test.com"])
+        with self.assertLogs('authentication.outbox', 'WARNING'):
+            self.assertEqual(deliver_pending(), (0, 3))
+        self.assertEqual(set(OutboundEmail.objects.values_list('attempts', flat=True)), {1})
@@ -1,6 +1,6 @@
 from django.urls import path, include
 from rest_framework import routers
-from . import views
+from . import views, async_views
 
 
 urlpatterns = [
@@ -23,3 +23,7 @@ urlpatterns = [
     path('reset_password_confirm/<uidb64>/<token>/',
          views.reset_password_confirm, name='reset_password_confirm')
 ]
+
+async_urlpatterns = [
+    path("profile/", async_views.profile, name="async_profile"),
+]
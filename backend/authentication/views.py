@@ -14,9 +14,14 @@ from django.contrib.auth.tokens import PasswordResetTokenGenerator
 from django.utils.encoding import force_bytes
 from django.utils.http import urlsafe_base64_encode, urlsafe_base64_decode
 from decouple import config
-from django.core.mail import send_mail
 from rest_framework.exceptions import ValidationError
 from django.views.decorators.csrf import csrf_exempt
+from core.conditional import conditional_list
+from core.fieldsets import FieldsetQuerySerializer
+from core.models import Person
+from core.pagination import paginate
+from .passwords import verify_password
+from .outbox import enqueue_email
 
 
 def create_user_data(request, is_register):
@@ -32,7 +37,6 @@ def create_user_data(request, is_register):
 
 def update_user_data(user, data):
     serializer = UserSerializer(user, data=data, partial=True, context={"request": user})
-    print(" --- ", serializer)
     if serializer.is_valid():
         serializer.save()
         return {"data": serializer.data}
@@ -45,7 +49,7 @@ def update_user_data(user, data):
 @permission_classes([AllowAny])
 def login(request):
     user = get_object_or_404(User, email=request.data.get("email"))
-    if not user.check_password(request.data.get("password")):
+    if not verify_password(user, request.data.get("password")):
         return Response({"error": "Invalid password"}, status=status.HTTP_400_BAD_REQUEST)
 
     token, _ = Token.objects.get_or_create(user=user)
@@ -111,10 +115,14 @@ def logout_session(request):
 
 @api_view(["GET"])
 @permission_classes([IsAdminUser])
+@conditional_list(Person, User)
 def users(request):
+    query = FieldsetQuerySerializer(data=request.query_params, context={'serializer': UserSerializer})
+    if not query.is_valid():
+        return Response(query.errors, status=status.HTTP_400_BAD_REQUEST)
+
     users = User.objects.all().filter(is_active=True)
-    serializer = UserSerializer(users, many=True)
-    return Response({"users": serializer.data})
+    return paginate(request, query.narrow(users), UserSerializer, fieldset=query.fieldset)
 
 
 @api_view(["GET"])
@@ -208,15 +216,13 @@ def reset_password_request(request):
         token_generator = PasswordResetTokenGenerator()
         token = token_generator.make_token(user)
         reset_url = f"http://localhost:8000/api/v1/reset_password_confirm/{uid}/{token}/"
-        print(f"Reset URL: {reset_url}")
 
-        # Send the email
-        send_mail(
+        # Se encola: el worker del outbox lo entrega (ver authentication.outbox)
+        enqueue_email(
             'Reset your password',
             f'Use this link to reset your password: {reset_url}',
             config('EMAIL_HOST_USER'),
             [user.email],
-            fail_silently=False,
         )
 
         return Response({"detail": "Email sent on your address"}, status=status.HTTP_200_OK)
@@ -0,0 +1,87 @@
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.utils.http import parse_etags
+from rest_framework import status
+from rest_framework.request import Request
+
+from authentication.asyncapi import async_api_view, render
+from .catalog import specialty_catalog, response_key
+from .routing import read_from
+from .conditional import conditional_list
+from .models import Person, Pacient, Doctor, Specialty
+from .pagination import apaginate
+from .serializers import DoctorSerializer, PacientSerializer, SpecialtySerializer
+from .serializers import DoctorListQuerySerializer, PacientListQuerySerializer
+from .serializers import DoctorDetailValuesSerializer, PacientValuesSerializer
+from .fieldsets import FieldsetQuerySerializer
+from .views import doctor_queryset, pacient_queryset
+
+# Versiones async (ASGI) de las vistas de lectura de core.views: mismas
+# consultas y mismo JSON, con el ORM async en lugar de sync_to_async por vista
+
+
+@async_api_view(admin_only=True)
+@conditional_list(Person, Pacient)
+async def pacients(request):
+    query = PacientListQuerySerializer(data=request.GET)
+    if not query.is_valid():
+        return query.errors, status.HTTP_400_BAD_REQUEST
+    pacients = query.filter_queryset(pacient_queryset().filter(person__user__is_active=True))
+    rows = PacientValuesSerializer.values(pacients, query.fieldset, query.get_ordering())
+    return await apaginate(Request(request), rows, PacientValuesSerializer,
+                           ordering=query.get_ordering(), fieldset=query.fieldset), status.HTTP_200_OK
+
+
+@async_api_view()
+async def detail_pacient(request, pacient_id):
+    query = FieldsetQuerySerializer(data=request.GET, context={'serializer': PacientSerializer})
+    if not query.is_valid():
+        return query.errors, status.HTTP_400_BAD_REQUEST
+    try:
+        pacient = await query.narrow(pacient_queryset()).aget(person_id=pacient_id)
+    except Pacient.DoesNotExist:
+        return {"error": "Pacient no encontrado."}, status.HTTP_404_NOT_FOUND
+    return PacientSerializer(pacient, fieldset=query.fieldset).data, status.HTTP_200_OK
+
+
+@async_api_view(admin_only=True)
+@conditional_list(Person, Doctor, Specialty)
+async def doctors(request):
+    query = DoctorListQuerySerializer(data=request.GET)
+    if not query.is_valid():
+        return query.errors, status.HTTP_400_BAD_REQUEST
+    doctors = query.filter_queryset(doctor_queryset())
+    rows = DoctorDetailValuesSerializer.values(doctors, query.fieldset, query.get_ordering())
+    return await apaginate(Request(request), rows, DoctorDetailValuesSerializer,
+                           ordering=query.get_ordering(), fieldset=query.fieldset), status.HTTP_200_OK
+
+
+@async_api_view()
+async def detail_doctor(request, doctor_id):
+    query = FieldsetQuerySerializer(data=request.GET, context={'serializer': DoctorSerializer})
+    if not query.is_valid():
+        return query.errors, status.HTTP_400_BAD_REQUEST
+    try:
+        doctor = await query.narrow(doctor_queryset()).aget(person_id=doctor_id)
+    except Doctor.DoesNotExist:
+        return {"error": "Doctor not Found."}, status.HTTP_404_NOT_FOUND
+    return DoctorSerializer(doctor, fieldset=query.fieldset).data, status.HTTP_200_OK
+
+
+@async_api_view(admin_only=True)
+async def specialties(request):
+    catalog = await sync_to_async(specialty_catalog)()
+    etag = f'"specialties-{catalog["version"]}"'
+    if etag in parse_etags(request.headers.get("If-None-Match", "")):
+        return HttpResponse(status=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+
+    key = response_key(catalog["version"], request.build_absolute_uri())
+    data = await cache.aget(key)
+    if data is None:
+        specialties = Specialty.objects.filter(is_active=True)
+        with read_from(None):
+            data = await apaginate(Request(request), specialties, SpecialtySerializer)
+        await cache.aset(key, data, settings.SPECIALTY_CATALOG_TIMEOUT)
+    return render(data, status.HTTP_200_OK, {"ETag": etag})
@@ -0,0 +1,194 @@
+import asyncio
+import os
+import platform
+import subprocess
+import time
+from contextlib import ExitStack
+from datetime import datetime, timezone
+
+import django
+from django.apps import apps
+from django.contrib.auth.models import User
+from django.db import connection, connections
+from django.test import Client
+from django.urls import reverse
+from django.utils.http import urlencode
+
+from . import loadtest
+from .loadtest import percentile
+from .models import Doctor, Pacient
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+class Route:
+    """
+    GET route of the suite: URL name, query string and, for detail routes,
+    the model whose ids are cycled through (``sample`` rows) as argument.
+    """
+
+    def __init__(self, label, name, query=None, model=None):
+        self.label = label
+        self.name = name
+        self.query = query or {}
+        self.model = model
+
+    def paths(self, sample):
+        suffix = f"?{urlencode(self.query)}" if self.query else ''
+        if self.model is None:
+            return [reverse(self.name) + suffix]
+        ids = list(self.model._default_manager.order_by('pk').values_list('pk', flat=True)[:sample])
+        return [reverse(self.name, args=[pk]) + suffix for pk in ids]
+
+
+# Rutas de lectura de core/urls.py, authentication/urls.py y appointments/urls.py
+ROUTES = [
+    Route('pacients', 'pacients'),
+    Route('pacients_filtered', 'pacients', {'blood_group': 'A+', 'ordering': '-register_at'}),
+    Route('pacients_compact', 'pacients', {'fields': 'person.first_name,person.last_name'}),
+    Route('doctors', 'doctors'),
+    Route('specialties', 'specialties'),
+    Route('search', 'search', {'q': 'quispe'}),
+    Route('detail_pacient', 'detail_pacient', model=Pacient),
+    Route('detail_doctor', 'detail_doctor', model=Doctor),
+    Route('profile', 'profile'),
+    Route('users', 'users'),
+    Route('detail_user', 'detail_user', model=User),
+    Route('doctor_agenda', 'doctor_appointments', model=Doctor),
+    Route('pacient_upcoming', 'pacient_appointments', model=Pacient),
+]
+
+
+def current_rss(pid=None):
+    """Resident set size in bytes of ``pid`` (this process by default); None if unknown (not Linux)."""
+    try:
+        with open(f"/proc/{pid or 'self'}/status") as status:
+            for line in status:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        return None
+    return None
+
+
+def peak_rss():
+    if resource is None:
+        return None
+    # ru_maxrss: KiB en Linux, bytes en macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if platform.system() == 'Darwin' else peak * 1024
+
+
+def summary(latencies, queries, statuses):
+    latencies = sorted(latencies)
+    return {
+        'requests': len(latencies),
+        'mean': sum(latencies) / len(latencies) if latencies else 0.0,
+        'p50': percentile(latencies, 0.50),
+        'p95': percentile(latencies, 0.95),
+        'p99': percentile(latencies, 0.99),
+        'max': latencies[-1] if latencies else 0.0,
+        'queries': sum(queries) / len(queries) if queries else None,
+        'max_queries': max(queries) if queries else None,
+        'statuses': statuses,
+    }
+
+
+def run_client(routes, token, requests, warmup=10, sample=100):
+    """
+    Drives each route ``requests`` times through the Django test client, in
+    this process and through the whole middleware stack. Queries are counted
+    with ``execute_wrapper`` on every database connection.
+    """
+    # 'testserver' no esta en ALLOWED_HOSTS fuera del runner de tests
+    client = Client(SERVER_NAME='localhost', HTTP_AUTHORIZATION=f"Token {token}", HTTP_ACCEPT='application/json')
+    count = 0
+
+    def counter(execute, sql, params, many, context):
+        nonlocal count
+        count += 1
+        return execute(sql, params, many, context)
+
+    results = {}
+    for route in routes:
+        paths = route.paths(sample)
+        if not paths:
+            continue
+        for number in range(warmup):
+            client.get(paths[number % len(paths)])
+        latencies, queries, statuses = [], [], {}
+        rss_before = current_rss()
+        with ExitStack() as stack:
+            for alias in connections:
+                stack.enter_context(connections[alias].execute_wrapper(counter))
+            for number in range(requests):
+                count = 0
+                started = time.perf_counter()
+                response = client.get(paths[number % len(paths)])
+                latencies.append(time.perf_counter() - started)
+                queries.append(count)
+                statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+        results[route.label] = summary(latencies, queries, statuses)
+        results[route.label].update(rss_before=rss_before, rss_after=current_rss(), peak_rss=peak_rss())
+    return results
+
+
+def run_http(routes, base_url, token, requests, concurrency, warmup=50, sample=100, server_pids=()):
+    """
+    Load-tests each route of a running server with ``concurrency`` keep-alive
+    connections (``core.loadtest``). Queries per request come from the
+    ``Server-Timing`` header of ``core.metrics``; RSS from ``server_pids``.
+    """
+    base_url = base_url.rstrip('/')
+    results = {}
+    for route in routes:
+        urls = [base_url + path for path in route.paths(sample)]
+        if not urls:
+            continue
+        if warmup:
+            asyncio.run(loadtest.run(urls, min(concurrency, warmup), warmup, token))
+        result = asyncio.run(loadtest.run(urls, concurrency, requests, token))
+        result['rss_after'] = sum(current_rss(pid) or 0 for pid in server_pids) or None
+        results[route.label] = result
+    return results
+
+
+def metadata():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                                cwd=os.path.dirname(__file__), timeout=5).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+    return {
+        'created': datetime.now(timezone.utc).isoformat(),
+        'commit': commit,
+        'python': platform.python_version(),
+        'django': django.get_version(),
+        'database': connection.vendor,
+        'rows': {
+            'pacients': Pacient.objects.count(),
+            'doctors': Doctor.objects.count(),
+            'users': User.objects.count(),
+            'appointments': apps.get_model('appointments', 'Appointment').objects.count(),
+        },
+    }
+
+
+def compare(base, new):
+    """Rows ``(mode, route, metric, base, new, change)`` of the routes measured in both result files."""
+    rows = []
+    for mode in ('client', 'http'):
+        for label, result in new.get(mode, {}).items():
+            previous = base.get(mode, {}).get(label)
+            if previous is None:
+                continue
+            for metric in ('p50', 'p95', 'p99', 'queries'):
+                before, after = previous.get(metric), result.get(metric)
+                if before is None or after is None:
+                    continue
+                change = (after - before) / before if before else None
+                rows.append((mode, label, metric, before, after, change))
+    return rows
@@ -0,0 +1,12 @@
+from django.conf import settings
+
+
+def cache_timeout(timeout):
+    """
+    TTL of a cache entry that writes invalidate. With a per-process cache
+    (``CACHE_SHARED`` off) other workers never see the invalidation, so the
+    entry lives at most ``LOCAL_CACHE_TIMEOUT`` seconds.
+    """
+    if settings.CACHE_SHARED:
+        return timeout
+    return min(timeout, settings.LOCAL_CACHE_TIMEOUT)
@@ -0,0 +1,56 @@
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .caching import cache_timeout
+from .models import Specialty
+from .routing import read_from
+
+CATALOG_KEY = 'core:specialty_catalog'
+VERSION_KEY = f'{CATALOG_KEY}:version'
+
+
+def catalog_version():
+    """Current version of the catalog; every specialty write replaces it."""
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        version = uuid.uuid4().hex
+        if not cache.add(VERSION_KEY, version, cache_timeout(settings.SPECIALTY_CATALOG_TIMEOUT)):
+            version = cache.get(VERSION_KEY) or version
+    return version
+
+
+def specialty_catalog():
+    """
+    Active specialties, cached under the current catalog version.
+
+    Returns ``{"version", "items", "descriptions"}``: ``items`` is the ordered
+    list of ``{"id", "description"}`` and ``descriptions`` maps id to
+    description. ``version`` is used as ETag and as prefix for the cached
+    responses. It is read before the database (always the primary), so a
+    reload that raced with a write stores the old catalog under the old
+    version, which nobody reads any more.
+    """
+    version = catalog_version()
+    key = f'{CATALOG_KEY}:{version}'
+    catalog = cache.get(key)
+    if catalog is None:
+        # Del primario: una replica atrasada dejaria el catalogo viejo bajo la version nueva
+        with read_from(None):
+            items = list(Specialty.objects.filter(is_active=True).order_by('pk').values('id', 'description'))
+        catalog = {
+            'version': version,
+            'items': items,
+            'descriptions': {item['id']: item['description'] for item in items},
+        }
+        cache.set(key, catalog, cache_timeout(settings.SPECIALTY_CATALOG_TIMEOUT))
+    return catalog
+
+
+def invalidate_specialty_catalog():
+    cache.set(VERSION_KEY, uuid.uuid4().hex, cache_timeout(settings.SPECIALTY_CATALOG_TIMEOUT))
+
+
+def response_key(version, path):
+    return f'{CATALOG_KEY}:{version}:{path}'
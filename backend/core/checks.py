@@ -0,0 +1,16 @@
+from django.conf import settings
+from django.core.checks import Error, register
+
+
+@register()
+def replica_pin_cache_check(app_configs, **kwargs):
+    """Read-your-writes pins live in the cache: with replicas every worker has to see them."""
+    if settings.DATABASE_REPLICA_ALIASES and not settings.CACHE_SHARED:
+        return [Error(
+            "Read replicas are configured with a per-process cache.",
+            hint="Pins to the primary (REPLICA_PIN_SECONDS) would only hold in the worker that "
+                 "served the write. Set CACHE_BACKEND to a shared backend (Redis, Memcached), or "
+                 "CACHE_SHARED=True if the site runs in a single process.",
+            id='core.E001',
+        )]
+    return []
@@ -0,0 +1,47 @@
+from django.conf import settings
+from django.middleware.gzip import GZipMiddleware
+from django.utils.cache import patch_vary_headers
+from django.utils.regex_helper import _lazy_re_compile
+
+try:
+    import brotli
+except ImportError:  # Dependencia opcional: sin brotli solo se usa gzip
+    brotli = None
+
+re_accepts_brotli = _lazy_re_compile(r"\bbr\b")
+
+
+class CompressionMiddleware(GZipMiddleware):
+    """
+    ``GZipMiddleware`` with a size threshold (``COMPRESSION_MIN_SIZE``) and
+    brotli, when the package is installed and the client accepts it, for
+    responses that are not streamed.
+
+    Strong ETags stay strong with the coding as suffix (``"tag-gzip"``,
+    ``"tag-br"``) instead of being made weak: each coding is a different
+    representation. ``core.conditional.etag_matches`` ignores the suffix.
+    """
+
+    def process_response(self, request, response):
+        if not response.streaming and len(response.content) < settings.COMPRESSION_MIN_SIZE:
+            return response
+        if response.has_header("Content-Encoding"):
+            return response
+
+        etag = response.get("ETag")
+        if (brotli is not None and not response.streaming
+                and re_accepts_brotli.search(request.META.get("HTTP_ACCEPT_ENCODING", ""))):
+            patch_vary_headers(response, ("Accept-Encoding",))
+            compressed_content = brotli.compress(response.content, quality=settings.COMPRESSION_BROTLI_QUALITY)
+            if len(compressed_content) >= len(response.content):
+                return response
+            response.content = compressed_content
+            response.headers["Content-Length"] = str(len(response.content))
+            response.headers["Content-Encoding"] = "br"
+        else:
+            response = super().process_response(request, response)
+
+        coding = response.get("Content-Encoding")
+        if etag and etag.startswith('"') and coding in ("br", "gzip"):
+            response.headers["ETag"] = f'{etag[:-1]}-{coding}"'
+        return response
@@ -0,0 +1,154 @@
+import hashlib
+import uuid
+from functools import wraps
+from inspect import iscoroutinefunction
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections, router, transaction
+from django.db.models.signals import post_delete, post_save
+from django.http import HttpResponse
+from django.utils.http import parse_etags
+from rest_framework import status
+from rest_framework.response import Response
+
+from authentication.asyncapi import render
+
+# Sufijos que CompressionMiddleware agrega al ETag de la respuesta comprimida
+ENCODING_SUFFIXES = ('-gzip', '-br')
+
+
+def generation_key(model):
+    return f'conditional:generation:{model._meta.label_lower}'
+
+
+def bump_generation(model):
+    cache.set(generation_key(model), uuid.uuid4().hex, None)
+
+
+def row_saved(sender, created, using, **kwargs):
+    if created:
+        transaction.on_commit(lambda: bump_generation(sender), using=using)
+
+
+def row_deleted(sender, using, **kwargs):
+    # Despues del commit: una lectura intermedia no asocia la generacion nueva a los datos viejos
+    transaction.on_commit(lambda: bump_generation(sender), using=using)
+
+
+def track_rows(model):
+    """Bump the generation of ``model`` on every insert and delete (``save()``/``delete()``)."""
+    label = model._meta.label_lower
+    post_save.connect(row_saved, sender=model, dispatch_uid=f'conditional:{label}:save')
+    post_delete.connect(row_deleted, sender=model, dispatch_uid=f'conditional:{label}:delete')
+
+
+def table_generations(models):
+    keys = [generation_key(model) for model in models]
+    generations = cache.get_many(keys)
+    for key in keys:
+        if key not in generations:
+            cache.add(key, uuid.uuid4().hex, None)
+            generations[key] = cache.get(key)
+    return tuple(generations[key] for key in keys)
+
+
+def use_generations():
+    # Cache por proceso: los demas workers no ven los cambios de generacion.
+    # Replicas: la generacion nueva llegaria antes que el borrado a la replica
+    # y el ETag de la pagina vieja quedaria fijo; ahi el conteo se lee de la replica
+    return settings.CACHE_SHARED and not settings.DATABASE_REPLICA_ALIASES
+
+
+def table_stamps(models):
+    """
+    ``max(updated_at)`` of each model with that column, in a single query on
+    the read database, plus what changes when rows are inserted or deleted:
+    the generation of each table that ``track_rows`` bumps, or its row count
+    when the generations cannot be trusted (``use_generations``).
+    """
+    generations = use_generations()
+    connection = connections[router.db_for_read(models[0])]
+    quote = connection.ops.quote_name
+    columns = []
+    for model in models:
+        table = quote(model._meta.db_table)
+        if not generations:
+            columns.append(f"(SELECT COUNT(*) FROM {table})")
+        fields = {field.name: field for field in model._meta.concrete_fields}
+        if 'updated_at' in fields:
+            columns.append(f"(SELECT MAX({quote(fields['updated_at'].column)}) FROM {table})")
+    stamps = ()
+    if columns:
+        with connection.cursor() as cursor:
+            cursor.execute(f"SELECT {', '.join(columns)}")
+            stamps = cursor.fetchone()
+    if generations:
+        stamps += table_generations(models)
+    return stamps
+
+
+def list_etag(request, stamps):
+    """Strong ETag of the list at ``request`` (path, query string and Accept) given the table stamps."""
+    key = f"{request.get_full_path()}|{request.headers.get('Accept', '')}|{stamps!r}"
+    return f'"{hashlib.sha256(key.encode()).hexdigest()[:32]}"'
+
+
+def etag_matches(request, etag):
+    # Comparacion debil (RFC 9110 13.1.2): W/ y el sufijo de la codificacion no cuentan
+    for candidate in parse_etags(request.headers.get('If-None-Match', '')):
+        if candidate == '*':
+            return True
+        candidate = candidate.removeprefix('W/')
+        for suffix in ENCODING_SUFFIXES:
+            if candidate.endswith(f'{suffix}"'):
+                candidate = candidate[:-len(suffix) - 1] + '"'
+        if candidate == etag:
+            return True
+    return False
+
+
+def conditional_list(*models):
+    """
+    ETag and ``If-None-Match`` for a list view whose rows come from
+    ``models``: the tag is derived from the stamps of each model
+    (``table_stamps``, one extra query), so an unchanged list answers 304
+    before running the page query or serializing. Changes not touching those columns must update
+    ``Person.updated_at`` (see ``core.signals``); bulk inserts of a model
+    without ``updated_at`` and raw deletes must call ``bump_generation``.
+
+    Works on the DRF views (``Response``) and on the ``async_api_view`` ones
+    (``(data, status)``); only 200 responses get the header.
+    """
+    for model in models:
+        track_rows(model)
+
+    def decorator(view):
+        if iscoroutinefunction(view):
+            @wraps(view)
+            async def async_wrapper(request, *args, **kwargs):
+                # Marcas leidas antes que los datos: una escritura intermedia invalida el ETag, no lo repite
+                etag = list_etag(request, await sync_to_async(table_stamps)(models))
+                if etag_matches(request, etag):
+                    return HttpResponse(status=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+                result = await view(request, *args, **kwargs)
+                if isinstance(result, HttpResponse):
+                    return result
+                data, status_code = result
+                if status_code != status.HTTP_200_OK:
+                    return result
+                return render(data, status_code, {"ETag": etag})
+            return async_wrapper
+
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            etag = list_etag(request, table_stamps(models))
+            if etag_matches(request, etag):
+                return Response(status=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+            response = view(request, *args, **kwargs)
+            if response.status_code == status.HTTP_200_OK:
+                response["ETag"] = etag
+            return response
+        return wrapper
+    return decorator
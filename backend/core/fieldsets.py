@@ -0,0 +1,168 @@
+from django.core.exceptions import FieldDoesNotExist
+from rest_framework import serializers
+from rest_framework.exceptions import ValidationError
+
+
+def parse_paths(value):
+    """'person.first_name,blood_group' -> {'person': {'first_name': {}}, 'blood_group': {}}"""
+    tree = {}
+    for path in filter(None, (item.strip() for item in value.split(','))):
+        node = tree
+        for name in path.split('.'):
+            if not name:
+                raise ValidationError(f"Invalid field path: '{path}'.")
+            node = node.setdefault(name, {})
+    return tree
+
+
+def nested_serializer(field):
+    """The serializer rendered by ``field`` (the child of a list), or None."""
+    nested = field.child if isinstance(field, serializers.ListSerializer) else field
+    return nested if isinstance(nested, serializers.BaseSerializer) else None
+
+
+class Fieldset:
+    """
+    Fields requested from one level of a serializer tree.
+
+    ``selection`` holds the field names of this level and, for nested
+    serializers, their own selection (None: every field). ``expanded`` holds
+    the nested serializers rendered as objects: the others are reduced to
+    their primary key.
+    """
+
+    def __init__(self, selection=None, expanded=None):
+        self.selection = selection
+        self.expanded = expanded or {}
+
+    @classmethod
+    def from_query(cls, fields=None, expand=None):
+        # Sin ?fields= ni ?expand= la respuesta es el arbol completo de siempre
+        if fields is None and expand is None:
+            return None
+        selection = parse_paths(fields) if fields else None
+        return cls(selection or None, parse_paths(expand or ''))
+
+    def apply(self, fields, path=''):
+        readable = {name: field for name, field in fields.items() if not field.write_only}
+        # Solo se expanden serializers anidados: un campo simple o desconocido es un error
+        unknown = [f"{path}{name}" for name in self.expanded if nested_serializer(readable.get(name)) is None]
+        if unknown:
+            raise ValidationError({'expand': [f"Unknown nested field: '{name}'." for name in unknown]})
+        if self.selection is not None:
+            unknown = [f"{path}{name}" for name in self.selection if name not in readable]
+            if unknown:
+                raise ValidationError({'fields': [f"Unknown field: '{name}'." for name in unknown]})
+            fields = {name: field for name, field in fields.items() if name in self.selection}
+
+        for name, field in fields.items():
+            nested = nested_serializer(field)
+            if nested is None:
+                continue
+            selection = (self.selection or {}).get(name) or None
+            if selection or name in self.expanded:
+                nested.fieldset = Fieldset(selection, self.expanded.get(name))
+                nested.fieldset_path = f"{path}{name}."
+            else:
+                fields[name] = serializers.PrimaryKeyRelatedField(
+                    read_only=True, many=nested is not field, source=field.source)
+        return fields
+
+
+class SparseFieldsetMixin:
+    """
+    Serializer whose readable fields can be narrowed with a ``fieldset``.
+    Nested serializers using the mixin receive their part of it.
+    """
+
+    def __init__(self, *args, fieldset=None, **kwargs):
+        self.fieldset = fieldset
+        self.fieldset_path = ''
+        super().__init__(*args, **kwargs)
+
+    def get_fields(self):
+        fields = super().get_fields()
+        if self.fieldset is None:
+            return fields
+        return self.fieldset.apply(fields, self.fieldset_path)
+
+
+class FieldsetQuerySerializer(serializers.Serializer):
+    """
+    ``?fields=`` (dotted paths) and ``?expand=`` (nested serializers to render
+    as objects) of the endpoints serialized with ``serializer_class`` (or
+    ``context['serializer']``). Either parameter switches the response to the
+    compact mode: nested serializers not selected with a path nor expanded
+    become their id.
+    """
+    serializer_class = None
+
+    fields = serializers.CharField(required=False, allow_blank=True)
+    expand = serializers.CharField(required=False, allow_blank=True)
+
+    def validate(self, data):
+        data = super().validate(data)
+        data['fieldset'] = Fieldset.from_query(data.get('fields'), data.get('expand'))
+        self.plan = None
+        if data['fieldset'] is not None:
+            # Resuelve el arbol completo: los nombres desconocidos fallan aqui (400)
+            serializer_class = self.context.get('serializer', self.serializer_class)
+            self.plan = query_plan(serializer_class(fieldset=data['fieldset']))
+        return data
+
+    @property
+    def fieldset(self):
+        return self.validated_data['fieldset']
+
+    def narrow(self, queryset):
+        """
+        ``queryset`` loading only the columns and relations of the requested
+        fields. Relations not serialized are not joined (``select_related``)
+        nor prefetched.
+        """
+        if self.plan is None:
+            return queryset
+        only, related, prefetch = self.plan
+        queryset = queryset.select_related(None)
+        if related:
+            queryset = queryset.select_related(*related)
+        if not prefetch:
+            queryset = queryset.prefetch_related(None)
+        return queryset.only(*only)
+
+
+def query_plan(serializer):
+    """
+    (only, select_related, prefetch) paths of the fields of ``serializer``,
+    or None when a field does not map to a model column (a method or a
+    property), in which case the queryset is left as it is.
+    """
+    only, related = [], []
+    prefetch = False
+
+    def walk(serializer, model, prefix):
+        nonlocal prefetch
+        for field in serializer.fields.values():
+            if field.write_only:
+                continue
+            if field.source == '*' or '.' in field.source:
+                return False
+            try:
+                model_field = model._meta.get_field(field.source)
+            except FieldDoesNotExist:
+                return False
+            path = prefix + field.source
+            if model_field.many_to_many or model_field.one_to_many:
+                prefetch = True
+            elif isinstance(field, serializers.BaseSerializer):
+                only.append(path)
+                related.append(path)
+                if not walk(field, model_field.related_model, f"{path}__"):
+                    return False
+            else:
+                only.append(path)
+        return True
+
+    if not walk(serializer, serializer.Meta.model, ''):
+        return None
+    return only, related, prefetch
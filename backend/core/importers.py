@@ -0,0 +1,145 @@
+import csv
+import io
+import json
+import uuid
+from itertools import islice
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.db import router, transaction
+from rest_framework.exceptions import ValidationError
+
+from .models import Person, Pacient
+from .search import index_persons
+from .serializers import PacientImportSerializer
+
+FORMATS = ('csv', 'ndjson')
+
+PERSON_FIELDS = ['dni', 'first_name', 'last_name', 'birth_date', 'phone', 'gender', 'direction']
+PACIENT_FIELDS = ['blood_group', 'contact_phone', 'allergies', 'clinical_history']
+
+
+def detect_format(filename, default=None):
+    extension = filename.rsplit('.', 1)[-1].lower() if filename and '.' in filename else ''
+    if extension == 'csv':
+        return 'csv'
+    if extension in ('ndjson', 'jsonl'):
+        return 'ndjson'
+    return default
+
+
+def read_rows(stream, input_format):
+    """Yield one dict per row from a text stream in CSV or NDJSON format."""
+    if input_format == 'csv':
+        for row in csv.DictReader(stream):
+            # Las celdas vacias del CSV se tratan como campos ausentes
+            yield {key: value for key, value in row.items() if key and value not in ('', None)}
+    elif input_format == 'ndjson':
+        for line in stream:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError:
+                yield {'__error__': 'Invalid JSON line.'}
+                continue
+            if not isinstance(row, dict):
+                yield {'__error__': 'Each line must be a JSON object.'}
+                continue
+            # Acepta tambien el formato anidado de PacientSerializer
+            person = row.pop('person', None)
+            if isinstance(person, dict):
+                row = {**person, **row}
+            yield row
+    else:
+        raise ValueError(f"Unsupported format '{input_format}'. Valid options: {', '.join(FORMATS)}.")
+
+
+def text_stream(uploaded_file):
+    return io.TextIOWrapper(uploaded_file, encoding='utf-8-sig', newline='')
+
+
+def import_batch(rows, first_row):
+    """
+    Validate and insert one batch. Returns ``(created, errors)`` where errors
+    is a list of ``{"row": n, "errors": ...}`` with 1-based row numbers.
+    """
+    errors = []
+    valid = []
+    # Una sola instancia para todo el lote (como ListSerializer): los campos
+    # se construyen una vez en lugar de copiarse en cada fila
+    serializer = PacientImportSerializer()
+    for number, row in enumerate(rows, start=first_row):
+        if '__error__' in row:
+            errors.append({"row": number, "errors": row['__error__']})
+            continue
+        try:
+            valid.append((number, serializer.run_validation(row)))
+        except ValidationError as e:
+            errors.append({"row": number, "errors": e.detail})
+
+    # Unicidad: una sola consulta dni__in (y email__in) por lote
+    dnis = [data['dni'] for _, data in valid]
+    emails = [data['email'] for _, data in valid if data.get('email')]
+    taken_dnis = set(Person.objects.filter(dni__in=dnis).values_list('dni', flat=True))
+    taken_emails = set(User.objects.filter(email__in=emails).values_list('email', flat=True)) if emails else set()
+
+    accepted = []
+    for number, data in valid:
+        email = data.get('email')
+        if data['dni'] in taken_dnis:
+            errors.append({"row": number, "errors": {"dni": ["The DNI is already registered."]}})
+            continue
+        if email and email in taken_emails:
+            errors.append({"row": number, "errors": {"email": ["The email is already registered."]}})
+            continue
+        taken_dnis.add(data['dni'])
+        if email:
+            taken_emails.add(email)
+        accepted.append(data)
+
+    if accepted:
+        # Los usuarios generados no inician sesion: contrasena inutilizable, sin hashing
+        unusable_password = make_password(None)
+        users = []
+        for data in accepted:
+            suffix = uuid.uuid4().hex[:16]
+            users.append(User(
+                username=f"user_{suffix}",
+                email=data.get('email') or f"test_{suffix}@test.com",
+                password=unusable_password,
+            ))
+        with transaction.atomic():
+            User.objects.bulk_create(users)
+            persons = Person.objects.bulk_create([
+                Person(user=user, **{field: data[field] for field in PERSON_FIELDS if field in data})
+                for user, data in zip(users, accepted)
+            ])
+            Pacient.objects.bulk_create([
+                Pacient(person=person, **{field: data[field] for field in PACIENT_FIELDS if field in data})
+                for person, data in zip(persons, accepted)
+            ])
+            index_persons(persons, router.db_for_write(Person), created=True)
+
+    errors.sort(key=lambda error: error['row'])
+    return len(accepted), errors
+
+
+def import_pacients(rows, batch_size=None):
+    """Import an iterable of row dicts in batches. Returns a summary dict."""
+    batch_size = batch_size or settings.IMPORT_BATCH_SIZE
+    rows = iter(rows)
+    created = 0
+    errors = []
+    first_row = 1
+    while True:
+        batch = list(islice(rows, batch_size))
+        if not batch:
+            break
+        batch_created, batch_errors = import_batch(batch, first_row)
+        created += batch_created
+        errors += batch_errors
+        first_row += len(batch)
+    return {"rows": first_row - 1, "created": created, "errors": errors}
@@ -0,0 +1,28 @@
+from django.db import models
+
+
+class CoveringIndex(models.Index):
+    """
+    Index with the ``covering`` fields in an INCLUDE clause on the backends
+    that support it (PostgreSQL) and an index of its keys elsewhere. Unlike
+    ``Index(include=...)`` it does not warn (models.W040) on the latter.
+    """
+
+    def __init__(self, *args, covering=(), **kwargs):
+        super().__init__(*args, **kwargs)
+        if covering and not self.name:
+            raise ValueError('A covering index must be named.')
+        self.covering = tuple(covering)
+
+    def create_sql(self, model, schema_editor, using='', **kwargs):
+        if not schema_editor.connection.features.supports_covering_indexes:
+            return super().create_sql(model, schema_editor, using=using, **kwargs)
+        index = self.clone()
+        index.include = self.covering
+        return super(CoveringIndex, index).create_sql(model, schema_editor, using=using, **kwargs)
+
+    def deconstruct(self):
+        path, expressions, kwargs = super().deconstruct()
+        if self.covering:
+            kwargs['covering'] = self.covering
+        return path, expressions, kwargs
@@ -0,0 +1,147 @@
+import asyncio
+import re
+import time
+from urllib.parse import urlsplit
+
+
+# Consultas de la peticion, de la cabecera Server-Timing de core.metrics
+re_server_timing_queries = re.compile(r'desc="(\d+) queries"')
+
+
+class HTTPError(Exception):
+    pass
+
+
+class Connection:
+    """Conexion HTTP/1.1 keep-alive minima sobre asyncio (sin dependencias)."""
+
+    def __init__(self, host, port, headers):
+        self.host = host
+        self.port = port
+        self.headers = headers
+        self.reader = self.writer = None
+        # Consultas de la ultima respuesta (None si no envio Server-Timing)
+        self.queries = None
+
+    async def open(self):
+        self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+
+    async def close(self):
+        if self.writer is not None:
+            self.writer.close()
+            try:
+                await self.writer.wait_closed()
+            except ConnectionError:
+                pass
+            self.reader = self.writer = None
+
+    async def get(self, path):
+        if self.writer is None:
+            await self.open()
+        request = f"GET {path} HTTP/1.1\r\nHost: {self.host}:{self.port}\r\n{self.headers}\r\n"
+        self.writer.write(request.encode('latin-1'))
+        await self.writer.drain()
+
+        status_line = await self.reader.readline()
+        if not status_line:
+            await self.close()
+            raise HTTPError("connection closed by the server")
+        status = int(status_line.split()[1])
+        length, keep_alive = None, True
+        self.queries = None
+        while True:
+            line = await self.reader.readline()
+            if line in (b'\r\n', b''):
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            name, value = name.strip().lower(), value.strip()
+            if name == 'content-length':
+                length = int(value)
+            elif name == 'connection' and value.lower() == 'close':
+                keep_alive = False
+            elif name == 'transfer-encoding' and value.lower() == 'chunked':
+                length = -1
+            elif name == 'server-timing':
+                match = re_server_timing_queries.search(value)
+                if match:
+                    self.queries = int(match.group(1))
+
+        if length == -1:
+            await self._read_chunked()
+        elif length is not None:
+            await self.reader.readexactly(length)
+        else:
+            await self.reader.read()
+            keep_alive = False
+        if not keep_alive:
+            await self.close()
+        return status
+
+    async def _read_chunked(self):
+        while True:
+            size = int((await self.reader.readline()).split(b';')[0], 16)
+            await self.reader.readexactly(size + 2)
+            if size == 0:
+                return
+
+
+def percentile(values, fraction):
+    if not values:
+        return 0.0
+    index = min(len(values) - 1, max(0, int(round(fraction * len(values))) - 1))
+    return values[index]
+
+
+async def run(urls, concurrency, requests, token=None):
+    """
+    Lanza ``requests`` GET repartidos en round robin entre ``urls`` (mismo
+    host y puerto) con ``concurrency`` conexiones keep-alive abiertas a la vez.
+    Devuelve el resumen de throughput, latencias y errores.
+    """
+    parts = [urlsplit(url) for url in urls]
+    host, port = parts[0].hostname, parts[0].port or 80
+    paths = [part.path + (f"?{part.query}" if part.query else '') for part in parts]
+    headers = "Accept: application/json\r\n"
+    if token:
+        headers += f"Authorization: Token {token}\r\n"
+
+    latencies, statuses, errors, queries = [], {}, [], []
+    pending = iter(range(requests))
+
+    async def worker():
+        connection = Connection(host, port, headers)
+        try:
+            for number in pending:
+                started = time.perf_counter()
+                try:
+                    status = await connection.get(paths[number % len(paths)])
+                except (OSError, HTTPError, ValueError, asyncio.IncompleteReadError) as e:
+                    await connection.close()
+                    errors.append(str(e) or type(e).__name__)
+                    continue
+                latencies.append(time.perf_counter() - started)
+                statuses[status] = statuses.get(status, 0) + 1
+                if connection.queries is not None:
+                    queries.append(connection.queries)
+        finally:
+            await connection.close()
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        'requests': len(latencies),
+        'concurrency': concurrency,
+        'elapsed': elapsed,
+        'rps': len(latencies) / elapsed if elapsed else 0.0,
+        'p50': percentile(latencies, 0.50),
+        'p95': percentile(latencies, 0.95),
+        'p99': percentile(latencies, 0.99),
+        'max': latencies[-1] if latencies else 0.0,
+        'queries': sum(queries) / len(queries) if queries else None,
+        'statuses': statuses,
+        'errors': len(errors),
+        'error_sample': errors[:3],
+    }
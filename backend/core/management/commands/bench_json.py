@@ -0,0 +1,79 @@
+import io
+import statistics
+import time
+import tracemalloc
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+from core import renderers
+from core.management.commands.bench_serializers import create_rows
+from core.renderers import ORJSONParser, ORJSONRenderer
+from core.serializers import DoctorDetailValuesSerializer, PacientValuesSerializer
+from core.views import doctor_queryset, pacient_queryset
+
+
+class Command(BaseCommand):
+    help = (
+        "Encoding and decoding time and bytes allocated of the pacients/doctors list payloads: "
+        "DRF's JSONRenderer/JSONParser (stdlib json) against ORJSONRenderer/ORJSONParser. The rows "
+        "are created in a transaction that is rolled back at the end."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1000,
+                            help='Pacients and doctors in each payload (default: 1000).')
+        parser.add_argument('--repeat', type=int, default=20,
+                            help='Timed runs of each case (default: 20).')
+
+    def handle(self, *args, **options):
+        if renderers.orjson is None:
+            self.stderr.write("orjson is not installed: ORJSONRenderer falls back to the stdlib json.")
+        rows, repeat = options['rows'], options['repeat']
+        with transaction.atomic():
+            create_rows(rows)
+            self.stdout.write(f"{connection.vendor}: {rows} rows per payload, best of {repeat} runs")
+            for label, serializer, queryset in (
+                ('pacients', PacientValuesSerializer, pacient_queryset()),
+                ('doctors', DoctorDetailValuesSerializer, doctor_queryset()),
+            ):
+                # La respuesta de la vista de listado: pagina de resultados con los enlaces del cursor
+                results = serializer(list(serializer.values(queryset.order_by('pk')[:rows]))).data
+                payload = {"next": "http://testserver/api/?cursor=cD0xMDAw", "previous": None, "results": results}
+                body = JSONRenderer().render(payload)
+                self.stdout.write(f"  {label}: {len(body):,} bytes")
+                self.compare("render", repeat,
+                             lambda: JSONRenderer().render(payload),
+                             lambda: ORJSONRenderer().render(payload))
+                self.compare("parse", repeat,
+                             lambda: JSONParser().parse(io.BytesIO(body)),
+                             lambda: ORJSONParser().parse(io.BytesIO(body)))
+            transaction.set_rollback(True)
+
+    def measure(self, call, repeat):
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            call()
+            timings.append(time.perf_counter() - started)
+        # Memoria en una ejecucion aparte: tracemalloc ralentiza las asignaciones
+        tracemalloc.start()
+        try:
+            call()
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        return min(timings), statistics.median(timings), peak
+
+    def compare(self, label, repeat, stdlib, fast):
+        stdlib_best, stdlib_median, stdlib_peak = self.measure(stdlib, repeat)
+        fast_best, fast_median, fast_peak = self.measure(fast, repeat)
+        self.stdout.write(
+            f"    {label:<7} json {stdlib_best * 1e3:7.2f} ms (median {stdlib_median * 1e3:7.2f}, "
+            f"peak {stdlib_peak / 1024:8,.0f} KiB)"
+            f"  orjson {fast_best * 1e3:7.2f} ms (median {fast_median * 1e3:7.2f}, "
+            f"peak {fast_peak / 1024:8,.0f} KiB)"
+            f"  x{stdlib_best / fast_best:.1f}"
+        )
@@ -0,0 +1,131 @@
+import random
+import statistics
+import time
+import uuid
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from core.models import Pacient, Person
+from core.search import FTS_TABLE, rebuild_index, search_person_ids
+
+MARKER = 'search-bench'
+SYLLABLES = ['ma', 'ri', 'an', 'to', 'lu', 'ca', 'se', 'ro', 'pe', 'dro', 'jo', 'sa',
+             'el', 'ga', 'bri', 'na', 'le', 'vi', 'ce', 'mo', 'ra', 'fer', 'nan', 'do',
+             'gu', 'ti', 'rrez', 'quis', 'pi', 'lla', 'to', 'res', 'her', 'cas', 'ti']
+
+
+def words(rng, count):
+    result = set()
+    while len(result) < count:
+        result.add(''.join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4))).capitalize())
+    return sorted(result)
+
+
+def misspell(word):
+    # Dos letras intercambiadas: sin coincidencias de prefijo
+    middle = len(word) // 2
+    return word[:middle - 1] + word[middle] + word[middle - 1] + word[middle + 1:]
+
+
+class Command(BaseCommand):
+    help = (
+        "Latency of the person search (index lookup and the search endpoint) on a table of "
+        "--persons synthetic pacients. The rows are created in the configured database and "
+        "removed at the end unless --keep is given."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--persons', type=int, default=1_000_000,
+                            help='Synthetic pacients to create (default: 1000000).')
+        parser.add_argument('--queries', type=int, default=300,
+                            help='Queries per kind of search (default: 300).')
+        parser.add_argument('--keep', action='store_true',
+                            help='Keep the synthetic rows for later runs.')
+        parser.add_argument('--reuse', action='store_true',
+                            help='Reuse the rows kept by a previous --keep run.')
+
+    def handle(self, *args, **options):
+        rng = random.Random(42)
+        first_names, last_names = words(rng, 3000), words(rng, 20000)
+        persons = options['persons']
+        if options['reuse']:
+            persons = Person.objects.filter(direction=MARKER).count()
+            if not persons:
+                raise CommandError("No rows from a previous --keep run.")
+        else:
+            if Person.objects.filter(dni__gte="90000000").exists():
+                raise CommandError("DNIs starting with 9 are reserved for the benchmark rows.")
+            self.create(persons, first_names, last_names, rng)
+
+        staff = User.objects.create(username=f"bench_{uuid.uuid4().hex[:12]}", is_staff=True)
+        try:
+            self.stdout.write(f"{connection.vendor}: {persons} persons")
+            samples = list(Person.objects.filter(direction=MARKER)
+                           .order_by('?').values('first_name', 'last_name', 'dni', 'phone')[:options['queries']])
+            kinds = {
+                'last name prefix': [sample['last_name'][:4] for sample in samples],
+                'full name': [f"{sample['first_name']} {sample['last_name']}" for sample in samples],
+                'misspelled last name': [misspell(sample['last_name'].split()[0]) for sample in samples],
+                'dni prefix': [sample['dni'][:6] for sample in samples],
+                'phone prefix': [sample['phone'][:6] for sample in samples],
+            }
+            client = APIClient(SERVER_NAME='localhost')
+            client.force_authenticate(staff)
+            url = reverse('search')
+            for label, queries in kinds.items():
+                self.report(f"{label} (index)", [self.time(search_person_ids, query) for query in queries])
+                self.report(f"{label} (endpoint)", [self.time(client.get, url, {'q': query})
+                                                    for query in queries])
+        finally:
+            staff.delete()
+            if not options['keep']:
+                self.delete()
+
+    def create(self, persons, first_names, last_names, rng, batch_size=10000):
+        started = time.perf_counter()
+        for offset in range(0, persons, batch_size):
+            with transaction.atomic():
+                Person.objects.bulk_create([
+                    Person(first_name=rng.choice(first_names),
+                           last_name=f"{rng.choice(last_names)} {rng.choice(last_names)}",
+                           dni=f"9{index:07d}", phone=f"9{rng.randrange(10 ** 8):08d}",
+                           direction=MARKER)
+                    for index in range(offset, min(offset + batch_size, persons))
+                ], batch_size=1000)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"INSERT INTO {Pacient._meta.db_table} (person_id, blood_group) "
+                f"SELECT id, 'O+' FROM {Person._meta.db_table} WHERE direction = %s", [MARKER])
+        # bulk_create no envia las senales que mantienen el FTS5
+        with transaction.atomic():
+            rebuild_index()
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute(f"ANALYZE {Person._meta.db_table}")
+                cursor.execute(f"ANALYZE {Pacient._meta.db_table}")
+        self.stdout.write(f"Created {persons} pacients in {time.perf_counter() - started:.1f}s")
+
+    def delete(self):
+        persons = f"SELECT id FROM {Person._meta.db_table} WHERE direction = %s"
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {Pacient._meta.db_table} WHERE person_id IN ({persons})", [MARKER])
+            if connection.vendor == 'sqlite':
+                cursor.execute(f"DELETE FROM {FTS_TABLE} WHERE rowid IN ({persons})", [MARKER])
+            cursor.execute(f"DELETE FROM {Person._meta.db_table} WHERE direction = %s", [MARKER])
+
+    def time(self, call, *args):
+        started = time.perf_counter()
+        call(*args)
+        return time.perf_counter() - started
+
+    def report(self, label, timings):
+        timings.sort()
+        percentile = lambda fraction: timings[max(0, int(len(timings) * fraction) - 1)] * 1e3
+        self.stdout.write(
+            f"  {label:<28} mean {statistics.mean(timings) * 1e3:7.2f} ms  p50 {percentile(0.5):7.2f} ms"
+            f"  p95 {percentile(0.95):7.2f} ms  p99 {percentile(0.99):7.2f} ms"
+        )
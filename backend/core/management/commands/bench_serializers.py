@@ -0,0 +1,122 @@
+import statistics
+import time
+from datetime import date, timedelta
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import IsAdminUser
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from core import views
+from core.conditional import conditional_list
+from core.models import Doctor, Pacient, Person, Specialty
+from core.pagination import KeysetPagination, paginate
+from core.serializers import (DoctorDetailSerializer, DoctorDetailValuesSerializer, PacientSerializer,
+                              PacientValuesSerializer)
+from core.views import doctor_queryset, pacient_queryset
+
+
+# Los listados como eran con los serializers de DRF: la referencia del tiempo de punta a punta
+@api_view(["GET"])
+@permission_classes([IsAdminUser])
+@conditional_list(Person, Pacient)
+def drf_pacients(request):
+    return paginate(request, pacient_queryset().filter(person__user__is_active=True), PacientSerializer)
+
+
+@api_view(["GET"])
+@permission_classes([IsAdminUser])
+@conditional_list(Person, Doctor, Specialty)
+def drf_doctors(request):
+    return paginate(request, doctor_queryset(), DoctorDetailSerializer)
+
+
+def create_rows(rows):
+    """``rows`` pacients and ``rows`` doctors with two specialties each."""
+    specialties = Specialty.objects.bulk_create([Specialty(description=f"bench-{i}") for i in range(10)])
+    users = User.objects.bulk_create([User(username=f"bench_serializer_{i}", email=f"bench_{i}@test.com")
+                                      for i in range(rows * 2)])
+    persons = Person.objects.bulk_create([
+        Person(user=user, dni=f"8{i:07d}", first_name="Bench", last_name=f"Person {i}",
+               phone="987654321", birth_date=date(1950, 1, 1) + timedelta(days=i), direction="Av. Lima 123")
+        for i, user in enumerate(users)])
+    Pacient.objects.bulk_create([Pacient(person=person, allergies="Penicillin", clinical_history="x" * 500)
+                                 for person in persons[:rows]])
+    doctors = Doctor.objects.bulk_create([Doctor(person=person, cmp=f"CMP{i}")
+                                          for i, person in enumerate(persons[rows:])])
+    Doctor.specialties.through.objects.bulk_create([
+        Doctor.specialties.through(doctor=doctor, specialty=specialties[(i + offset) % 10])
+        for i, doctor in enumerate(doctors) for offset in range(2)])
+
+
+class Command(BaseCommand):
+    help = (
+        "Rows per second of the list serializers: DRF (PacientSerializer, DoctorDetailSerializer) "
+        "against the compiled ValuesSerializer, serializing only, with the query, and end to end "
+        "(a rendered page of the list view, up to max_page_size rows). The rows are created in a "
+        "transaction that is rolled back at the end."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1000,
+                            help='Pacients and doctors to serialize (default: 1000).')
+        parser.add_argument('--repeat', type=int, default=20,
+                            help='Timed runs of each case (default: 20).')
+
+    def handle(self, *args, **options):
+        rows, repeat = options['rows'], options['repeat']
+        with transaction.atomic():
+            create_rows(rows)
+            admin = User.objects.create(username="bench_serializer_admin", is_staff=True)
+            page_size = min(rows, KeysetPagination.max_page_size)
+            self.stdout.write(f"{connection.vendor}: {rows} rows, best of {repeat} runs")
+            for label, drf, fast, queryset, drf_view, view in (
+                ('pacients', PacientSerializer, PacientValuesSerializer, pacient_queryset(),
+                 drf_pacients, views.pacients),
+                ('doctors', DoctorDetailSerializer, DoctorDetailValuesSerializer, doctor_queryset(),
+                 drf_doctors, views.doctors),
+            ):
+                queryset = queryset.order_by('pk')[:rows]
+                # Solo serializacion: instancias con sus prefetch y filas con sus relaciones ya cargadas
+                instances = list(queryset)
+                loaded = fast(list(fast.values(queryset)))
+                loaded.load_relations()
+                self.compare(f"{label} serialize", repeat, rows,
+                             lambda: drf(instances, many=True).data,
+                             lambda: loaded.data)
+                self.compare(f"{label} query+serialize", repeat, rows,
+                             lambda: drf(list(queryset.all()), many=True).data,
+                             lambda: fast(list(fast.values(queryset))).data)
+                # Punta a punta: permisos, ETag, pagina, serializacion y JSON, sin middleware
+                self.compare(f"{label} end to end", repeat, page_size,
+                             lambda: self.get(drf_view, admin, page_size),
+                             lambda: self.get(view, admin, page_size))
+            transaction.set_rollback(True)
+
+    def get(self, view, user, page_size):
+        # 'testserver' no esta en ALLOWED_HOSTS fuera del runner de tests
+        request = APIRequestFactory(SERVER_NAME='localhost').get('/', {'page_size': page_size})
+        force_authenticate(request, user=user)
+        response = view(request)
+        response.render()
+        assert response.status_code == 200, response.content
+        return response.content
+
+    def time(self, call, repeat):
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            call()
+            timings.append(time.perf_counter() - started)
+        return min(timings), statistics.median(timings)
+
+    def compare(self, label, repeat, rows, drf, fast):
+        drf_best, drf_median = self.time(drf, repeat)
+        fast_best, fast_median = self.time(fast, repeat)
+        self.stdout.write(
+            f"  {label:<26} DRF {rows / drf_best:>10,.0f} rows/s (median {drf_median * 1e3:6.1f} ms)"
+            f"  values {rows / fast_best:>10,.0f} rows/s (median {fast_median * 1e3:6.1f} ms)"
+            f"  x{drf_best / fast_best:.1f}"
+        )
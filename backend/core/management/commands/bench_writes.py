@@ -0,0 +1,105 @@
+import logging
+import queue
+import threading
+import time
+import uuid
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from core.models import Person, Pacient
+
+
+class Command(BaseCommand):
+    help = (
+        "Write throughput of add_pacient under concurrent workers against the configured "
+        "database (DATABASE_ENGINE=sqlite|postgresql). Each request creates a user, person "
+        "and pacient in one transaction. Created rows are removed at the end."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', default='1,2,4,8,16',
+                            help='Comma separated worker counts to run (default: 1,2,4,8,16).')
+        parser.add_argument('--requests', type=int, default=500,
+                            help='Requests per run (default: 500).')
+
+    def handle(self, *args, **options):
+        worker_counts = [int(value) for value in options['workers'].split(',')]
+        logging.getLogger('django.request').setLevel(logging.ERROR)
+        self.stdout.write(f"Backend: {connection.vendor} {self.describe()}")
+
+        staff = User.objects.create(username=f"bench_staff_{uuid.uuid4().hex[:8]}", is_staff=True)
+        prefix = f"{uuid.uuid4().int % 90 + 10}"
+        try:
+            self.stdout.write(f"{'workers':>8} {'requests':>9} {'created':>8} {'errors':>7} "
+                              f"{'seconds':>8} {'writes/s':>9} {'p99 ms':>8}")
+            for run, workers in enumerate(worker_counts):
+                result = self.run(workers, options['requests'], f"{prefix}{run:02d}", staff)
+                self.stdout.write(
+                    f"{workers:>8} {options['requests']:>9} {result['created']:>8} "
+                    f"{result['errors']:>7} {result['seconds']:>8.2f} "
+                    f"{result['created'] / result['seconds']:>9.1f} {result['p99'] * 1e3:>8.1f}"
+                )
+        finally:
+            persons = Person.objects.filter(dni__startswith=prefix, pacient__isnull=False)
+            users = list(persons.values_list('user_id', flat=True))
+            Pacient.objects.filter(person__in=persons).delete()
+            persons.delete()
+            User.objects.filter(id__in=users + [staff.id]).delete()
+
+    def describe(self):
+        if connection.vendor == 'sqlite':
+            with connection.cursor() as cursor:
+                pragmas = {
+                    name: cursor.execute(f"PRAGMA {name}").fetchone()[0]
+                    for name in ('journal_mode', 'synchronous', 'busy_timeout', 'mmap_size')
+                }
+            return f"{pragmas} transaction_mode={connection.transaction_mode}"
+        pool = connection.settings_dict['OPTIONS'].get('pool')
+        return f"pool={'on' if pool else 'off'} CONN_MAX_AGE={connection.settings_dict['CONN_MAX_AGE']}"
+
+    def run(self, workers, requests, prefix, staff):
+        pending = queue.Queue()
+        for index in range(requests):
+            pending.put(f"{prefix}{index:04d}")
+
+        result = {'created': 0, 'errors': 0}
+        timings = []
+        lock = threading.Lock()
+        url = reverse('add_pacient')
+
+        def worker():
+            # 'testserver' no esta en ALLOWED_HOSTS fuera del runner de tests
+            client = APIClient(SERVER_NAME='localhost')
+            client.force_authenticate(staff)
+            try:
+                while True:
+                    try:
+                        dni = pending.get_nowait()
+                    except queue.Empty:
+                        return
+                    started = time.perf_counter()
+                    response = client.post(url, {
+                        'person': {'dni': dni, 'first_name': "Bench", 'last_name': dni},
+                        'blood_group': "O+",
+                    }, format='json')
+                    elapsed = time.perf_counter() - started
+                    with lock:
+                        timings.append(elapsed)
+                        result['created' if response.status_code == 201 else 'errors'] += 1
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=worker) for _ in range(workers)]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        result['seconds'] = time.perf_counter() - started
+        timings.sort()
+        result['p99'] = timings[max(0, int(len(timings) * 0.99) - 1)] if timings else 0.0
+        return result
@@ -0,0 +1,83 @@
+import json
+import uuid
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.authtoken.models import Token
+
+from core import benchmark
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark suite of the read routes of core, authentication and appointments: p50/p95/p99 "
+        "latency, queries per request and RSS, in process through the Django test client and, with "
+        "--target, against a running server with concurrent keep-alive connections. Seed the "
+        "database first (manage.py seed_clinic) and save the results with --output to compare "
+        "two runs with --compare BASE.json NEW.json."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--route', action='append', choices=[route.label for route in benchmark.ROUTES],
+                            help='Routes to run (repeatable; default: all).')
+        parser.add_argument('--requests', type=int, default=200,
+                            help='Measured requests per route (default: 200).')
+        parser.add_argument('--no-client', action='store_true',
+                            help='Skip the in-process test client run.')
+        parser.add_argument('--target', metavar='BASE_URL',
+                            help='Also load-test a running server, e.g. http://127.0.0.1:8000.')
+        parser.add_argument('--concurrency', type=int, default=50,
+                            help='Concurrent connections against --target (default: 50).')
+        parser.add_argument('--server-pid', type=int, action='append', default=[],
+                            help='Server process (repeatable, one per worker) whose RSS is recorded.')
+        parser.add_argument('--output', help='Write the results as JSON to this file.')
+        parser.add_argument('--compare', nargs=2, metavar=('BASE', 'NEW'),
+                            help='Compare two result files and exit.')
+
+    def handle(self, *args, **options):
+        if options['compare']:
+            return self.compare(*options['compare'])
+        routes = [route for route in benchmark.ROUTES if not options['route'] or route.label in options['route']]
+        if options['no_client'] and not options['target']:
+            raise CommandError("Nothing to run: --no-client needs --target.")
+
+        user = User.objects.create(username=f"benchmark_{uuid.uuid4().hex[:12]}", is_staff=True)
+        token = Token.objects.create(user=user).key
+        try:
+            results = {'meta': benchmark.metadata()}
+            if not options['no_client']:
+                results['client'] = benchmark.run_client(routes, token, options['requests'])
+                self.report('client', results['client'])
+            if options['target']:
+                results['http'] = benchmark.run_http(routes, options['target'], token, options['requests'],
+                                                     options['concurrency'], server_pids=options['server_pid'])
+                self.report('http', results['http'])
+        finally:
+            user.delete()
+
+        if options['output']:
+            with open(options['output'], 'w') as output:
+                json.dump(results, output, indent=2)
+            self.stdout.write(f"Results written to {options['output']}")
+
+    def report(self, mode, results):
+        self.stdout.write(f"{mode}:")
+        for label, result in results.items():
+            queries = '-' if result['queries'] is None else f"{result['queries']:.1f}"
+            rss = result.get('rss_after')
+            self.stdout.write(
+                f"  {label:<18} p50 {result['p50'] * 1e3:7.1f} ms  p95 {result['p95'] * 1e3:7.1f} ms"
+                f"  p99 {result['p99'] * 1e3:7.1f} ms  queries {queries:>5}"
+                f"  rss {'-' if rss is None else f'{rss / 2 ** 20:.0f} MiB':>8}  statuses {result['statuses']}"
+            )
+
+    def compare(self, base_path, new_path):
+        with open(base_path) as base, open(new_path) as new:
+            base, new = json.load(base), json.load(new)
+        self.stdout.write(f"base {base['meta'].get('commit')} ({base['meta']['created']})  "
+                          f"new {new['meta'].get('commit')} ({new['meta']['created']})")
+        for mode, label, metric, before, after, change in benchmark.compare(base, new):
+            scale, unit = (1, '') if metric == 'queries' else (1e3, ' ms')
+            delta = '' if change is None else f"{change:+.1%}"
+            self.stdout.write(f"  {mode:<6} {label:<18} {metric:<7} {before * scale:9.2f}{unit:<3}"
+                              f" -> {after * scale:9.2f}{unit:<3} {delta:>8}")
@@ -0,0 +1,38 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from core.importers import FORMATS, detect_format, import_pacients, read_rows
+
+
+class Command(BaseCommand):
+    help = "Bulk import pacients from a CSV or NDJSON file."
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='CSV or NDJSON file to import.')
+        parser.add_argument('--format', dest='input_format', choices=FORMATS,
+                            help='Input format (default: detected from the file extension).')
+        parser.add_argument('--batch-size', type=int, default=settings.IMPORT_BATCH_SIZE,
+                            help=f'Rows validated and inserted per batch (default: {settings.IMPORT_BATCH_SIZE}).')
+
+    def handle(self, *args, **options):
+        input_format = options['input_format'] or detect_format(options['path'])
+        if input_format is None:
+            raise CommandError("Cannot detect the format from the file extension, use --format.")
+
+        started = time.perf_counter()
+        try:
+            with open(options['path'], encoding='utf-8-sig', newline='') as stream:
+                summary = import_pacients(read_rows(stream, input_format), options['batch_size'])
+        except OSError as e:
+            raise CommandError(str(e))
+        elapsed = time.perf_counter() - started
+
+        for error in summary['errors']:
+            self.stderr.write(f"Row {error['row']}: {error['errors']}")
+        rate = summary['rows'] / elapsed if elapsed else 0
+        self.stdout.write(self.style.SUCCESS(
+            f"{summary['created']} of {summary['rows']} rows imported "
+            f"({len(summary['errors'])} errors) in {elapsed:.2f}s ({rate:.0f} rows/s)."
+        ))
@@ -0,0 +1,84 @@
+import asyncio
+import json
+import uuid
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.authtoken.models import Token
+
+from core import loadtest
+
+SYNC_PATHS = ['/api/v1/profile/', '/api/v1/pacients/', '/api/v1/doctors/', '/api/v1/specialties/']
+ASYNC_PATHS = [path.replace('/api/v1/', '/api/v1/async/') for path in SYNC_PATHS]
+
+
+class Command(BaseCommand):
+    help = (
+        "Load-test the read endpoints of running servers with N concurrent keep-alive "
+        "connections and report requests/sec and p50/p95/p99. Start the servers first, "
+        "against the same database, e.g.:\n"
+        "  gunicorn appointment_management.wsgi -b 127.0.0.1:8000 -w 4 --threads 8\n"
+        "  uvicorn appointment_management.asgi:application --port 8001 --workers 4\n"
+        "and run: loadtest --target wsgi=http://127.0.0.1:8000 "
+        "--target asgi=http://127.0.0.1:8001 --async-target asgi"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--target', action='append', required=True, metavar='LABEL=BASE_URL',
+                            help='Server to load-test (repeatable).')
+        parser.add_argument('--async-target', action='append', default=[], metavar='LABEL',
+                            help='Targets that are served the async endpoints (api/v1/async/).')
+        parser.add_argument('--path', action='append', metavar='PATH',
+                            help='Paths to request in round robin (default: profile, pacients, '
+                                 'doctors and specialties; sync or async according to the target).')
+        parser.add_argument('--concurrency', type=int, default=200,
+                            help='Concurrent connections (default: 200).')
+        parser.add_argument('--requests', type=int, default=5000,
+                            help='Requests per target (default: 5000).')
+        parser.add_argument('--warmup', type=int, default=200,
+                            help='Requests per target before measuring (default: 200).')
+        parser.add_argument('--token',
+                            help='Token to authenticate with. By default a throwaway staff user is created.')
+        parser.add_argument('--json', dest='json_output', action='store_true',
+                            help='Print the results as JSON.')
+
+    def handle(self, *args, **options):
+        targets = []
+        for target in options['target']:
+            label, _, base_url = target.partition('=')
+            if not base_url:
+                raise CommandError(f"Invalid --target {target!r}, expected LABEL=BASE_URL.")
+            if options['path']:
+                paths = options['path']
+            else:
+                paths = ASYNC_PATHS if label in options['async_target'] else SYNC_PATHS
+            targets.append((label, [base_url.rstrip('/') + path for path in paths]))
+
+        user = None
+        token = options['token']
+        if token is None:
+            user = User.objects.create(username=f"loadtest_{uuid.uuid4().hex[:12]}", is_staff=True)
+            token = Token.objects.create(user=user).key
+        try:
+            results = {}
+            for label, urls in targets:
+                if options['warmup']:
+                    asyncio.run(loadtest.run(urls, min(options['concurrency'], options['warmup']),
+                                             options['warmup'], token))
+                results[label] = asyncio.run(
+                    loadtest.run(urls, options['concurrency'], options['requests'], token))
+        finally:
+            if user is not None:
+                user.delete()
+
+        if options['json_output']:
+            self.stdout.write(json.dumps(results, indent=2))
+            return
+        for label, result in results.items():
+            self.stdout.write(
+                f"{label:<10} {result['rps']:9.1f} req/s  p50 {result['p50'] * 1e3:8.1f} ms"
+                f"  p95 {result['p95'] * 1e3:8.1f} ms  p99 {result['p99'] * 1e3:8.1f} ms"
+                f"  statuses {result['statuses']}  errors {result['errors']}"
+            )
+            for error in result['error_sample']:
+                self.stdout.write(f"           error: {error}")
@@ -0,0 +1,237 @@
+import logging
+import random
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+
+logger = logging.getLogger(__name__)
+
+# Medidas de la peticion en curso; None fuera de una peticion (comandos, shell)
+_request_stats = ContextVar('request_stats', default=None)
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# (nombre Prometheus, atributo de ViewMetrics, descripcion)
+COUNTERS = (
+    ('http_request_db_queries_total', 'queries', 'Database queries run by the requests.'),
+    ('http_request_db_seconds_total', 'db_time', 'Seconds spent running database queries.'),
+    ('http_request_serialize_seconds_total', 'serialize_time', 'Seconds spent in list serializers.'),
+    ('http_request_render_seconds_total', 'render_time', 'Seconds spent rendering JSON.'),
+    ('http_response_bytes_total', 'response_bytes', 'Bytes of the response bodies (not streamed).'),
+)
+
+
+class RequestStats:
+    __slots__ = ('queries', 'db_time', 'serialize_time', 'render_time', 'statements')
+
+    def __init__(self, sampled):
+        self.queries = 0
+        self.db_time = 0.0
+        self.serialize_time = 0.0
+        self.render_time = 0.0
+        # SQL de las consultas, solo en las peticiones muestreadas
+        self.statements = [] if sampled else None
+
+
+def record_query(execute, sql, params, many, context):
+    """``connection.execute_wrapper`` hook counting the queries of the current request."""
+    stats = _request_stats.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        elapsed = time.perf_counter() - started
+        stats.queries += 1
+        stats.db_time += elapsed
+        if stats.statements is not None:
+            stats.statements.append((elapsed, sql))
+
+
+def install_query_hook(sender, connection, **kwargs):
+    """
+    ``connection_created`` receiver: installs ``record_query`` once per
+    connection. Unlike the ``execute_wrapper()`` context manager it also
+    sees the queries of async views, which run on the ORM's worker thread
+    (the request's stats travel there in the context).
+    """
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+@contextmanager
+def timed(attribute):
+    """Adds the time of the block to ``serialize_time`` or ``render_time`` of the current request."""
+    stats = _request_stats.get()
+    if stats is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        setattr(stats, attribute, getattr(stats, attribute) + time.perf_counter() - started)
+
+
+class ViewMetrics:
+    __slots__ = ('requests', 'buckets', 'duration', 'queries', 'db_time', 'serialize_time',
+                 'render_time', 'response_bytes')
+
+    def __init__(self):
+        self.requests = {}
+        self.buckets = [0] * len(DURATION_BUCKETS)
+        self.duration = 0.0
+        self.queries = 0
+        self.db_time = 0.0
+        self.serialize_time = 0.0
+        self.render_time = 0.0
+        self.response_bytes = 0
+
+
+class Registry:
+    """
+    Counters per resolved URL name of this process. Each worker (gunicorn,
+    uvicorn) keeps its own: Prometheus scrapes and sums them per instance.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._views = {}
+
+    def observe(self, view, method, status_code, duration, stats, response_bytes):
+        with self._lock:
+            metrics = self._views.get(view)
+            if metrics is None:
+                metrics = self._views[view] = ViewMetrics()
+            key = (method, status_code)
+            metrics.requests[key] = metrics.requests.get(key, 0) + 1
+            for index, bound in enumerate(DURATION_BUCKETS):
+                if duration <= bound:
+                    metrics.buckets[index] += 1
+                    break
+            metrics.duration += duration
+            metrics.queries += stats.queries
+            metrics.db_time += stats.db_time
+            metrics.serialize_time += stats.serialize_time
+            metrics.render_time += stats.render_time
+            metrics.response_bytes += response_bytes
+
+    def reset(self):
+        with self._lock:
+            self._views = {}
+
+    def exposition(self):
+        """Prometheus text exposition format (version 0.0.4)."""
+        with self._lock:
+            views = sorted(self._views.items())
+            lines = [
+                "# HELP http_requests_total Requests by URL name, method and status code.",
+                "# TYPE http_requests_total counter",
+            ]
+            for view, metrics in views:
+                for (method, status_code), count in sorted(metrics.requests.items()):
+                    lines.append(f'http_requests_total{{view="{escape(view)}",method="{method}",'
+                                 f'status="{status_code}"}} {count}')
+
+            lines += [
+                "# HELP http_request_duration_seconds Wall time of the requests.",
+                "# TYPE http_request_duration_seconds histogram",
+            ]
+            for view, metrics in views:
+                label = f'view="{escape(view)}"'
+                cumulative = 0
+                for bound, count in zip(DURATION_BUCKETS, metrics.buckets):
+                    cumulative += count
+                    lines.append(f'http_request_duration_seconds_bucket{{{label},le="{bound}"}} {cumulative}')
+                total = sum(metrics.requests.values())
+                lines.append(f'http_request_duration_seconds_bucket{{{label},le="+Inf"}} {total}')
+                lines.append(f'http_request_duration_seconds_sum{{{label}}} {metrics.duration}')
+                lines.append(f'http_request_duration_seconds_count{{{label}}} {total}')
+
+            for name, attribute, description in COUNTERS:
+                lines += [f"# HELP {name} {description}", f"# TYPE {name} counter"]
+                for view, metrics in views:
+                    lines.append(f'{name}{{view="{escape(view)}"}} {getattr(metrics, attribute)}')
+        return "\n".join(lines) + "\n"
+
+
+def escape(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+registry = Registry()
+
+
+class MetricsMiddleware:
+    """
+    Records, per resolved URL name, wall time, query count and time,
+    serializer and JSON render time and response bytes (``registry``,
+    exported by ``core.views.metrics``), and adds them to the response as a
+    ``Server-Timing`` header.
+
+    A fraction (``METRICS_SLOW_SAMPLE_RATE``) of the requests also keep the
+    SQL of their queries: those slower than ``METRICS_SLOW_REQUEST_MS`` are
+    logged with their slowest statements.
+
+    It goes first in ``MIDDLEWARE`` so the time and bytes are those of the
+    whole stack (compression included).
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.METRICS_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        started = time.perf_counter()
+        stats = RequestStats(random.random() < settings.METRICS_SLOW_SAMPLE_RATE)
+        token = _request_stats.set(stats)
+        try:
+            response = self.get_response(request)
+        finally:
+            _request_stats.reset(token)
+        return self.finish(request, response, stats, time.perf_counter() - started)
+
+    async def __acall__(self, request):
+        started = time.perf_counter()
+        stats = RequestStats(random.random() < settings.METRICS_SLOW_SAMPLE_RATE)
+        token = _request_stats.set(stats)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _request_stats.reset(token)
+        return self.finish(request, response, stats, time.perf_counter() - started)
+
+    def finish(self, request, response, stats, duration):
+        match = getattr(request, 'resolver_match', None)
+        view = match.view_name if match else 'unmatched'
+        response_bytes = 0 if response.streaming else len(response.content)
+        registry.observe(view, request.method, response.status_code, duration, stats, response_bytes)
+
+        if settings.METRICS_SERVER_TIMING:
+            response['Server-Timing'] = (
+                f'db;dur={stats.db_time * 1000:.1f};desc="{stats.queries} queries", '
+                f'serialize;dur={stats.serialize_time * 1000:.1f}, '
+                f'render;dur={stats.render_time * 1000:.1f}, '
+                f'total;dur={duration * 1000:.1f}'
+            )
+        if stats.statements is not None and duration * 1000 >= settings.METRICS_SLOW_REQUEST_MS:
+            slowest = sorted(stats.statements, reverse=True)[:5]
+            logger.warning(
+                "Slow request %s %s (%s): %.0f ms, %d queries in %.0f ms. Slowest queries:\n%s",
+                request.method, request.get_full_path(), view, duration * 1000, stats.queries,
+                stats.db_time * 1000, "\n".join(f"  {elapsed * 1000:.1f} ms  {sql}" for elapsed, sql in slowest),
+            )
+        return response
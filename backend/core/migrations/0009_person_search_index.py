@@ -0,0 +1,56 @@
+from django.db import migrations
+
+# PostgreSQL: GIN de tsvector (prefijos de palabra) y de pg_trgm (similitud)
+# sobre el nombre completo, e indices de prefijo para DNI/telefono.
+# SQLite: tabla FTS5 mantenida por core.signals.
+# Las expresiones deben coincidir con core.search.NAME_SQL/NAME_TSVECTOR_SQL
+
+POSTGRES_FORWARD = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    "CREATE INDEX IF NOT EXISTS core_person_name_fts_idx ON core_person USING gin "
+    "(to_tsvector('simple'::regconfig, (coalesce(first_name, '') || ' ' || coalesce(last_name, ''))))",
+    "CREATE INDEX IF NOT EXISTS core_person_name_trgm_idx ON core_person "
+    "USING gin ((coalesce(first_name, '') || ' ' || coalesce(last_name, '')) gin_trgm_ops)",
+    "CREATE INDEX IF NOT EXISTS core_person_dni_like_idx ON core_person (dni varchar_pattern_ops)",
+    "CREATE INDEX IF NOT EXISTS core_person_phone_like_idx ON core_person (phone varchar_pattern_ops)",
+]
+
+POSTGRES_BACKWARD = [
+    "DROP INDEX IF EXISTS core_person_name_fts_idx",
+    "DROP INDEX IF EXISTS core_person_name_trgm_idx",
+    "DROP INDEX IF EXISTS core_person_dni_like_idx",
+    "DROP INDEX IF EXISTS core_person_phone_like_idx",
+]
+
+SQLITE_FORWARD = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS core_person_search USING fts5("
+    "name, dni, phone, tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3 4')",
+    "INSERT INTO core_person_search (rowid, name, dni, phone) "
+    "SELECT id, trim(coalesce(first_name, '') || ' ' || coalesce(last_name, '')), "
+    "coalesce(dni, ''), coalesce(phone, '') FROM core_person",
+]
+
+SQLITE_BACKWARD = [
+    "DROP TABLE IF EXISTS core_person_search",
+]
+
+
+def run(statements):
+    def operation(apps, schema_editor):
+        for statement in statements.get(schema_editor.connection.vendor, []):
+            schema_editor.execute(statement)
+    return operation
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_rename_especialty_specialty_and_more'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            run({'postgresql': POSTGRES_FORWARD, 'sqlite': SQLITE_FORWARD}),
+            run({'postgresql': POSTGRES_BACKWARD, 'sqlite': SQLITE_BACKWARD}),
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.1.15 on 2026-10-18 19:39
+
+from django.db import migrations, models
+
+# El filtro por especialidad usa el indice de specialty_id que Django ya crea
+# en la tabla intermedia de Doctor.specialties
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_person_search_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='doctor',
+            index=models.Index(condition=models.Q(('cmp__isnull', False)), fields=['person'], name='doctor_with_cmp_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='doctor',
+            index=models.Index(condition=models.Q(('rne__isnull', False)), fields=['person'], name='doctor_with_rne_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='pacient',
+            index=models.Index(fields=['blood_group', 'person'], name='pacient_blood_group_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='person',
+            index=models.Index(fields=['register_at', 'id'], name='person_register_at_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='person',
+            index=models.Index(fields=['birth_date'], name='person_birth_date_idx'),
+        ),
+    ]
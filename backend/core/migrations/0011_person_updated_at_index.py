@@ -0,0 +1,19 @@
+# Generated by Django 5.1.15 on 2026-10-18 19:52
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0010_list_filter_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='person',
+            index=models.Index(fields=['updated_at'], name='person_updated_at_idx'),
+        ),
+    ]
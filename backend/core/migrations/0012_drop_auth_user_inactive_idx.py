@@ -0,0 +1,17 @@
+from django.db import migrations
+
+# Las bases que aplicaron la primera version de 0010 tienen un indice parcial
+# sobre auth_user creado desde core. core no crea indices en tablas de otras apps:
+# el filtro active=false recorre los doctores en orden de pk
+FORWARD = "DROP INDEX IF EXISTS auth_user_inactive_idx"
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0011_person_updated_at_index'),
+    ]
+
+    operations = [
+        migrations.RunSQL(FORWARD, migrations.RunSQL.noop),
+    ]
@@ -38,6 +38,16 @@ class Person(models.Model):
     register_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        # Filtros y orden de los listados (core.serializers.*ListQuerySerializer).
+        # gender (tres valores) no se indexa: ningun planner lo usaria
+        indexes = [
+            models.Index(fields=['register_at', 'id'], name='person_register_at_idx'),
+            models.Index(fields=['birth_date'], name='person_birth_date_idx'),
+            # max(updated_at) del ETag de los listados (core.conditional)
+            models.Index(fields=['updated_at'], name='person_updated_at_idx'),
+        ]
+
     def __str__(self):
         if self.first_name and self.last_name:
             return f"{self.first_name} {self.last_name}"
@@ -70,6 +80,11 @@ class Pacient(models.Model):
     allergies = models.TextField(blank=True, null=True)
     clinical_history = models.TextField(blank=True, null=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['blood_group', 'person'], name='pacient_blood_group_idx'),
+        ]
+
     def __str__(self):
         user_data = self.person.first_name.join(
             self.person.last_name) if self.person.first_name != None else self.person.user.username
@@ -109,5 +124,14 @@ class Doctor(models.Model):
             r'^[A-Za-z0-9]+$', 'The RNE must contain only alphanumeric characters.')]
     )
 
+    class Meta:
+        # Parciales: solo los doctores con CMP/RNE, en el orden del listado
+        indexes = [
+            models.Index(fields=['person'], condition=models.Q(cmp__isnull=False),
+                         name='doctor_with_cmp_idx'),
+            models.Index(fields=['person'], condition=models.Q(rne__isnull=False),
+                         name='doctor_with_rne_idx'),
+        ]
+
     def __str__(self):
         return f"Doctor {self.person.first_name} {self.person.last_name}"
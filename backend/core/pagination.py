@@ -0,0 +1,123 @@
+from rest_framework.pagination import CursorPagination, _reverse_ordering
+
+from .metrics import timed
+
+
+class KeysetPagination(CursorPagination):
+    """
+    Cursor (keyset) pagination shared by the list endpoints.
+
+    Pages are fetched with ``WHERE <ordering> > <cursor> ORDER BY ... LIMIT``
+    on an indexed, unique column, so deep pages cost the same as the first one.
+    The page size comes from ``REST_FRAMEWORK['PAGE_SIZE']`` and can be changed
+    per request with ``?page_size=`` up to ``max_page_size``.
+
+    ``paginate_queryset`` is DRF's algorithm split in three steps so that
+    ``apaginate_queryset`` can fetch the page with the async ORM.
+    """
+    ordering = 'pk'
+    page_size_query_param = 'page_size'
+    max_page_size = 500
+
+    def paginate_queryset(self, queryset, request, view=None):
+        page_queryset = self._page_queryset(queryset, request, view)
+        if page_queryset is None:
+            return None
+        return self._build_page(list(page_queryset))
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        page_queryset = self._page_queryset(queryset, request, view)
+        if page_queryset is None:
+            return None
+        return self._build_page([item async for item in page_queryset])
+
+    def _page_queryset(self, queryset, request, view):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+
+        self.cursor = self.decode_cursor(request)
+        if self.cursor is None:
+            (offset, reverse, current_position) = (0, False, None)
+        else:
+            (offset, reverse, current_position) = self.cursor
+
+        if reverse:
+            queryset = queryset.order_by(*_reverse_ordering(self.ordering))
+        else:
+            queryset = queryset.order_by(*self.ordering)
+
+        if current_position is not None:
+            order = self.ordering[0]
+            is_reversed = order.startswith('-')
+            order_attr = order.lstrip('-')
+            if self.cursor.reverse != is_reversed:
+                kwargs = {order_attr + '__lt': current_position}
+            else:
+                kwargs = {order_attr + '__gt': current_position}
+            queryset = queryset.filter(**kwargs)
+
+        self._position = (offset, reverse, current_position)
+        # Un elemento extra para saber si hay pagina siguiente
+        return queryset[offset:offset + self.page_size + 1]
+
+    def _build_page(self, results):
+        offset, reverse, current_position = self._position
+        self.page = list(results[:self.page_size])
+
+        if len(results) > len(self.page):
+            has_following_position = True
+            following_position = self._get_position_from_instance(results[-1], self.ordering)
+        else:
+            has_following_position = False
+            following_position = None
+
+        if reverse:
+            self.page = list(reversed(self.page))
+            self.has_next = (current_position is not None) or (offset > 0)
+            self.has_previous = has_following_position
+            if self.has_next:
+                self.next_position = current_position
+            if self.has_previous:
+                self.previous_position = following_position
+        else:
+            self.has_next = has_following_position
+            self.has_previous = (current_position is not None) or (offset > 0)
+            if self.has_next:
+                self.next_position = following_position
+            if self.has_previous:
+                self.previous_position = current_position
+
+        if (self.has_previous or self.has_next) and self.template is not None:
+            self.display_page_controls = True
+
+        return self.page
+
+
+def paginate(request, queryset, serializer_class, ordering=None, **serializer_kwargs):
+    paginator = KeysetPagination()
+    if ordering:
+        paginator.ordering = ordering
+    page = paginator.paginate_queryset(queryset, request)
+    serializer = serializer_class(page, many=True, **serializer_kwargs)
+    with timed('serialize_time'):
+        data = serializer.data
+    return paginator.get_paginated_response(data)
+
+
+async def apaginate(request, queryset, serializer_class, ordering=None, **serializer_kwargs):
+    paginator = KeysetPagination()
+    if ordering:
+        paginator.ordering = ordering
+    page = await paginator.apaginate_queryset(queryset, request)
+    serializer = serializer_class(page, many=True, **serializer_kwargs)
+    if hasattr(serializer, 'aload_relations'):
+        # ValuesSerializer: sus consultas de relaciones, con el ORM async
+        await serializer.aload_relations()
+    with timed('serialize_time'):
+        data = serializer.data
+    return paginator.get_paginated_response(data).data
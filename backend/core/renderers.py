@@ -0,0 +1,72 @@
+from django.conf import settings
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+from .metrics import timed
+
+try:
+    import orjson
+except ImportError:  # Dependencia opcional: sin orjson se usa el json de la stdlib
+    orjson = None
+
+# Fechas, Decimal, lazy strings, querysets... se convierten igual que con el
+# JSONEncoder de DRF; las fechas no se dejan a orjson porque DRF las trunca a
+# milisegundos y escribe UTC como 'Z'
+ORJSON_OPTIONS = (orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS) if orjson else 0
+
+# U+2028 y U+2029 en UTF-8: DRF los escapa para que el JSON sea un subconjunto de JavaScript
+LINE_SEPARATORS = ((b'\xe2\x80\xa8', b'\\u2028'), (b'\xe2\x80\xa9', b'\\u2029'))
+
+
+def dumps(data, default=JSONEncoder().default):
+    """
+    ``data`` as compact UTF-8 JSON bytes, the same bytes as DRF's
+    ``JSONRenderer`` with the default settings. Uses orjson when installed.
+    """
+    if orjson is not None:
+        try:
+            content = orjson.dumps(data, default=default, option=ORJSON_OPTIONS)
+        except orjson.JSONEncodeError:
+            # Enteros de mas de 64 bits, claves no soportadas...: el camino de la stdlib
+            pass
+        else:
+            for separator, escaped in LINE_SEPARATORS:
+                if separator in content:
+                    content = content.replace(separator, escaped)
+            return content
+    return JSONRenderer().render(data)
+
+
+class ORJSONRenderer(JSONRenderer):
+    """
+    ``JSONRenderer`` encoding with orjson when it is installed. Pretty printing
+    (``Accept: application/json; indent=4``, the browsable API) and
+    non-default ``UNICODE_JSON``/``COMPACT_JSON`` settings keep DRF's encoder.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        indent = self.get_indent(accepted_media_type, renderer_context or {})
+        with timed('render_time'):
+            if orjson is None or indent is not None or self.ensure_ascii or not self.compact:
+                return super().render(data, accepted_media_type, renderer_context)
+            return dumps(data)
+
+
+class ORJSONParser(JSONParser):
+    """``JSONParser`` decoding UTF-8 bodies with orjson when it is installed."""
+    renderer_class = ORJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        encoding = parser_context.get('encoding', settings.DEFAULT_CHARSET)
+        # orjson solo lee UTF-8 y siempre rechaza NaN/Infinity (STRICT_JSON)
+        if orjson is None or encoding.lower() not in ('utf-8', 'utf8') or not self.strict:
+            return super().parse(stream, media_type, parser_context)
+        try:
+            return orjson.loads(stream.read())
+        except orjson.JSONDecodeError as exc:
+            raise ParseError('JSON parse error - %s' % str(exc))
@@ -0,0 +1,110 @@
+import hashlib
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+# Alias de lectura de la peticion en curso; None = primario
+_read_alias = ContextVar('read_alias', default=None)
+
+
+@contextmanager
+def read_from(alias):
+    token = _read_alias.set(alias)
+    try:
+        yield
+    finally:
+        _read_alias.reset(token)
+
+
+def pin_cache_key(credential):
+    return f"db:pin:{hashlib.sha256(credential.encode()).hexdigest()}"
+
+
+def request_credential(request):
+    """Token o cookie de sesion con que se identifica quien hace la peticion."""
+    return request.headers.get('Authorization') or request.COOKIES.get(settings.SESSION_COOKIE_NAME)
+
+
+class PrimaryReplicaRouter:
+    """
+    Writes always go to the primary. Reads go to the replica chosen for the
+    current request by ReplicaRoutingMiddleware, except inside
+    ``transaction.atomic`` where they stay on the primary so a transaction
+    never reads data older than its own writes.
+    """
+
+    def db_for_read(self, model, **hints):
+        alias = _read_alias.get()
+        if alias is None or connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        return alias
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Las replicas tienen los mismos datos que el primario
+        aliases = {DEFAULT_DB_ALIAS, *settings.DATABASE_REPLICA_ALIASES}
+        if obj1._state.db in aliases and obj2._state.db in aliases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, **hints):
+        return db not in settings.DATABASE_REPLICA_ALIASES
+
+
+class ReplicaRoutingMiddleware:
+    """
+    Sends the reads of GET/HEAD/OPTIONS requests to a random replica.
+    After a successful write the credential of the caller is pinned to the
+    primary for ``REPLICA_PIN_SECONDS``, so they read their own writes while
+    the replicas catch up.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        credential = request_credential(request)
+        alias = self.replica_for(request)
+        if alias and credential and cache.get(pin_cache_key(credential)):
+            alias = None
+        with read_from(alias):
+            response = self.get_response(request)
+        if self.pins(request, response, credential):
+            cache.set(pin_cache_key(credential), True, settings.REPLICA_PIN_SECONDS)
+        return response
+
+    async def __acall__(self, request):
+        credential = request_credential(request)
+        alias = self.replica_for(request)
+        if alias and credential and await cache.aget(pin_cache_key(credential)):
+            alias = None
+        with read_from(alias):
+            response = await self.get_response(request)
+        if self.pins(request, response, credential):
+            await cache.aset(pin_cache_key(credential), True, settings.REPLICA_PIN_SECONDS)
+        return response
+
+    def replica_for(self, request):
+        replicas = settings.DATABASE_REPLICA_ALIASES
+        if not replicas or request.method not in SAFE_METHODS:
+            return None
+        return random.choice(replicas)
+
+    def pins(self, request, response, credential):
+        return (credential and settings.DATABASE_REPLICA_ALIASES
+                and request.method not in SAFE_METHODS and response.status_code < 400)
@@ -0,0 +1,151 @@
+import re
+
+from django.db import connections, router
+from django.db.models import Q
+
+from .models import Doctor, Pacient, Person
+
+# Tabla FTS5 (solo SQLite) con nombre, DNI y telefono de cada persona; rowid = Person.id
+FTS_TABLE = 'core_person_search'
+
+# Mismas expresiones que los indices GIN core_person_name_fts_idx y
+# core_person_name_trgm_idx (PostgreSQL): si cambian, el planner deja de usarlos
+NAME_SQL = "(coalesce(p.first_name, '') || ' ' || coalesce(p.last_name, ''))"
+NAME_TSVECTOR_SQL = f"to_tsvector('simple'::regconfig, {NAME_SQL})"
+
+KINDS = {
+    'pacient': Pacient,
+    'doctor': Doctor,
+}
+
+
+def search_person_ids(query, kind='pacient', limit=20):
+    """
+    Ids of the persons of ``kind`` matching ``query``, best match first.
+
+    Digits are matched as a DNI or phone prefix and words as prefixes of the
+    words of the full name, ranked by bm25 on SQLite (FTS5) and ts_rank
+    normalized by the name length on PostgreSQL (GIN tsvector). On PostgreSQL
+    a query without prefix matches falls back to trigram similarity (pg_trgm),
+    which tolerates typos. Every match is ranked before the limit applies.
+    """
+    connection = connections[router.db_for_read(Person)]
+    table = KINDS[kind]._meta.db_table
+    if connection.vendor == 'sqlite':
+        return _search_fts(connection, table, query, limit)
+    if connection.vendor == 'postgresql':
+        return _search_postgres(connection, table, query, limit)
+    return _search_like(kind, query, limit)
+
+
+def _terms(query):
+    return re.findall(r'\w+', query.lower())
+
+
+def _search_fts(connection, table, query, limit):
+    terms = _terms(query)
+    if not terms:
+        return []
+    # Cada termino como prefijo entre comillas: el texto del usuario no se
+    # interpreta como sintaxis de FTS5
+    match = ' '.join(f'"{term}"*' for term in terms)
+    # rank (bm25) ordena todas las coincidencias antes del LIMIT: cortar antes
+    # dejaria fuera al mejor resultado de un prefijo comun ("mar")
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"SELECT {FTS_TABLE}.rowid FROM {FTS_TABLE} "
+            f"JOIN {table} k ON k.person_id = {FTS_TABLE}.rowid "
+            f"WHERE {FTS_TABLE} MATCH %s ORDER BY rank, {FTS_TABLE}.rowid LIMIT %s",
+            [match, limit],
+        )
+        return [row[0] for row in cursor.fetchall()]
+
+
+def _search_postgres(connection, table, query, limit):
+    terms = _terms(query)
+    if not terms:
+        return []
+    join = f"FROM core_person p JOIN {table} k ON k.person_id = p.id"
+    with connection.cursor() as cursor:
+        if len(terms) == 1 and terms[0].isdigit():
+            # Prefijo de DNI o telefono (indices varchar_pattern_ops)
+            cursor.execute(
+                f"SELECT p.id {join} WHERE p.dni LIKE %s OR p.phone LIKE %s ORDER BY p.dni LIMIT %s",
+                [f"{terms[0]}%", f"{terms[0]}%", limit],
+            )
+            return [row[0] for row in cursor.fetchall()]
+
+        # Prefijos de palabra con el indice GIN de tsvector, como FTS5 en SQLite.
+        # Normalizacion 1 (largo del nombre), como bm25: "Ana Lopez" antes que
+        # "Ana Lopez Garcia Ramos"
+        tsquery = ' & '.join(f"{term}:*" for term in terms)
+        cursor.execute(
+            f"SELECT p.id {join} WHERE {NAME_TSVECTOR_SQL} @@ to_tsquery('simple', %s) "
+            f"ORDER BY ts_rank({NAME_TSVECTOR_SQL}, to_tsquery('simple', %s), 1) DESC, p.id LIMIT %s",
+            [tsquery, tsquery, limit],
+        )
+        ids = [row[0] for row in cursor.fetchall()]
+        if ids:
+            return ids
+
+        # Sin coincidencias por prefijo (errores de tipeo): similitud de trigramas
+        cursor.execute(
+            f"SELECT p.id {join} WHERE {NAME_SQL} %%> %s "
+            f"ORDER BY word_similarity(%s, {NAME_SQL}) DESC, p.id LIMIT %s",
+            [' '.join(terms), ' '.join(terms), limit],
+        )
+        return [row[0] for row in cursor.fetchall()]
+
+
+def _search_like(kind, query, limit):
+    # Otros motores: sin indice de texto, solo para desarrollo
+    persons = Person.objects.filter(**{f'{kind}__isnull': False})
+    for term in _terms(query):
+        persons = persons.filter(Q(first_name__istartswith=term) | Q(last_name__istartswith=term)
+                                 | Q(dni__startswith=term) | Q(phone__startswith=term))
+    return list(persons.order_by('id').values_list('id', flat=True)[:limit])
+
+
+def _index_row(person):
+    name = f"{person.first_name or ''} {person.last_name or ''}".strip()
+    return (person.pk, name, person.dni or '', person.phone or '')
+
+
+def index_persons(persons, using='default', created=False):
+    """
+    Write ``persons`` to the FTS5 table (SQLite only; PostgreSQL indexes the
+    columns). ``created`` skips removing the previous rows of new persons.
+    """
+    connection = connections[using]
+    if connection.vendor != 'sqlite':
+        return
+    rows = [_index_row(person) for person in persons]
+    with connection.cursor() as cursor:
+        if not created:
+            cursor.executemany(f"DELETE FROM {FTS_TABLE} WHERE rowid = %s", [(row[0],) for row in rows])
+        cursor.executemany(f"INSERT INTO {FTS_TABLE} (rowid, name, dni, phone) VALUES (%s, %s, %s, %s)", rows)
+
+
+def unindex_persons(person_ids, using='default'):
+    connection = connections[using]
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        cursor.executemany(f"DELETE FROM {FTS_TABLE} WHERE rowid = %s", [(pk,) for pk in person_ids])
+
+
+def rebuild_index(using='default'):
+    """Rebuild the FTS5 table from core_person. Returns the indexed rows (None if not SQLite)."""
+    connection = connections[using]
+    if connection.vendor != 'sqlite':
+        return None
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {FTS_TABLE}")
+        cursor.execute(
+            f"INSERT INTO {FTS_TABLE} (rowid, name, dni, phone) "
+            f"SELECT id, trim(coalesce(first_name, '') || ' ' || coalesce(last_name, '')), "
+            f"coalesce(dni, ''), coalesce(phone, '') FROM core_person"
+        )
+        cursor.execute(f"INSERT INTO {FTS_TABLE} ({FTS_TABLE}) VALUES ('optimize')")
+        cursor.execute(f"SELECT count(*) FROM {FTS_TABLE}")
+        return cursor.fetchone()[0]
@@ -1,13 +1,19 @@
 from authentication.serializers import UserSerializer
 from .models import Person, Doctor, Pacient, Specialty
+from .catalog import specialty_catalog
+from .fastserializers import ValuesSerializer
+from .fieldsets import FieldsetQuerySerializer, SparseFieldsetMixin
 from rest_framework import serializers
 from rest_framework.exceptions import ValidationError
-from datetime import date
+from datetime import date, datetime, time, timedelta
 from django.contrib.auth.models import User
+from django.db import router
+from django.db.models import F
+from django.utils import timezone
 import uuid
 
 
-class PersonSerializer(serializers.ModelSerializer):
+class PersonSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     user = UserSerializer(required=False)
 
     class Meta:
@@ -52,17 +58,21 @@ class PersonSerializer(serializers.ModelSerializer):
         user_data = validated_data.pop('user', None)
 
         if not user_data:
-            user = User.objects.create(
+            # Usuario generado por el sistema: no inicia sesion, no se calcula ningun hash
+            user = User(
                 username=f"user_{uuid.uuid4().hex[:16]}",
                 email=f"test_{uuid.uuid4().hex[:16]}@test.com",
             )
-            user.set_password("1234")
+            user.set_unusable_password()
             user.save()
         else:
             password = user_data.pop('password', None)
-            user = User.objects.create(**user_data)
+            user = User(**user_data)
             if password:
                 user.set_password(password)
+            else:
+                user.set_unusable_password()
+            user.save()
 
         person = Person.objects.create(user=user, **validated_data)
         return person
@@ -80,7 +90,7 @@ class PersonSerializer(serializers.ModelSerializer):
         return instance
 
 
-class PacientSerializer(serializers.ModelSerializer):
+class PacientSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     person = PersonSerializer()
 
     class Meta:
@@ -115,7 +125,38 @@ class PacientSerializer(serializers.ModelSerializer):
         return instance
 
 
-class SpecialtySerializer(serializers.ModelSerializer):
+class PacientImportSerializer(serializers.Serializer):
+    """
+    Flat row of a bulk import. Only validates the format: DNI and email
+    uniqueness are checked once per batch by ``core.importers``.
+    """
+    dni = serializers.RegexField(r'^\d{8}$', error_messages={
+        'invalid': 'The DNI must contain exactly 8 characters.'})
+    first_name = serializers.CharField(max_length=250, required=False, allow_blank=True, allow_null=True)
+    last_name = serializers.CharField(max_length=250, required=False, allow_blank=True, allow_null=True)
+    email = serializers.EmailField(required=False, allow_blank=True, allow_null=True)
+    birth_date = serializers.DateField(required=False, allow_null=True)
+    phone = serializers.RegexField(r'^\d{9}$', required=False, allow_blank=True, allow_null=True,
+                                   error_messages={'invalid': 'The phone number must have 9 digits'})
+    gender = serializers.ChoiceField(choices=Person.GENDER_CHOICES, required=False)
+    direction = serializers.CharField(max_length=250, required=False, allow_blank=True, allow_null=True)
+    blood_group = serializers.ChoiceField(choices=Pacient.BLOOD_GROUP_CHOICES, required=False)
+    contact_phone = serializers.RegexField(r'^\d{9}$', required=False, allow_blank=True, allow_null=True,
+                                           error_messages={'invalid': 'The number of emergency contact phone must have 9 digits'})
+    allergies = serializers.CharField(required=False, allow_blank=True, allow_null=True)
+    clinical_history = serializers.CharField(required=False, allow_blank=True, allow_null=True)
+
+    def validate_birth_date(self, value):
+        if value is None:
+            return value
+        current_year = date.today().year
+        minimum_year = 1940
+        if value.year < minimum_year or value.year > current_year:
+            raise ValidationError(f"The year must be between {minimum_year} and {current_year}.")
+        return value
+
+
+class SpecialtySerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     class Meta:
         model = Specialty
         fields = ['id', 'description']
@@ -128,9 +169,27 @@ class SpecialtySerializer(serializers.ModelSerializer):
         return value
 
 
-class DoctorSerializer(serializers.ModelSerializer):
+class SpecialtyCatalogField(serializers.PrimaryKeyRelatedField):
+    """Validates specialty ids against the cached catalog instead of one query per id."""
+
+    def to_internal_value(self, data):
+        if isinstance(data, bool):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        try:
+            pk = int(data)
+        except (TypeError, ValueError):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        descriptions = specialty_catalog()['descriptions']
+        if pk not in descriptions:
+            self.fail('does_not_exist', pk_value=data)
+        # Instancia "cargada" sin consulta; basta su pk para specialties.set()
+        return Specialty.from_db(router.db_for_write(Specialty), ['id', 'description', 'is_active'],
+                                 [pk, descriptions[pk], True])
+
+
+class DoctorSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     person = PersonSerializer()
-    specialties = serializers.PrimaryKeyRelatedField(
+    specialties = SpecialtyCatalogField(
         many=True,
         queryset=Specialty.objects.filter(is_active=True)
     )
@@ -191,3 +250,127 @@ class DoctorDetailSerializer(DoctorSerializer):
 
     # Sobrescribir el campo specialties para no incluirlo en el serializer
     specialties = serializers.CharField(write_only=True, required=False)
+
+
+class PacientValuesSerializer(ValuesSerializer):
+    serializer_class = PacientSerializer
+
+
+class DoctorDetailValuesSerializer(ValuesSerializer):
+    serializer_class = DoctorDetailSerializer
+    relations = {'specialties': Specialty.objects.filter(is_active=True)}
+
+
+class SearchQuerySerializer(serializers.Serializer):
+    q = serializers.CharField(min_length=2, max_length=100)
+    type = serializers.ChoiceField(choices=['pacient', 'doctor'], default='pacient')
+    limit = serializers.IntegerField(min_value=1, max_value=100, default=20)
+
+
+def start_of_day(day):
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def check_range(data, name):
+    start, end = data.get(f'{name}_from'), data.get(f'{name}_to')
+    if start and end and start > end:
+        raise ValidationError(f'The {name}_to should be greater than the {name}_from.')
+
+
+class ListQuerySerializer(FieldsetQuerySerializer):
+    """
+    Base of the query strings of the list endpoints: ``?fields=``/``?expand=``,
+    filters and ``?ordering=``. ``ORDERING`` maps each accepted ordering
+    (optionally prefixed with ``-``) to the keyset columns, the first one
+    being the cursor. Every filter and ordering is backed by an index of
+    core.models.
+    """
+    ORDERING = {
+        'id': ('pk',),
+    }
+
+    ordering = serializers.CharField(default='id')
+
+    def validate_ordering(self, value):
+        if value.lstrip('-') not in self.ORDERING:
+            raise ValidationError(f"Ordering must be one of: {', '.join(self.ORDERING)} (prefix - to reverse).")
+        return value
+
+    def get_ordering(self):
+        value = self.validated_data['ordering']
+        prefix = '-' if value.startswith('-') else ''
+        return tuple(prefix + field for field in self.ORDERING[value.lstrip('-')])
+
+    def filter_queryset(self, queryset):
+        return queryset
+
+
+class PacientListQuerySerializer(ListQuerySerializer):
+    """
+    ``register_at`` is not unique but, as DRF's cursor expects of a creation
+    timestamp, nearly so: ties are paged with the cursor offset. A ``pk``
+    tie-breaker would be a column of another table than person_register_at_idx
+    and the database would sort the whole list instead of walking the index.
+    """
+    serializer_class = PacientSerializer
+    ORDERING = {
+        'id': ('pk',),
+        'register_at': ('register_at',),
+    }
+
+    blood_group = serializers.ChoiceField(choices=Pacient.BLOOD_GROUP_CHOICES, required=False)
+    gender = serializers.ChoiceField(choices=Person.GENDER_CHOICES, required=False)
+    birth_date_from = serializers.DateField(required=False)
+    birth_date_to = serializers.DateField(required=False)
+    register_at_from = serializers.DateField(required=False)
+    register_at_to = serializers.DateField(required=False)
+
+    def validate(self, data):
+        check_range(data, 'birth_date')
+        check_range(data, 'register_at')
+        return super().validate(data)
+
+    def filter_queryset(self, queryset):
+        data = self.validated_data
+        if 'blood_group' in data:
+            queryset = queryset.filter(blood_group=data['blood_group'])
+        if 'gender' in data:
+            queryset = queryset.filter(person__gender=data['gender'])
+        if 'birth_date_from' in data:
+            queryset = queryset.filter(person__birth_date__gte=data['birth_date_from'])
+        if 'birth_date_to' in data:
+            queryset = queryset.filter(person__birth_date__lte=data['birth_date_to'])
+        # Rango de fechas completas: comparar register_at con los limites (no
+        # register_at__date) mantiene usable el indice
+        if 'register_at_from' in data:
+            queryset = queryset.filter(person__register_at__gte=start_of_day(data['register_at_from']))
+        if 'register_at_to' in data:
+            queryset = queryset.filter(
+                person__register_at__lt=start_of_day(data['register_at_to'] + timedelta(days=1)))
+        if self.get_ordering()[0].lstrip('-') == 'register_at':
+            # El cursor lee el atributo del objeto: la columna de Person se anota
+            queryset = queryset.annotate(register_at=F('person__register_at'))
+        return queryset
+
+
+class DoctorListQuerySerializer(ListQuerySerializer):
+    serializer_class = DoctorDetailSerializer
+
+    specialty = serializers.IntegerField(min_value=1, required=False)
+    # default=None: sin el parametro no se filtra (un BooleanField ausente
+    # en el query string valdria False)
+    active = serializers.BooleanField(default=None, allow_null=True)
+    has_cmp = serializers.BooleanField(default=None, allow_null=True)
+    has_rne = serializers.BooleanField(default=None, allow_null=True)
+
+    def filter_queryset(self, queryset):
+        data = self.validated_data
+        if 'specialty' in data:
+            queryset = queryset.filter(specialties=data['specialty'])
+        if data['active'] is not None:
+            queryset = queryset.filter(person__user__is_active=data['active'])
+        if data['has_cmp'] is not None:
+            queryset = queryset.filter(cmp__isnull=not data['has_cmp'])
+        if data['has_rne'] is not None:
+            queryset = queryset.filter(rne__isnull=not data['has_rne'])
+        return queryset
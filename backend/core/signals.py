@@ -0,0 +1,68 @@
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.backends.signals import connection_created
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .catalog import invalidate_specialty_catalog
+from .metrics import install_query_hook
+from .models import Doctor, Pacient, Person, Specialty
+from .search import index_persons, unindex_persons
+
+
+@receiver([post_save, post_delete], sender=Specialty)
+def specialty_changed(sender, **kwargs):
+    # Despues del commit, para que la recarga no lea el estado anterior
+    transaction.on_commit(invalidate_specialty_catalog)
+
+
+# Indice de busqueda FTS5 (SQLite), en la misma transaccion que el cambio.
+# bulk_create no envia senales: core.importers indexa sus lotes explicitamente
+@receiver(post_save, sender=Person)
+def person_saved(sender, instance, created, using, **kwargs):
+    index_persons([instance], using, created)
+
+
+@receiver(post_delete, sender=Person)
+def person_deleted(sender, instance, using, **kwargs):
+    unindex_persons([instance.pk], using)
+
+
+# ETag de los listados (core.conditional): los cambios de pacientes, doctores
+# y usuarios que no pasan por Person.save() actualizan Person.updated_at.
+# Los usuarios sin Person (createsuperuser) solo cuentan por el numero de filas
+def touch_persons(using, **lookup):
+    Person.objects.using(using).filter(**lookup).update(updated_at=timezone.now())
+
+
+@receiver([post_save, post_delete], sender=Pacient)
+@receiver([post_save, post_delete], sender=Doctor)
+def person_role_changed(sender, instance, using, **kwargs):
+    touch_persons(using, pk=instance.person_id)
+
+
+# Campos de User que ningun listado muestra: el login guarda last_login en cada acceso
+UNLISTED_USER_FIELDS = {'last_login', 'password'}
+
+
+@receiver(post_save, sender=User)
+def user_saved(sender, instance, using, update_fields=None, **kwargs):
+    if update_fields and set(update_fields) <= UNLISTED_USER_FIELDS:
+        return
+    touch_persons(using, user_id=instance.pk)
+
+
+@receiver(m2m_changed, sender=Doctor.specialties.through)
+def doctor_specialties_changed(sender, instance, action, reverse, pk_set, using, **kwargs):
+    if not reverse:
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            touch_persons(using, pk=instance.pk)
+    elif action in ('post_add', 'post_remove'):
+        touch_persons(using, pk__in=pk_set)
+    elif action == 'pre_clear':
+        touch_persons(using, doctor__specialties=instance)
+
+
+# Consultas por peticion de core.metrics.MetricsMiddleware
+connection_created.connect(install_query_hook)
@@ -1,3 +1,1078 @@
-from django.test import TestCase
+from django.contrib.auth.models import User, update_last_login
+import io
+import json
+import os
+import tempfile
+import gzip
+from contextlib import nullcontext
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from unittest import mock, skipUnless
+from uuid import UUID
 
-# Create your tests here.
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection, connections, transaction
+from django.http import HttpResponse
+from django.test import AsyncClient, RequestFactory, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.translation import gettext_lazy
+from rest_framework.exceptions import ParseError
+from rest_framework.renderers import JSONRenderer
+from rest_framework.settings import api_settings
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from authentication.authentication import CachedTokenAuthentication
+from . import benchmark, compression
+from .caching import cache_timeout
+from .checks import replica_pin_cache_check
+from .conditional import use_generations
+from .catalog import CATALOG_KEY, catalog_version, specialty_catalog
+from .metrics import registry
+from .importers import import_pacients
+from .renderers import ORJSONParser, ORJSONRenderer
+from .models import Person, Pacient, Doctor, Specialty
+from .routing import PrimaryReplicaRouter, ReplicaRoutingMiddleware, read_from
+from .search import index_persons, search_person_ids
+from .fieldsets import Fieldset
+from .serializers import DoctorDetailSerializer, DoctorListQuerySerializer, PacientListQuerySerializer
+from .serializers import DoctorDetailValuesSerializer, PacientValuesSerializer
+from .views import doctor_queryset, pacient_queryset
+
+
+def create_pacient(index, **kwargs):
+    user = User.objects.create(username=f"pacient_{index}", email=f"pacient_{index}@test.com")
+    person = Person.objects.create(user=user, dni=f"{index:08d}", first_name="Pacient",
+                                   last_name=str(index))
+    return Pacient.objects.create(person=person, **kwargs)
+
+
+def create_doctor(index, specialties=()):
+    user = User.objects.create(username=f"doctor_{index}", email=f"doctor_{index}@test.com")
+    person = Person.objects.create(user=user, dni=f"{50000000 + index}", first_name="Doctor",
+                                   last_name=str(index))
+    doctor = Doctor.objects.create(person=person, cmp=f"CMP{index}")
+    doctor.specialties.set(specialties)
+    return doctor
+
+
+class AdminAPITestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.admin = User.objects.create(username="admin", is_staff=True)
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+
+class KeysetPaginationTests(AdminAPITestCase):
+    def test_pages_follow_the_cursor(self):
+        for index in range(1, 8):
+            create_pacient(index)
+
+        seen = []
+        url = reverse('pacients') + '?page_size=3'
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertLessEqual(len(response.data['results']), 3)
+            seen += [item['person']['dni'] for item in response.data['results']]
+            url = response.data['next']
+
+        self.assertEqual(seen, [f"{index:08d}" for index in range(1, 8)])
+
+    def test_deep_pages_do_not_use_offset(self):
+        for index in range(1, 8):
+            create_pacient(index)
+        first = self.client.get(reverse('pacients'), {'page_size': 2})
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(first.data['next'])
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(any('OFFSET' in query['sql'] for query in queries))
+
+    def test_specialties_are_paginated(self):
+        Specialty.objects.bulk_create([Specialty(description=f"Specialty {i}") for i in range(5)])
+        response = self.client.get(reverse('specialties'), {'page_size': 4})
+        self.assertEqual(len(response.data['results']), 4)
+        self.assertIsNotNone(response.data['next'])
+
+
+class QueryPlanTests(AdminAPITestCase):
+    """Each read endpoint runs a fixed number of queries, whatever the result size."""
+
+    def setUp(self):
+        super().setUp()
+        self.specialties = [Specialty.objects.create(description=f"Specialty {i}") for i in range(3)]
+        Specialty.objects.create(description="Retired", is_active=False)
+
+    def populate(self, start, count):
+        retired = Specialty.objects.get(description="Retired")
+        for index in range(start, start + count):
+            create_pacient(index)
+            create_doctor(index, self.specialties + [retired])
+
+    def assertConstantQueries(self, url, expected):
+        self.populate(1, 2)
+        with self.assertNumQueries(expected):
+            self.assertEqual(self.client.get(url).status_code, 200)
+        self.populate(3, 10)
+        with self.assertNumQueries(expected):
+            self.assertEqual(self.client.get(url).status_code, 200)
+
+    # Los listados suman la consulta de las marcas de su ETag (core.conditional)
+    def test_pacients(self):
+        self.assertConstantQueries(reverse('pacients'), 2)
+
+    def test_doctors(self):
+        self.assertConstantQueries(reverse('doctors'), 3)
+
+    def test_detail_pacient(self):
+        self.populate(1, 1)
+        url = reverse('detail_pacient', args=[Pacient.objects.get().pk])
+        with self.assertNumQueries(1):
+            self.assertEqual(self.client.get(url).status_code, 200)
+
+    def test_detail_doctor(self):
+        self.populate(1, 1)
+        url = reverse('detail_doctor', args=[Doctor.objects.get().pk])
+        with self.assertNumQueries(2):
+            self.assertEqual(self.client.get(url).status_code, 200)
+
+    def test_doctors_only_list_active_specialties(self):
+        self.populate(1, 1)
+        response = self.client.get(reverse('doctors'))
+        [doctor] = response.data['results']
+        self.assertEqual(len(doctor['specialties_details']), 3)
+
+
+@override_settings(EXPORT_CHUNK_SIZE=2)
+class ExportPacientsTests(AdminAPITestCase):
+    def setUp(self):
+        super().setUp()
+        for index in range(1, 6):
+            create_pacient(index)
+        inactive = create_pacient(6)
+        inactive.person.user.is_active = False
+        inactive.person.user.save()
+
+    def test_json_array(self):
+        response = self.client.get(reverse('export_pacients'))
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        data = json.loads(b"".join(response.streaming_content))
+        self.assertEqual([item['person']['dni'] for item in data],
+                         [f"{index:08d}" for index in range(1, 6)])
+
+    def test_ndjson(self):
+        response = self.client.get(reverse('export_pacients'), {'output': 'ndjson'})
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        lines = b"".join(response.streaming_content).decode().splitlines()
+        self.assertEqual(len(lines), 5)
+        self.assertEqual(json.loads(lines[0])['person']['dni'], "00000001")
+
+    def test_empty_registry(self):
+        Pacient.objects.all().delete()
+        response = self.client.get(reverse('export_pacients'))
+        self.assertEqual(json.loads(b"".join(response.streaming_content)), [])
+
+
+class ImportPacientsTests(AdminAPITestCase):
+    CSV = (
+        "dni,first_name,last_name,birth_date,gender,blood_group,email\n"
+        "10000001,Ana,Diaz,1990-05-01,F,A+,ana@test.com\n"
+        "10000002,Luis,Rojas,,M,,\n"
+        "123,Bad,Dni,,M,,\n"
+        "10000001,Dup,Row,,M,,\n"
+        "10000003,Old,Person,1900-01-01,M,,\n"
+    )
+
+    def upload(self, content, name="pacients.csv", **data):
+        return self.client.post(reverse('import_pacients'), {
+            'file': SimpleUploadedFile(name, content.encode()), **data}, format='multipart')
+
+    def test_csv_import_reports_row_errors(self):
+        create_pacient(10000009)
+        response = self.upload(self.CSV)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['rows'], 5)
+        self.assertEqual(response.data['created'], 2)
+        self.assertEqual([error['row'] for error in response.data['errors']], [3, 4, 5])
+
+        pacient = Pacient.objects.select_related('person__user').get(person__dni="10000001")
+        self.assertEqual(pacient.blood_group, "A+")
+        self.assertEqual(pacient.person.user.email, "ana@test.com")
+        self.assertFalse(pacient.person.user.has_usable_password())
+        self.assertEqual(Pacient.objects.get(person__dni="10000002").blood_group, "O+")
+
+    def test_ndjson_import_accepts_nested_person(self):
+        content = "\n".join([
+            json.dumps({"person": {"dni": "20000001", "first_name": "Eva"}, "allergies": "None"}),
+            json.dumps({"dni": "20000002"}),
+            "not json",
+        ])
+        response = self.upload(content, name="pacients.ndjson")
+        self.assertEqual(response.data['created'], 2)
+        self.assertEqual(response.data['errors'], [{"row": 3, "errors": "Invalid JSON line."}])
+
+    def test_existing_dni_is_rejected(self):
+        create_pacient(10000002)
+        response = self.upload(self.CSV)
+        self.assertIn({"row": 2, "errors": {"dni": ["The DNI is already registered."]}},
+                      response.data['errors'])
+
+    def test_unknown_format_is_rejected(self):
+        self.assertEqual(self.upload("x", name="pacients.txt").status_code, 400)
+
+    def test_batches_run_constant_queries(self):
+        rows = [{"dni": f"{30000000 + index}"} for index in range(50)]
+        # validacion + dni__in + 3 bulk_create (+ savepoint) por lote, y el
+        # indice FTS5 de busqueda en SQLite
+        with self.assertNumQueries(7 if connection.vendor == 'sqlite' else 6):
+            summary = import_pacients(rows, batch_size=50)
+        self.assertEqual(summary['created'], 50)
+
+    def test_management_command(self):
+        with tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False) as handle:
+            handle.write(self.CSV)
+        self.addCleanup(os.unlink, handle.name)
+        stdout, stderr = io.StringIO(), io.StringIO()
+        call_command('import_pacients', handle.name, batch_size=2, stdout=stdout, stderr=stderr)
+        self.assertIn("2 of 5 rows imported", stdout.getvalue())
+        self.assertIn("Row 3:", stderr.getvalue())
+
+
+class SpecialtyCatalogTests(AdminAPITestCase):
+    def setUp(self):
+        super().setUp()
+        self.cardiology = Specialty.objects.create(description="Cardiology")
+        Specialty.objects.create(description="Retired", is_active=False)
+
+    def test_catalog_is_cached(self):
+        self.assertEqual(specialty_catalog()['items'], [{"id": self.cardiology.pk, "description": "Cardiology"}])
+        with self.assertNumQueries(0):
+            specialty_catalog()
+
+    def test_catalog_is_invalidated_on_save(self):
+        version = specialty_catalog()['version']
+        with self.captureOnCommitCallbacks(execute=True):
+            Specialty.objects.create(description="Neurology")
+        catalog = specialty_catalog()
+        self.assertNotEqual(catalog['version'], version)
+        self.assertEqual(len(catalog['items']), 2)
+
+    def test_reload_racing_a_write_is_not_served(self):
+        # Una recarga que leyo la version antes del commit guarda el catalogo viejo bajo esa version
+        version = catalog_version()
+        with self.captureOnCommitCallbacks(execute=True):
+            Specialty.objects.create(description="Neurology")
+        cache.set(f'{CATALOG_KEY}:{version}', {'version': version, 'items': [], 'descriptions': {}})
+        self.assertEqual(len(specialty_catalog()['items']), 2)
+
+    @override_settings(CACHE_SHARED=False, LOCAL_CACHE_TIMEOUT=5)
+    def test_per_process_cache_caps_the_timeout(self):
+        self.assertEqual(cache_timeout(settings.SPECIALTY_CATALOG_TIMEOUT), 5)
+        with override_settings(CACHE_SHARED=True):
+            self.assertEqual(cache_timeout(settings.SPECIALTY_CATALOG_TIMEOUT),
+                             settings.SPECIALTY_CATALOG_TIMEOUT)
+
+    def test_specialties_serves_etag_and_304(self):
+        response = self.client.get(reverse('specialties'))
+        self.assertEqual(response.status_code, 200)
+        etag = response['ETag']
+
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse('specialties'), HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, 304)
+            self.assertEqual(self.client.get(reverse('specialties')).status_code, 200)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.patch(reverse('change_specialty', args=[self.cardiology.pk]),
+                              {'description': 'Cardiología'})
+        response = self.client.get(reverse('specialties'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['results'][0]['description'], 'Cardiología')
+
+    def test_delete_specialty_invalidates_catalog(self):
+        specialty_catalog()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.delete(reverse('delete_specialty', args=[self.cardiology.pk]))
+        self.assertEqual(specialty_catalog()['items'], [])
+
+    def test_doctor_specialties_validated_from_catalog(self):
+        specialty_catalog()
+        person = Person.objects.create(dni="60000001")
+        doctor = Doctor.objects.create(person=person)
+        url = reverse('change_doctor', args=[doctor.pk])
+
+        response = self.client.patch(url, {'specialties': [self.cardiology.pk]}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(list(doctor.specialties.values_list('pk', flat=True)), [self.cardiology.pk])
+
+        retired = Specialty.objects.get(description="Retired")
+        response = self.client.patch(url, {'specialties': [retired.pk]}, format='json')
+        self.assertEqual(response.status_code, 400)
+
+
+class PersonUserTests(TestCase):
+    def test_generated_pacient_user_has_unusable_password(self):
+        admin = User.objects.create(username="admin", is_staff=True)
+        client = APIClient()
+        client.force_authenticate(admin)
+        response = client.post(reverse('add_pacient'), {
+            'person': {'dni': "70000001", 'first_name': "Ana"},
+            'blood_group': "A+",
+        }, format='json')
+        self.assertEqual(response.status_code, 201, response.data)
+        user = Pacient.objects.get(person__dni="70000001").person.user
+        self.assertFalse(user.has_usable_password())
+
+
+class AsyncReadEndpointsTests(TestCase):
+    """The async (ASGI) endpoints return the same JSON as their sync versions."""
+
+    def setUp(self):
+        cache.clear()
+        self.admin = User.objects.create(username="admin", is_staff=True)
+        token = Token.objects.create(user=self.admin)
+        self.headers = {"Authorization": f"Token {token.key}"}
+        self.sync_client = APIClient()
+        self.sync_client.credentials(HTTP_AUTHORIZATION=f"Token {token.key}")
+        self.async_client = AsyncClient()
+        specialty = Specialty.objects.create(description="Cardiology")
+        for index in range(1, 4):
+            create_pacient(index)
+            create_doctor(index, [specialty])
+
+    async def assertParity(self, name, *args, query=None):
+        expected = await self.sync_client_get(reverse(name, args=args), query)
+        response = await self.async_client.get(reverse(f"async_{name}", args=args), query,
+                                               headers=self.headers)
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        if isinstance(data, dict) and 'results' in data:
+            self.assertEqual(data['results'], expected['results'])
+            self.assertEqual(data['next'] is None, expected['next'] is None)
+        else:
+            self.assertEqual(data, expected)
+
+    async def sync_client_get(self, url, query):
+        from asgiref.sync import sync_to_async
+        response = await sync_to_async(self.sync_client.get)(url, query)
+        return json.loads(response.content)
+
+    async def test_profile(self):
+        await self.assertParity('profile')
+
+    async def test_lists(self):
+        for name in ('pacients', 'doctors', 'specialties'):
+            await self.assertParity(name, query={'page_size': 2})
+
+    async def test_details(self):
+        pacient = await Pacient.objects.afirst()
+        doctor = await Doctor.objects.afirst()
+        await self.assertParity('detail_pacient', pacient.pk)
+        await self.assertParity('detail_doctor', doctor.pk)
+
+    async def test_cursor_follows_to_next_page(self):
+        response = await self.async_client.get(reverse('async_pacients'), {'page_size': 2},
+                                               headers=self.headers)
+        next_page = await self.async_client.get(response.json()['next'], headers=self.headers)
+        self.assertEqual([item['person']['dni'] for item in next_page.json()['results']], ["00000003"])
+
+    async def test_requires_token(self):
+        response = await self.async_client.get(reverse('async_pacients'))
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(response['WWW-Authenticate'], 'Token')
+        response = await self.async_client.get(reverse('async_pacients'),
+                                               headers={"Authorization": "Token invalid"})
+        self.assertEqual(response.status_code, 401)
+
+    async def test_requires_admin_for_lists(self):
+        user = await User.objects.acreate(username="pacient")
+        token = await Token.objects.acreate(user=user)
+        response = await self.async_client.get(reverse('async_pacients'),
+                                               headers={"Authorization": f"Token {token.key}"})
+        self.assertEqual(response.status_code, 403)
+
+    async def test_missing_detail_returns_404(self):
+        response = await self.async_client.get(reverse('async_detail_pacient', args=[999]),
+                                               headers=self.headers)
+        self.assertEqual(response.status_code, 404)
+
+
+@override_settings(DATABASE_REPLICA_ALIASES=['replica_a'], REPLICA_PIN_SECONDS=60)
+class ReplicaRoutingTests(TransactionTestCase):
+    def setUp(self):
+        cache.clear()
+        self.router = PrimaryReplicaRouter()
+        self.factory = RequestFactory()
+
+    def route(self, method, token="a", status_code=200):
+        """Alias used for reads inside a request routed by the middleware."""
+        seen = []
+
+        def view(request):
+            seen.append(self.router.db_for_read(Pacient))
+            return HttpResponse(status=status_code)
+
+        headers = {"Authorization": f"Token {token}"} if token else {}
+        ReplicaRoutingMiddleware(view)(self.factory.generic(method, '/', headers=headers))
+        return seen[0]
+
+    def test_safe_methods_read_from_replica(self):
+        for method in ('GET', 'HEAD', 'OPTIONS'):
+            self.assertEqual(self.route(method), 'replica_a')
+        for method in ('POST', 'PUT', 'PATCH', 'DELETE'):
+            self.assertEqual(self.route(method), 'default')
+
+    def test_atomic_blocks_and_writes_use_primary(self):
+        with read_from('replica_a'):
+            self.assertEqual(self.router.db_for_read(Pacient), 'replica_a')
+            self.assertEqual(self.router.db_for_write(Pacient), 'default')
+            with transaction.atomic():
+                self.assertEqual(self.router.db_for_read(Pacient), 'default')
+        self.assertEqual(self.router.db_for_read(Pacient), 'default')
+
+    def test_write_pins_the_caller_to_primary(self):
+        self.route('POST', token="a")
+        self.assertEqual(self.route('GET', token="a"), 'default')
+        self.assertEqual(self.route('GET', token="b"), 'replica_a')
+        self.assertEqual(self.route('GET', token=None), 'replica_a')
+
+    def test_failed_write_does_not_pin(self):
+        self.route('POST', token="a", status_code=400)
+        self.assertEqual(self.route('GET', token="a"), 'replica_a')
+
+    @override_settings(REPLICA_PIN_SECONDS=0)
+    def test_pin_expires(self):
+        self.route('POST', token="a")
+        self.assertEqual(self.route('GET', token="a"), 'replica_a')
+
+    def test_cache_fills_read_from_primary(self):
+        # replica_a no es una conexion real: leer de ella fallaria
+        token = Token.objects.create(user=User.objects.create(username="pacient"))
+        with read_from('replica_a'):
+            self.assertEqual(specialty_catalog()['items'], [])
+            user, _ = CachedTokenAuthentication().authenticate_credentials(token.key)
+        self.assertEqual(user.username, "pacient")
+
+    def test_pins_need_a_shared_cache(self):
+        with override_settings(CACHE_SHARED=False):
+            self.assertEqual([error.id for error in replica_pin_cache_check(None)], ['core.E001'])
+        with override_settings(CACHE_SHARED=True):
+            self.assertEqual(replica_pin_cache_check(None), [])
+
+    @override_settings(DATABASE_REPLICA_ALIASES=[])
+    def test_without_replicas_everything_uses_primary(self):
+        self.assertEqual(self.route('GET'), 'default')
+
+    async def test_async_requests(self):
+        seen = []
+
+        async def view(request):
+            seen.append(self.router.db_for_read(Pacient))
+            return HttpResponse()
+
+        middleware = ReplicaRoutingMiddleware(view)
+        headers = {"Authorization": "Token a"}
+        await middleware(self.factory.get('/', headers=headers))
+        await middleware(self.factory.post('/', headers=headers))
+        await middleware(self.factory.get('/', headers=headers))
+        self.assertEqual(seen, ['replica_a', 'default', 'default'])
+
+
+@skipUnless(settings.DATABASE_REPLICA_ALIASES, "DATABASE_REPLICAS is not configured")
+class ReplicaIntegrationTests(TransactionTestCase):
+    """
+    End to end against the configured replica (mirror of the test database).
+    Needs CACHE_SHARED=True with the default locmem cache (core.checks).
+    """
+    databases = '__all__'
+
+    def test_reads_go_to_replica_until_a_write(self):
+        replica = settings.DATABASE_REPLICA_ALIASES[0]
+        cache.clear()
+        admin = User.objects.create(username="admin", is_staff=True)
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f"Token {Token.objects.create(user=admin).key}")
+        create_pacient(1)
+        # El token se cachea desde el primario
+        client.get(reverse('profile'))
+
+        with override_settings(DATABASE_REPLICA_ALIASES=[replica]), \
+                CaptureQueriesContext(connections[replica]) as replica_queries, \
+                CaptureQueriesContext(connection) as primary_queries:
+            response = client.get(reverse('pacients'))
+            self.assertEqual(len(response.data['results']), 1)
+            self.assertTrue(replica_queries.captured_queries)
+            self.assertFalse(primary_queries.captured_queries)
+
+            response = client.post(reverse('add_pacient'), {
+                'person': {'dni': "70000002", 'first_name': "Ana"},
+            }, format='json')
+            self.assertEqual(response.status_code, 201, response.data)
+            read_on_replica = len(replica_queries.captured_queries)
+            response = client.get(reverse('pacients'))
+            self.assertEqual(len(response.data['results']), 2)
+            self.assertEqual(len(replica_queries.captured_queries), read_on_replica)
+
+
+class SearchTests(AdminAPITestCase):
+    def setUp(self):
+        super().setUp()
+        self.ana = self.create_person(1, "Ana", "Lopez Garcia", phone="987654321")
+        self.analia = self.create_person(2, "Analia", "Torres")
+        self.mario = self.create_person(3, "Mario", "Lopez")
+        self.doctor = Doctor.objects.create(person=Person.objects.create(
+            dni="50000001", first_name="Ana", last_name="Lopez Ramos"))
+
+    def create_person(self, index, first_name, last_name, **kwargs):
+        user = User.objects.create(username=f"search_{index}")
+        person = Person.objects.create(user=user, dni=f"1234{index:04d}", first_name=first_name,
+                                       last_name=last_name, **kwargs)
+        return Pacient.objects.create(person=person)
+
+    def search(self, q, **params):
+        response = self.client.get(reverse('search'), {'q': q, **params})
+        self.assertEqual(response.status_code, 200, response.data)
+        return [item['person']['dni'] for item in response.data['results']]
+
+    def test_name_search_is_ranked(self):
+        # pg_trgm tambien acepta coincidencias parciales, pero por debajo en el ranking
+        results = self.search("ana lopez")
+        self.assertEqual(results[0], "12340001")
+        self.assertNotIn("12340002", results)
+        self.assertCountEqual(self.search("lopez"), ["12340001", "12340003"])
+        self.assertEqual(self.search("torres"), ["12340002"])
+
+    def test_dni_and_phone_prefix(self):
+        self.assertEqual(self.search("12340003"), ["12340003"])
+        self.assertCountEqual(self.search("1234"), ["12340001", "12340002", "12340003"])
+        self.assertEqual(self.search("987654"), ["12340001"])
+
+    def test_type_and_limit(self):
+        self.assertEqual(self.search("ana lopez", type="doctor"), ["50000001"])
+        self.assertEqual(len(self.search("1234", limit=2)), 2)
+
+    def test_invalid_query(self):
+        for params in ({'q': "a"}, {'q': "ana", 'type': "nurse"}, {'q': "ana", 'limit': 0}):
+            response = self.client.get(reverse('search'), params)
+            self.assertEqual(response.status_code, 400)
+
+    def test_inactive_pacients_are_excluded(self):
+        self.client.delete(reverse('delete_pacient', args=[self.mario.pk]))
+        self.assertEqual(self.search("lopez"), ["12340001"])
+
+    def test_index_follows_changes(self):
+        person = self.analia.person
+        person.last_name = "Quispe"
+        person.save()
+        self.assertEqual(self.search("torres"), [])
+        self.assertEqual(self.search("quispe"), ["12340002"])
+        person.delete()
+        self.assertEqual(self.search("quispe"), [])
+
+    def test_imported_pacients_are_indexed(self):
+        import_pacients([{'dni': "30000001", 'first_name': "Rosa", 'last_name': "Huaman"}])
+        self.assertEqual(self.search("huaman"), ["30000001"])
+
+    def test_rebuild_index(self):
+        out = io.StringIO()
+        call_command('rebuild_search_index', stdout=out)
+        self.assertEqual(self.search("mario"), ["12340003"])
+
+    @skipUnless(connection.vendor == 'postgresql', "pg_trgm fallback")
+    def test_misspelled_names_fall_back_to_trigrams(self):
+        self.assertCountEqual(self.search("lopes"), ["12340001", "12340003"])
+
+    def test_best_match_beyond_the_first_500_matches(self):
+        # Las coincidencias mas debiles tienen los rowid mas bajos
+        persons = Person.objects.bulk_create([
+            Person(dni=f"6{index:07d}", first_name="Ana", last_name="Lopez Garcia Ramos Quispe")
+            for index in range(600)])
+        Pacient.objects.bulk_create([Pacient(person=person) for person in persons])
+        index_persons(persons, created=True)
+        best = self.create_person(4, "Ana", "Lopez")
+        self.assertEqual(search_person_ids("ana lopez", "pacient", 5)[:2], [best.pk, self.ana.pk])
+
+    def test_search_uses_one_query_for_ids(self):
+        with CaptureQueriesContext(connection) as queries:
+            ids = search_person_ids("lopez", "pacient", 10)
+        self.assertEqual(len(queries.captured_queries), 1)
+        self.assertCountEqual(ids, [self.ana.pk, self.mario.pk])
+
+
+class ListFilterTests(AdminAPITestCase):
+    def setUp(self):
+        super().setUp()
+        self.cardiology = Specialty.objects.create(description="Cardiology")
+        self.first = create_pacient(1, blood_group='A+')
+        self.second = create_pacient(2, blood_group='B-')
+        self.third = create_pacient(3, blood_group='A+')
+        Person.objects.filter(pk=self.first.pk).update(gender='F', birth_date=date(1990, 5, 1))
+        Person.objects.filter(pk=self.second.pk).update(gender='F', birth_date=date(1970, 1, 1))
+        Person.objects.filter(pk=self.third.pk).update(gender='M', birth_date=date(1995, 1, 1))
+        self.set_register_at(self.first, datetime(2024, 1, 10, 12))
+        self.set_register_at(self.second, datetime(2024, 3, 1, 12))
+        self.set_register_at(self.third, datetime(2024, 2, 1, 23, 59))
+
+        self.cardiologist = create_doctor(1, [self.cardiology])
+        self.resident = create_doctor(2)
+        self.resident.cmp = None
+        self.resident.rne = "RNE2"
+        self.resident.save()
+        self.retired = create_doctor(3)
+        self.retired.person.user.is_active = False
+        self.retired.person.user.save()
+
+    def set_register_at(self, item, moment):
+        Person.objects.filter(pk=item.pk).update(register_at=timezone.make_aware(moment))
+
+    def dnis(self, name, params):
+        response = self.client.get(reverse(name), params)
+        self.assertEqual(response.status_code, 200, response.data)
+        return [item['person']['dni'] for item in response.data['results']]
+
+    def test_pacient_filters(self):
+        self.assertEqual(self.dnis('pacients', {'blood_group': 'A+'}), ["00000001", "00000003"])
+        self.assertEqual(self.dnis('pacients', {'gender': 'F', 'birth_date_from': '1980-01-01'}), ["00000001"])
+        self.assertEqual(self.dnis('pacients', {'birth_date_to': '1990-05-01'}), ["00000001", "00000002"])
+        # register_at_to incluye el dia completo
+        self.assertEqual(self.dnis('pacients', {'register_at_from': '2024-01-11', 'register_at_to': '2024-02-01'}),
+                         ["00000003"])
+
+    def test_doctor_filters(self):
+        self.assertEqual(self.dnis('doctors', {'specialty': self.cardiology.pk}), ["50000001"])
+        self.assertEqual(self.dnis('doctors', {'active': 'false'}), ["50000003"])
+        self.assertEqual(self.dnis('doctors', {'active': 'true'}), ["50000001", "50000002"])
+        self.assertEqual(self.dnis('doctors', {'has_cmp': 'false'}), ["50000002"])
+        self.assertEqual(self.dnis('doctors', {'has_rne': 'true'}), ["50000002"])
+        self.assertEqual(self.dnis('doctors', {}), ["50000001", "50000002", "50000003"])
+
+    def test_ordering_follows_the_cursor(self):
+        for ordering, expected in (('register_at', ["00000001", "00000003", "00000002"]),
+                                   ('-register_at', ["00000002", "00000003", "00000001"]),
+                                   ('-id', ["00000003", "00000002", "00000001"])):
+            seen = []
+            url = reverse('pacients') + f'?ordering={ordering}&page_size=1'
+            while url:
+                response = self.client.get(url)
+                seen += [item['person']['dni'] for item in response.data['results']]
+                url = response.data['next']
+            self.assertEqual(seen, expected)
+
+    def test_invalid_parameters(self):
+        for name, params in (('pacients', {'blood_group': 'C+'}), ('pacients', {'ordering': 'dni'}),
+                             ('pacients', {'birth_date_from': '2000-01-01', 'birth_date_to': '1990-01-01'}),
+                             ('doctors', {'active': 'maybe'}), ('doctors', {'ordering': 'register_at'})):
+            response = self.client.get(reverse(name), params)
+            self.assertEqual(response.status_code, 400, params)
+
+
+class SparseFieldsetTests(AdminAPITestCase):
+    def setUp(self):
+        super().setUp()
+        self.specialty = Specialty.objects.create(description="Cardiology")
+        self.pacient = create_pacient(1, allergies="Penicillin", clinical_history="x" * 5000)
+        self.doctor = create_doctor(1, [self.specialty])
+
+    def get(self, name, params, *args):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse(name, args=args), params)
+        self.assertEqual(response.status_code, 200, response.data)
+        # Sin la consulta de las marcas del ETag de los listados
+        return response.data, [query['sql'] for query in queries.captured_queries
+                               if not query['sql'].startswith('SELECT (SELECT COUNT(*)')]
+
+    def test_full_tree_by_default(self):
+        data, _ = self.get('pacients', {})
+        self.assertEqual(data['results'][0]['person']['user']['username'], "pacient_1")
+        self.assertEqual(data['results'][0]['allergies'], "Penicillin")
+
+    def test_nested_paths(self):
+        data, [sql] = self.get('pacients', {'fields': 'person.first_name,person.last_name'})
+        self.assertEqual(data['results'], [{'person': {'first_name': "Pacient", 'last_name': "1"}}])
+        # Solo las columnas pedidas: sin los textos largos ni las del usuario
+        self.assertNotIn('clinical_history', sql)
+        self.assertNotIn('"auth_user"."username"', sql)
+
+    def test_compact_mode_and_expand(self):
+        data, [sql] = self.get('pacients', {'expand': ''})
+        self.assertEqual(data['results'][0]['person'], self.pacient.pk)
+        self.assertNotIn('"core_person"."dni"', sql)
+
+        data, _ = self.get('pacients', {'fields': 'blood_group,person', 'expand': 'person'})
+        person = data['results'][0]['person']
+        self.assertEqual(person['dni'], "00000001")
+        self.assertEqual(person['user'], self.pacient.person.user_id)
+
+    def test_doctor_relations_are_skipped(self):
+        data, queries = self.get('doctors', {'fields': 'cmp'})
+        self.assertEqual(data['results'], [{'cmp': "CMP1"}])
+        self.assertEqual(len(queries), 1)
+        self.assertNotIn('core_person', queries[0])
+
+        data, queries = self.get('doctors', {'fields': 'person.first_name,specialties_details.description'})
+        self.assertEqual(data['results'], [{'person': {'first_name': "Doctor"},
+                                            'specialties_details': [{'description': "Cardiology"}]}])
+        self.assertEqual(len(queries), 2)
+
+    def test_detail_views(self):
+        data, _ = self.get('detail_pacient', {'fields': 'allergies'}, self.pacient.pk)
+        self.assertEqual(data, {'allergies': "Penicillin"})
+        data, _ = self.get('detail_doctor', {'fields': 'specialties'}, self.doctor.pk)
+        self.assertEqual(data, {'specialties': [self.specialty.pk]})
+
+    def test_unknown_fields(self):
+        for params in ({'fields': 'salary'}, {'fields': 'person.salary'}, {'fields': 'person..dni'},
+                       {'expand': 'salary'}, {'expand': 'blood_group'}, {'expand': 'person.dni'}):
+            response = self.client.get(reverse('pacients'), params)
+            self.assertEqual(response.status_code, 400, params)
+
+
+class ValuesSerializerParityTests(TestCase):
+    """The fast list serializers render exactly the JSON of the DRF serializers."""
+
+    def setUp(self):
+        active = [Specialty.objects.create(description=f"Specialty {i}") for i in range(3)]
+        retired = Specialty.objects.create(description="Retired", is_active=False)
+        for index in range(1, 6):
+            create_pacient(index, blood_group='AB-' if index % 2 else 'O+', allergies="Penicillin",
+                           clinical_history=None if index == 3 else "History")
+            create_doctor(index, active[:index % 4] + ([retired] if index == 2 else []))
+        Person.objects.filter(dni="00000001").update(birth_date=date(1990, 5, 1), phone="987654321",
+                                                   gender='F', direction="Av. Lima 123")
+        # Persona sin usuario y doctor sin CMP/RNE ni especialidades
+        orphan = Person.objects.create(dni="00000099", first_name="No", last_name="User")
+        Pacient.objects.create(person=orphan)
+        Doctor.objects.create(person=Person.objects.create(dni="50000099"))
+
+    def assertParity(self, values_serializer, queryset, fieldset=None):
+        queryset = queryset.order_by('pk')
+        expected = values_serializer.serializer_class(queryset, many=True, fieldset=fieldset).data
+        rows = values_serializer.values(queryset, fieldset)
+        self.assertEqual(json.loads(json.dumps(values_serializer(list(rows), fieldset=fieldset).data)),
+                         json.loads(json.dumps(expected)))
+
+    def test_pacients(self):
+        self.assertParity(PacientValuesSerializer, pacient_queryset())
+
+    def test_doctors(self):
+        self.assertParity(DoctorDetailValuesSerializer, doctor_queryset())
+
+    def test_fieldsets(self):
+        for fields, expand in (('person.first_name,person.last_name', None), (None, ''), (None, 'person'),
+                               ('blood_group,person.user.email', None), ('person,allergies', 'person')):
+            fieldset = Fieldset.from_query(fields, expand)
+            self.assertParity(PacientValuesSerializer, pacient_queryset(), fieldset)
+        for fields, expand in (('cmp', None), (None, ''), ('person.dni,specialties_details.description', None),
+                               ('specialties_details', None), ('rne', 'specialties_details')):
+            fieldset = Fieldset.from_query(fields, expand)
+            self.assertParity(DoctorDetailValuesSerializer, doctor_queryset(), fieldset)
+
+    def test_views_use_one_query_per_relation(self):
+        admin = User.objects.create(username="admin", is_staff=True)
+        self.client = APIClient()
+        self.client.force_authenticate(admin)
+        # Marcas del ETag, doctores y especialidades
+        with self.assertNumQueries(3):
+            response = self.client.get(reverse('doctors'))
+        self.assertEqual(response.data['results'],
+                         json.loads(json.dumps(DoctorDetailSerializer(doctor_queryset().order_by('pk'),
+                                                                      many=True).data)))
+
+
+class RendererTests(AdminAPITestCase):
+    """ORJSONRenderer/ORJSONParser produce and accept the same JSON as DRF's, with or without orjson."""
+    DATA = {
+        "datetime": datetime.fromisoformat("2024-05-01T10:30:15.123456+00:00"),
+        "naive": datetime(2024, 5, 1, 10, 30),
+        "date": date(2024, 5, 1),
+        "decimal": Decimal("12.50"),
+        "uuid": UUID("12345678-1234-5678-1234-567812345678"),
+        "lazy": gettext_lazy("Not found."),
+        "text": "Ñandú \u2028 line",
+        "nested": [{"id": 1, "empty": None, "ok": True}, (1.5, 2 ** 70)],
+    }
+
+    def test_same_bytes_as_drf(self):
+        expected = JSONRenderer().render(self.DATA)
+        self.assertEqual(ORJSONRenderer().render(self.DATA), expected)
+        with mock.patch('core.renderers.orjson', None):
+            self.assertEqual(ORJSONRenderer().render(self.DATA), expected)
+
+    def test_indent_uses_drf_encoder(self):
+        rendered = ORJSONRenderer().render({"id": 1}, 'application/json; indent=2')
+        self.assertEqual(rendered, b'{\n  "id": 1\n}')
+
+    def test_parser(self):
+        body = '{"name": "Ñandú", "values": [1, 2.5, null]}'.encode()
+        for patch in (nullcontext(), mock.patch('core.renderers.orjson', None)):
+            with patch:
+                self.assertEqual(ORJSONParser().parse(io.BytesIO(body)),
+                                 {"name": "Ñandú", "values": [1, 2.5, None]})
+                with self.assertRaises(ParseError):
+                    ORJSONParser().parse(io.BytesIO(b'{"value": NaN}'))
+
+    def test_configured_for_the_api(self):
+        self.assertIs(api_settings.DEFAULT_PARSER_CLASSES[0], ORJSONParser)
+        response = self.client.get(reverse('pacients'))
+        self.assertIsInstance(response.accepted_renderer, ORJSONRenderer)
+
+
+class ConditionalListTests(AdminAPITestCase):
+    """ETags of the list endpoints from table stamps (core.conditional), and response compression."""
+
+    def setUp(self):
+        super().setUp()
+        self.specialty = Specialty.objects.create(description="Cardiology")
+        self.pacients = [create_pacient(index, allergies="Penicillin " * 20) for index in range(1, 6)]
+        self.doctor = create_doctor(1, [self.specialty])
+        self.async_client = AsyncClient()
+
+    def etag(self, name='pacients', **query):
+        response = self.client.get(reverse(name), query)
+        self.assertEqual(response.status_code, 200)
+        return response['ETag']
+
+    def test_not_modified(self):
+        etag = self.etag()
+        # Solo la consulta de las marcas de Person y Pacient: sin pagina ni serializacion
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('pacients'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+        self.assertEqual(response.content, b'')
+        self.assertNotEqual(self.etag(page_size=2), etag)
+
+    def test_changes_invalidate_the_etag(self):
+        pacient = self.pacients[0]
+        changes = [
+            lambda: self.client.patch(reverse('change_pacient', args=[pacient.pk]),
+                                      {"allergies": "None"}, format='json'),
+            lambda: User.objects.filter(pk=pacient.person.user_id).get().save(),
+            lambda: self.pacients[1].delete(),
+            lambda: create_pacient(9),
+        ]
+        etag = self.etag()
+        for change in changes:
+            change()
+            self.assertNotEqual(self.etag(), etag)
+            etag = self.etag()
+
+        # El login solo guarda last_login: ni UPDATE de Person ni ETag nuevo
+        user = User.objects.get(pk=pacient.person.user_id)
+        with self.assertNumQueries(1):
+            update_last_login(None, user)
+        self.assertEqual(self.etag(), etag)
+
+        etag = self.etag('doctors')
+        for change in (lambda: self.doctor.specialties.clear(),
+                       lambda: self.specialty.doctors.add(self.doctor),
+                       lambda: Specialty.objects.filter(pk=self.specialty.pk).get().save()):
+            change()
+            self.assertNotEqual(self.etag('doctors'), etag)
+            etag = self.etag('doctors')
+
+    @override_settings(CACHE_SHARED=True, DATABASE_REPLICA_ALIASES=[])
+    def test_shared_cache_uses_generations_instead_of_counts(self):
+        with CaptureQueriesContext(connection) as queries:
+            etag = self.etag()
+        self.assertNotIn('COUNT(', queries.captured_queries[0]['sql'].upper())
+        with override_settings(DATABASE_REPLICA_ALIASES=['replica']):
+            self.assertFalse(use_generations())
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('pacients'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+        # Borrar la persona tocada al final devuelve max(updated_at) a su valor anterior
+        with self.captureOnCommitCallbacks(execute=True):
+            self.pacients[1].person.delete()
+        self.assertNotEqual(self.etag(), etag)
+        etag = self.etag()
+        with self.captureOnCommitCallbacks(execute=True):
+            create_pacient(9)
+        self.assertNotEqual(self.etag(), etag)
+
+    async def test_async_not_modified(self):
+        token = await Token.objects.acreate(user=self.admin)
+        headers = {"Authorization": f"Token {token.key}"}
+        response = await self.async_client.get(reverse('async_doctors'), headers=headers)
+        response = await self.async_client.get(reverse('async_doctors'),
+                                                headers={**headers, "If-None-Match": response['ETag']})
+        self.assertEqual(response.status_code, 304)
+
+    def test_gzip_keeps_a_strong_etag(self):
+        response = self.client.get(reverse('pacients'), HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', response['Vary'])
+        self.assertEqual(json.loads(gzip.decompress(response.content))['results'][0]['person']['dni'],
+                         "00000001")
+        self.assertRegex(response['ETag'], r'^"[0-9a-f]+-gzip"$')
+        response = self.client.get(reverse('pacients'), HTTP_ACCEPT_ENCODING='gzip',
+                                   HTTP_IF_NONE_MATCH=f"W/{response['ETag']}")
+        self.assertEqual(response.status_code, 304)
+
+    @skipUnless(compression.brotli, "brotli is not installed")
+    def test_brotli(self):
+        response = self.client.get(reverse('pacients'), HTTP_ACCEPT_ENCODING='gzip, deflate, br')
+        self.assertEqual(response['Content-Encoding'], 'br')
+        self.assertEqual(len(json.loads(compression.brotli.decompress(response.content))['results']), 5)
+
+    def test_small_responses_are_not_compressed(self):
+        with override_settings(COMPRESSION_MIN_SIZE=10 ** 6):
+            response = self.client.get(reverse('pacients'), HTTP_ACCEPT_ENCODING='gzip, br')
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertNotIn('-', response['ETag'])
+
+
+class MetricsTests(AdminAPITestCase):
+    """Per-endpoint instrumentation: Server-Timing header, Prometheus counters and slow request log."""
+
+    def setUp(self):
+        super().setUp()
+        registry.reset()
+        for index in range(1, 4):
+            create_pacient(index)
+
+    def test_server_timing(self):
+        response = self.client.get(reverse('pacients'))
+        # Marcas del ETag y pagina
+        self.assertRegex(response['Server-Timing'],
+                         r'^db;dur=[\d.]+;desc="2 queries", serialize;dur=[\d.]+, '
+                         r'render;dur=[\d.]+, total;dur=[\d.]+$')
+
+    def test_prometheus_exposition(self):
+        self.client.get(reverse('pacients'))
+        self.client.get(reverse('pacients'), {'blood_group': 'XX'})
+        response = self.client.get(reverse('metrics'))
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain; version=0.0.4'))
+        text = response.content.decode()
+        self.assertIn('http_requests_total{view="pacients",method="GET",status="200"} 1\n', text)
+        self.assertIn('http_requests_total{view="pacients",method="GET",status="400"} 1\n', text)
+        self.assertIn('http_request_duration_seconds_count{view="pacients"} 2\n', text)
+        # 200: marcas del ETag y pagina; 400: solo las marcas
+        self.assertIn('http_request_db_queries_total{view="pacients"} 3\n', text)
+        self.assertRegex(text, r'http_response_bytes_total\{view="pacients"\} [1-9]\d*\n')
+
+        self.client.logout()
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, 401)
+
+    async def test_async_views_count_their_queries(self):
+        token = await Token.objects.acreate(user=self.admin)
+        response = await AsyncClient().get(reverse('async_pacients'),
+                                           headers={"Authorization": f"Token {token.key}"})
+        self.assertEqual(response.status_code, 200)
+        # Token, marcas del ETag y pagina
+        self.assertIn('desc="3 queries"', response['Server-Timing'])
+
+    def test_slow_requests_are_logged_with_their_queries(self):
+        with override_settings(METRICS_SLOW_REQUEST_MS=0, METRICS_SLOW_SAMPLE_RATE=1.0):
+            with self.assertLogs('core.metrics', 'WARNING') as logs:
+                self.client.get(reverse('pacients'))
+        self.assertIn('Slow request GET /api/v1/pacients/ (pacients)', logs.output[0])
+        self.assertIn('FROM "core_pacient"', logs.output[0])
+
+
+class BenchmarkSuiteTests(AdminAPITestCase):
+    # El cliente del benchmark usa SERVER_NAME='localhost', como fuera de los tests
+    @override_settings(ALLOWED_HOSTS=['localhost'])
+    def test_client_run(self):
+        create_pacient(1)
+        token = Token.objects.create(user=self.admin).key
+        routes = [route for route in benchmark.ROUTES if route.label in ('pacients', 'detail_pacient')]
+        results = benchmark.run_client(routes, token, requests=3, warmup=1)
+        self.assertEqual(set(results), {'pacients', 'detail_pacient'})
+        self.assertEqual(results['pacients']['statuses'], {200: 3})
+        # Marcas del ETag y pagina
+        self.assertEqual(results['pacients']['queries'], 2)
+        self.assertLessEqual(results['pacients']['p50'], results['pacients']['p99'])
+
+    def test_compare(self):
+        base = {'client': {'pacients': {'p50': 0.010, 'p95': 0.020, 'p99': 0.040, 'queries': 2}}}
+        new = {'client': {'pacients': {'p50': 0.005, 'p95': 0.020, 'p99': 0.030, 'queries': 2}},
+               'http': {'pacients': {'p50': 0.001}}}
+        rows = benchmark.compare(base, new)
+        self.assertIn(('client', 'pacients', 'p50', 0.010, 0.005, -0.5), rows)
+        self.assertEqual(len(rows), 4)
+
+    @override_settings(ALLOWED_HOSTS=['localhost'])
+    def test_bench_serializers(self):
+        out = io.StringIO()
+        call_command('bench_serializers', rows=20, repeat=1, stdout=out)
+        for label in ('pacients end to end', 'doctors end to end'):
+            self.assertIn(label, out.getvalue())
+        self.assertFalse(Person.objects.filter(first_name="Bench").exists())
+
+
+class ListIndexPlanTests(TestCase):
+    """
+    EXPLAIN of the filtered and ordered list queries: each one is served by
+    its index. The tables are populated and analyzed so the planner has the
+    statistics of a real clinic (most users active, a few doctors per specialty).
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        specialties = Specialty.objects.bulk_create([Specialty(description=f"Specialty {i}") for i in range(20)])
+        users = User.objects.bulk_create([
+            User(username=f"plan_{index}", is_active=index % 50 != 0) for index in range(3000)])
+        persons = Person.objects.bulk_create([
+            Person(user=user, dni=f"{index:08d}", gender='MFO'[index % 3],
+                   birth_date=date(1940, 1, 1) + timedelta(days=index * 9))
+            for index, user in enumerate(users)])
+        for index, person in enumerate(persons):
+            person.register_at = timezone.now() - timedelta(hours=index)
+        Person.objects.bulk_update(persons, ['register_at'], batch_size=500)
+
+        blood_groups = [choice for choice, _ in Pacient.BLOOD_GROUP_CHOICES]
+        Pacient.objects.bulk_create([Pacient(person=person, blood_group=blood_groups[index % 8])
+                                     for index, person in enumerate(persons[:2000])])
+        doctors = Doctor.objects.bulk_create([
+            Doctor(person=person, cmp=f"CMP{index}" if index % 20 == 0 else None,
+                   rne=f"RNE{index}" if index % 25 == 0 else None)
+            for index, person in enumerate(persons[2000:])])
+        Doctor.specialties.through.objects.bulk_create([
+            Doctor.specialties.through(doctor=doctor, specialty=specialties[index % 20])
+            for index, doctor in enumerate(doctors)])
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE")
+
+    def explain(self, serializer_class, queryset, params):
+        query = serializer_class(data=params)
+        self.assertTrue(query.is_valid(), query.errors)
+        page = query.filter_queryset(queryset).order_by(*query.get_ordering())[:51]
+        return page.explain()
+
+    def assertUsesIndex(self, serializer_class, queryset, params, indexes):
+        # Varios indices validos: PostgreSQL tambien usa los unique de cmp/rne para IS NOT NULL
+        plan = self.explain(serializer_class, queryset, params)
+        indexes = (indexes,) if isinstance(indexes, str) else indexes
+        self.assertTrue(any(index in plan for index in indexes), f"{params}:\n{plan}")
+
+    def test_pacient_filters(self):
+        pacients = pacient_queryset().filter(person__user__is_active=True)
+        for params, index in (
+            ({'blood_group': 'AB-'}, 'pacient_blood_group_idx'),
+            ({'birth_date_from': '1990-01-01', 'birth_date_to': '1991-01-01'}, 'person_birth_date_idx'),
+            ({'gender': 'F', 'birth_date_from': '1990-01-01', 'birth_date_to': '1990-06-30'}, 'person_birth_date_idx'),
+            ({'register_at_from': timezone.localdate().isoformat()}, 'person_register_at_idx'),
+            ({'ordering': 'register_at'}, 'person_register_at_idx'),
+            ({'ordering': '-register_at'}, 'person_register_at_idx'),
+        ):
+            self.assertUsesIndex(PacientListQuerySerializer, pacients, params, index)
+
+    def test_doctor_filters(self):
+        for params, index in (
+            # Indice de la FK specialty_id (su nombre cambia segun el motor)
+            ({'specialty': Specialty.objects.first().pk}, 'specialty_id'),
+            ({'has_cmp': 'true'}, ('doctor_with_cmp_idx', 'core_doctor_cmp')),
+            ({'has_rne': 'true'}, ('doctor_with_rne_idx', 'core_doctor_rne')),
+        ):
+            self.assertUsesIndex(DoctorListQuerySerializer, doctor_queryset(), params, index)
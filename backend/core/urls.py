@@ -1,9 +1,13 @@
 from django.urls import path
-from . import views
+from . import views, async_views
 
 urlpatterns = [
     path("pacients/", views.pacients, name="pacients"),
+    path("metrics/", views.metrics, name="metrics"),
+    path("search/", views.search, name="search"),
+    path("export_pacients/", views.export_pacients, name="export_pacients"),
     path("add_pacient/", views.add_pacient, name="add_pacient"),
+    path("import_pacients/", views.import_pacients, name="import_pacients"),
     path("change_pacient/<int:pacient_id>/", views.change_pacient, name="change_pacient"),
     path("delete_pacient/<int:pacient_id>/", views.delete_pacient, name="delete_pacient"),
     path("detail_pacient/<int:pacient_id>/", views.detail_pacient, name="detail_pacient"),
@@ -18,8 +22,17 @@ urlpatterns = [
          views.detail_specialty, name="detail_specialty"),
 
     path("doctors/", views.doctors, name="doctors"),
-    path("add_doctor/", views.add_doctor, name="add_pacient"),
+    path("add_doctor/", views.add_doctor, name="add_doctor"),
     path("change_doctor/<int:doctor_id>/", views.change_doctor, name="change_doctor"),
-    path("delete_doctor/<int:doctor_id>/", views.delete_doctor, name="delete_pacient"),
+    path("delete_doctor/<int:doctor_id>/", views.delete_doctor, name="delete_doctor"),
     path("detail_doctor/<int:doctor_id>/", views.detail_doctor, name="detail_doctor"),
 ]
+
+# Versiones async (ASGI) de las vistas de lectura, montadas en api/v1/async/
+async_urlpatterns = [
+    path("pacients/", async_views.pacients, name="async_pacients"),
+    path("detail_pacient/<int:pacient_id>/", async_views.detail_pacient, name="async_detail_pacient"),
+    path("specialties/", async_views.specialties, name="async_specialties"),
+    path("doctors/", async_views.doctors, name="async_doctors"),
+    path("detail_doctor/<int:doctor_id>/", async_views.detail_doctor, name="async_detail_doctor"),
+]
@@ -1,11 +1,39 @@
+from itertools import islice
+from django.conf import settings
+from django.http import HttpResponse, StreamingHttpResponse
 from rest_framework.response import Response
-from .models import Pacient, Doctor, Specialty
+from .models import Person, Pacient, Doctor, Specialty
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import IsAdminUser
-from .serializers import DoctorDetailSerializer, PacientSerializer, DoctorSerializer, SpecialtySerializer
+from .serializers import DoctorDetailSerializer, PacientSerializer, DoctorSerializer, SpecialtySerializer, SearchQuerySerializer
+from .serializers import DoctorListQuerySerializer, PacientListQuerySerializer
+from .serializers import DoctorDetailValuesSerializer, PacientValuesSerializer
+from .fieldsets import FieldsetQuerySerializer
+from .search import search_person_ids
+from .pagination import paginate
+from .conditional import conditional_list
+from .renderers import dumps
+from .metrics import registry
+from .catalog import specialty_catalog, response_key
+from .routing import read_from
+from django.core.cache import cache
+from django.utils.http import parse_etags
+from .importers import FORMATS, detect_format, import_pacients as run_import, read_rows, text_stream
 from rest_framework import status
 from django.db import transaction
-from rest_framework.response import Response
+from django.db.models import Prefetch
+
+
+# Planes de consulta de las vistas de lectura: cargan en un numero fijo de
+# consultas todo lo que recorren los serializers (person, user y specialties)
+def pacient_queryset():
+    return Pacient.objects.select_related("person", "person__user")
+
+
+def doctor_queryset():
+    return Doctor.objects.select_related("person", "person__user").prefetch_related(
+        Prefetch("specialties", queryset=Specialty.objects.filter(is_active=True))
+    )
 
 
 @api_view(["POST"])
@@ -22,20 +50,100 @@ def add_pacient(request):
         return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+@api_view(["POST"])
+@permission_classes([IsAdminUser])
+def import_pacients(request):
+    uploaded_file = request.FILES.get("file")
+    if uploaded_file is None:
+        return Response({"error": "The file is required."}, status=status.HTTP_400_BAD_REQUEST)
+
+    input_format = request.data.get("input_format") or detect_format(uploaded_file.name)
+    if input_format not in FORMATS:
+        return Response({"error": f"Unsupported format. Valid options: {', '.join(FORMATS)}."},
+                        status=status.HTTP_400_BAD_REQUEST)
+
+    try:
+        summary = run_import(read_rows(text_stream(uploaded_file), input_format))
+        return Response(summary, status=status.HTTP_200_OK)
+    except (UnicodeDecodeError, ValueError) as e:
+        return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    except Exception as e:
+        return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
 @api_view(["GET"])
 @permission_classes([IsAdminUser])
+@conditional_list(Person, Pacient)
 def pacients(request):
+    query = PacientListQuerySerializer(data=request.query_params)
+    if not query.is_valid():
+        return Response(query.errors, status=status.HTTP_400_BAD_REQUEST)
+
     try:
-        # select_related => Carga objetos (JOIN) en una sola consulta
-        pacients = Pacient.objects.select_related("person", "person__user").filter(
-            person__user__is_active=True)
+        pacients = query.filter_queryset(pacient_queryset().filter(person__user__is_active=True))
+        rows = PacientValuesSerializer.values(pacients, query.fieldset, query.get_ordering())
+        return paginate(request, rows, PacientValuesSerializer,
+                        ordering=query.get_ordering(), fieldset=query.fieldset)
+    except Exception as e:
+        return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
-        serializer = PacientSerializer(instance=pacients, many=True)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+
+@api_view(["GET"])
+@permission_classes([IsAdminUser])
+def search(request):
+    query = SearchQuerySerializer(data=request.query_params)
+    if not query.is_valid():
+        return Response(query.errors, status=status.HTTP_400_BAD_REQUEST)
+
+    try:
+        kind = query.validated_data['type']
+        ids = search_person_ids(query.validated_data['q'], kind, query.validated_data['limit'])
+        if kind == 'doctor':
+            found = doctor_queryset().in_bulk(ids)
+            serializer_class = DoctorDetailSerializer
+        else:
+            found = pacient_queryset().filter(person__user__is_active=True).in_bulk(ids)
+            serializer_class = PacientSerializer
+        # in_bulk no conserva el orden: se respeta el ranking de la busqueda
+        results = [found[pk] for pk in ids if pk in found]
+        return Response({"results": serializer_class(results, many=True).data}, status=status.HTTP_200_OK)
     except Exception as e:
         return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+def stream_pacients(pacients, ndjson):
+    rows = pacients.iterator(chunk_size=settings.EXPORT_CHUNK_SIZE)
+    yield b"" if ndjson else b"["
+    first = True
+    while True:
+        chunk = list(islice(rows, settings.EXPORT_CHUNK_SIZE))
+        if not chunk:
+            break
+        items = [dumps(item) for item in PacientSerializer(chunk, many=True).data]
+        if ndjson:
+            yield b"\n".join(items) + b"\n"
+        else:
+            yield (b"" if first else b",") + b",".join(items)
+        first = False
+    if not ndjson:
+        yield b"]"
+
+
+@api_view(["GET"])
+@permission_classes([IsAdminUser])
+def export_pacients(request):
+    # El cuerpo se genera por bloques: la memoria no crece con el tamano del registro
+    ndjson = request.query_params.get("output") == "ndjson"
+    pacients = pacient_queryset().filter(person__user__is_active=True).order_by("pk")
+    response = StreamingHttpResponse(
+        stream_pacients(pacients, ndjson),
+        content_type="application/x-ndjson" if ndjson else "application/json",
+    )
+    extension = "ndjson" if ndjson else "json"
+    response["Content-Disposition"] = f'attachment; filename="pacients.{extension}"'
+    return response
+
+
 @api_view(["PATCH"])
 def change_pacient(request, pacient_id):
     try:
@@ -68,9 +176,13 @@ def delete_pacient(request, pacient_id):
 
 @api_view(["GET"])
 def detail_pacient(request, pacient_id):
+    query = FieldsetQuerySerializer(data=request.query_params, context={'serializer': PacientSerializer})
+    if not query.is_valid():
+        return Response(query.errors, status=status.HTTP_400_BAD_REQUEST)
+
     try:
-        pacient = Pacient.objects.get(person_id=pacient_id)
-        serializer = PacientSerializer(pacient)
+        pacient = query.narrow(pacient_queryset()).get(person_id=pacient_id)
+        serializer = PacientSerializer(pacient, fieldset=query.fieldset)
         return Response(serializer.data, status=status.HTTP_200_OK)
     except Exception as e:
         return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
@@ -94,9 +206,20 @@ def add_specialty(request):
 @permission_classes([IsAdminUser])
 def specialties(request):
     try:
-        specialties = Specialty.objects.filter(is_active=True)
-        serializer = SpecialtySerializer(instance=specialties, many=True)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        catalog = specialty_catalog()
+        etag = f'"specialties-{catalog["version"]}"'
+        if etag in parse_etags(request.headers.get("If-None-Match", "")):
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+
+        # Respuesta cacheada por pagina; la version del catalogo cambia al invalidarse
+        key = response_key(catalog["version"], request.build_absolute_uri())
+        data = cache.get(key)
+        if data is None:
+            specialties = Specialty.objects.filter(is_active=True)
+            with read_from(None):
+                data = paginate(request, specialties, SpecialtySerializer).data
+            cache.set(key, data, settings.SPECIALTY_CATALOG_TIMEOUT)
+        return Response(data, status=status.HTTP_200_OK, headers={"ETag": etag})
     except Exception as e:
         return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
@@ -106,11 +229,11 @@ def specialties(request):
 def change_specialty(request, specialty_id):
     try:
         with transaction.atomic():
-            Specialty = Specialty.objects.get(id=specialty_id)
-            if Specialty.is_active is False:
+            specialty = Specialty.objects.get(id=specialty_id)
+            if specialty.is_active is False:
                 return Response({"error": "The specialty is not active."}, status=status.HTTP_404_NOT_FOUND)
 
-            serializer = SpecialtySerializer(Specialty, data=request.data, partial=True)
+            serializer = SpecialtySerializer(specialty, data=request.data, partial=True)
             if serializer.is_valid():
                 serializer.save()
                 return Response(serializer.data, status=status.HTTP_200_OK)
@@ -167,14 +290,17 @@ def add_doctor(request):
 
 @api_view(["GET"])
 @permission_classes([IsAdminUser])
+@conditional_list(Person, Doctor, Specialty)
 def doctors(request):
-    try:
-        # select_related => Carga objetos (JOIN) en una sola consulta
-        doctors = Doctor.objects.select_related("person").all()
-        print(doctors)
+    query = DoctorListQuerySerializer(data=request.query_params)
+    if not query.is_valid():
+        return Response(query.errors, status=status.HTTP_400_BAD_REQUEST)
 
-        serializer = DoctorDetailSerializer(doctors, many=True)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+    try:
+        doctors = query.filter_queryset(doctor_queryset())
+        rows = DoctorDetailValuesSerializer.values(doctors, query.fieldset, query.get_ordering())
+        return paginate(request, rows, DoctorDetailValuesSerializer,
+                        ordering=query.get_ordering(), fieldset=query.fieldset)
     except Exception as e:
         return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
@@ -211,9 +337,20 @@ def delete_doctor(request, doctor_id):
 
 @api_view(["GET"])
 def detail_doctor(request, doctor_id):
+    query = FieldsetQuerySerializer(data=request.query_params, context={'serializer': DoctorSerializer})
+    if not query.is_valid():
+        return Response(query.errors, status=status.HTTP_400_BAD_REQUEST)
+
     try:
-        doctor = Doctor.objects.get(person_id=doctor_id)
-        serializer = DoctorSerializer(doctor)
+        doctor = query.narrow(doctor_queryset()).get(person_id=doctor_id)
+        serializer = DoctorSerializer(doctor, fieldset=query.fieldset)
         return Response(serializer.data, status=status.HTTP_200_OK)
     except Exception as e:
         return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+@api_view(["GET"])
+@permission_classes([IsAdminUser])
+def metrics(request):
+    # Formato de texto de Prometheus; el scraper se autentica con el token de un admin
+    return HttpResponse(registry.exposition(), content_type="text/plain; version=0.0.4; charset=utf-8")